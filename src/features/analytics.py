@@ -0,0 +1,215 @@
+"""
+Aggregate statistics over recordings.
+
+A recording is loaded once into NumPy column arrays (timestamps,
+positions, type codes) and every aggregate is a vectorised operation over
+those columns: click heatmaps, events per second, idle gaps, typing speed
+and mouse distance. Per-recording results are cached in the catalog
+database keyed by the recording's size and mtime, so library rollups only
+parse recordings that are new or changed and then combine cached grids
+and counters.
+
+Heatmaps are built on positions normalised by each event's screen
+resolution, so recordings made at different resolutions share one grid.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from storage import load_recording
+
+ANALYTICS_VERSION = 1
+DEFAULT_GRID = (48, 27)
+IDLE_THRESHOLD = 2.0
+# Gaps between keystrokes longer than this do not count as typing time
+TYPING_PAUSE = 2.0
+TOP_GAPS = 5
+
+MOUSE_TYPES = {'move': 0, 'click': 1, 'scroll': 2}
+KEY_TYPES = {'keypress': 0, 'keydown': 1, 'keyup': 2}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS analytics_cache ('
+    ' recording TEXT NOT NULL, params TEXT NOT NULL, source_mtime REAL, source_size INTEGER,'
+    ' result TEXT NOT NULL, PRIMARY KEY (recording, params)) WITHOUT ROWID',
+)
+
+
+def load_columns(data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Convert a parsed recording into column arrays."""
+    mouse = data.get('mouse_events', [])
+    keyboard = data.get('keyboard_events', [])
+    n = len(mouse)
+    columns = {
+        'mouse_t': np.fromiter((e['relative_time'] for e in mouse), float, n),
+        'mouse_x': np.fromiter((e['pos'][0] for e in mouse), float, n),
+        'mouse_y': np.fromiter((e['pos'][1] for e in mouse), float, n),
+        'mouse_w': np.fromiter(((e.get('screen_resolution') or (1920, 1080))[0] for e in mouse), float, n),
+        'mouse_h': np.fromiter(((e.get('screen_resolution') or (1920, 1080))[1] for e in mouse), float, n),
+        'mouse_type': np.fromiter((MOUSE_TYPES.get(e['type'], -1) for e in mouse), np.int8, n),
+        'pressed': np.fromiter((bool(e.get('pressed')) for e in mouse), bool, n),
+        'key_t': np.fromiter((e['relative_time'] for e in keyboard), float, len(keyboard)),
+        'key_type': np.fromiter((KEY_TYPES.get(e['type'], -1) for e in keyboard), np.int8, len(keyboard)),
+        'printable': np.fromiter((len(e.get('key') or '') == 1 for e in keyboard), bool, len(keyboard)),
+    }
+    return columns
+
+
+def heatmap(columns: Dict[str, np.ndarray], grid=DEFAULT_GRID) -> np.ndarray:
+    """Button presses per cell of a ``grid`` (columns, rows) over the screen."""
+    presses = (columns['mouse_type'] == MOUSE_TYPES['click']) & columns['pressed']
+    fx = np.clip(columns['mouse_x'][presses] / columns['mouse_w'][presses], 0.0, 1.0 - 1e-9)
+    fy = np.clip(columns['mouse_y'][presses] / columns['mouse_h'][presses], 0.0, 1.0 - 1e-9)
+    counts, _, _ = np.histogram2d(fy, fx, bins=(grid[1], grid[0]), range=((0, 1), (0, 1)))
+    return counts.astype(np.int64)
+
+
+def summarize(
+    columns: Dict[str, np.ndarray],
+    grid=DEFAULT_GRID,
+    idle_threshold: float = IDLE_THRESHOLD
+) -> Dict[str, Any]:
+    """Per-recording aggregates (JSON-serialisable)."""
+    mouse_t, key_t = columns['mouse_t'], columns['key_t']
+    times = np.sort(np.concatenate([mouse_t, key_t]))
+    duration = float(times[-1]) if times.size else 0.0
+
+    per_second = np.bincount(times.astype(np.int64)) if times.size else np.zeros(0, np.int64)
+    gaps = np.diff(times)
+    idle = gaps > idle_threshold
+    idle_starts = times[:-1][idle]
+    idle_lengths = gaps[idle]
+    top = np.argsort(idle_lengths)[::-1][:TOP_GAPS]
+
+    dx = np.diff(columns['mouse_x'])
+    dy = np.diff(columns['mouse_y'])
+    distance = float(np.hypot(dx, dy).sum())
+
+    strokes = key_t[columns['printable'] & (columns['key_type'] != KEY_TYPES['keyup'])]
+    stroke_gaps = np.diff(strokes)
+    typing_time = float(stroke_gaps[stroke_gaps <= TYPING_PAUSE].sum())
+
+    mouse_type = columns['mouse_type']
+    return {
+        'duration': duration,
+        'events': {
+            'total': int(times.size),
+            'moves': int((mouse_type == MOUSE_TYPES['move']).sum()),
+            'clicks': int(((mouse_type == MOUSE_TYPES['click']) & columns['pressed']).sum()),
+            'scrolls': int((mouse_type == MOUSE_TYPES['scroll']).sum()),
+            'keys': int((columns['key_type'] != KEY_TYPES['keyup']).sum())
+        },
+        'events_per_second': {
+            'mean': float(times.size / duration) if duration else 0.0,
+            'max': int(per_second.max()) if per_second.size else 0,
+            'series': per_second.tolist()
+        },
+        'idle': {
+            'threshold': idle_threshold,
+            'count': int(idle.sum()),
+            'total': float(idle_lengths.sum()),
+            'longest': [
+                {'start': float(idle_starts[i]), 'duration': float(idle_lengths[i])} for i in top
+            ]
+        },
+        'typing': {
+            'keystrokes': int(strokes.size),
+            'typing_time': typing_time,
+            'chars_per_minute': float(strokes.size / typing_time * 60) if typing_time else 0.0
+        },
+        'mouse_distance': distance,
+        'heatmap': {'grid': list(grid), 'cells': heatmap(columns, grid).tolist()}
+    }
+
+
+def rollup(results: Iterable[Dict[str, Any]], grid=DEFAULT_GRID) -> Dict[str, Any]:
+    """Combine per-recording summaries into library totals."""
+    results = list(results)
+    grids = [np.asarray(r['heatmap']['cells'], np.int64) for r in results]
+    duration = sum(r['duration'] for r in results)
+    events = {key: sum(r['events'][key] for r in results) for key in ('total', 'moves', 'clicks', 'scrolls', 'keys')}
+    keystrokes = sum(r['typing']['keystrokes'] for r in results)
+    typing_time = sum(r['typing']['typing_time'] for r in results)
+    return {
+        'recordings': len(results),
+        'duration': duration,
+        'events': events,
+        'events_per_second': {
+            'mean': events['total'] / duration if duration else 0.0,
+            'max': max((r['events_per_second']['max'] for r in results), default=0)
+        },
+        'idle': {
+            'count': sum(r['idle']['count'] for r in results),
+            'total': sum(r['idle']['total'] for r in results)
+        },
+        'typing': {
+            'keystrokes': keystrokes,
+            'typing_time': typing_time,
+            'chars_per_minute': keystrokes / typing_time * 60 if typing_time else 0.0
+        },
+        'mouse_distance': sum(r['mouse_distance'] for r in results),
+        'heatmap': {
+            'grid': list(grid),
+            'cells': (np.sum(grids, axis=0) if grids else np.zeros((grid[1], grid[0]), np.int64)).tolist()
+        }
+    }
+
+
+class Analytics:
+    """
+    Cached analytics for one recorder's recordings.
+
+    Args:
+        catalog: The recorder's ``Catalog`` (the cache table lives in its database)
+        log_dir (str): Directory holding the recordings
+    """
+
+    def __init__(self, catalog, log_dir: str):
+        self.catalog = catalog
+        self.log_dir = log_dir
+        with catalog.transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def recording(self, recording: str, grid=DEFAULT_GRID, idle_threshold: float = IDLE_THRESHOLD) -> Dict[str, Any]:
+        """Aggregates of one recording, from the cache when it is current."""
+        path = os.path.join(self.log_dir, recording)
+        stat = os.stat(path)
+        params = f'v{ANALYTICS_VERSION}:{grid[0]}x{grid[1]}:{idle_threshold}'
+        rows = self.catalog.execute(
+            'SELECT source_mtime, source_size, result FROM analytics_cache WHERE recording = ? AND params = ?',
+            (recording, params))
+        if rows and rows[0][0] == stat.st_mtime and rows[0][1] == stat.st_size:
+            return json.loads(rows[0][2])
+        result = summarize(load_columns(load_recording(path)), grid, idle_threshold)
+        with self.catalog.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO analytics_cache (recording, params, source_mtime, source_size, result)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (recording, params, stat.st_mtime, stat.st_size, json.dumps(result, separators=(',', ':'))))
+        return result
+
+    def library(
+        self,
+        recordings: List[str],
+        grid=DEFAULT_GRID,
+        idle_threshold: float = IDLE_THRESHOLD
+    ) -> Dict[str, Any]:
+        """Rollup over ``recordings``; unreadable recordings are reported, not fatal."""
+        results = []
+        failed = []
+        for recording in recordings:
+            try:
+                results.append(self.recording(recording, grid, idle_threshold))
+            except Exception:
+                failed.append(recording)
+        summary = rollup(results, grid)
+        summary['failed'] = failed
+        return summary
+
+    def forget(self, recordings: Iterable[str]) -> None:
+        """Drop cached results of deleted recordings (deletion hook)."""
+        with self.catalog.transaction() as conn:
+            conn.executemany('DELETE FROM analytics_cache WHERE recording = ?', [(r,) for r in recordings])
@@ -1,8 +1,10 @@
 import os
 import sys
 import threading
+import time
 import json
-from flask import Flask, render_template, jsonify, request, Response, send_file
+from flask import Flask, g, has_request_context, render_template, jsonify, request, Response, send_file, stream_with_context
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
 
 # Import PreciseActionRecorder based on platform
@@ -15,8 +17,94 @@ else:
     display.start()
     from new_ import PreciseActionRecorder
 
+import metrics
+from fidelity import load_report
+from profiling import PROFILE_DIR, list_profiles, run_profiled
+from recording_io import serialize_recording
+from storage import load_recording
+from compression import decompress_bytes
+from retention import DEFAULT_CATEGORY, RetentionEngine, RetentionPolicy
+from analytics import DEFAULT_GRID, IDLE_THRESHOLD, Analytics
+from dry_run import dry_run
+from recording_diff import SHIFT_TOLERANCE, diff_recordings, splice
+from recorder_state import RecorderBusy
+from sessions import SessionLimitReached, SessionManager, UnknownSession
+
 app = Flask(__name__, template_folder='templates')
-recorder = PreciseActionRecorder()
+default_recorder = PreciseActionRecorder()
+sessions = SessionManager(default_recorder, PreciseActionRecorder)
+
+def start_session_services(session):
+    """Run retention and catch up the search index for a session's recorder"""
+    session_recorder = session.recorder
+    session.retention = RetentionEngine(
+        session_recorder, RetentionPolicy.from_env(),
+        categorize=lambda recording: session_recorder.catalog.category_of(recording) or DEFAULT_CATEGORY
+    )
+    if session.retention.policy.enabled:
+        session.retention.start()
+        session.on_close.append(session.retention.stop)
+    # Bring the search index up to date with recordings added while the session was not open
+    threading.Thread(
+        target=lambda: session_recorder.search.sync(session_recorder.list_recordings()), daemon=True).start()
+
+start_session_services(sessions.default)
+sessions.add_hook(start_session_services)
+sessions.start()
+analytics = Analytics(default_recorder.catalog, default_recorder.log_dir)
+default_recorder.deletions.add_hook(analytics.forget)
+
+def current_session():
+    """Session named by the X-Session-Id header or ?session= (the default session otherwise)"""
+    if not has_request_context():
+        return sessions.default
+    if 'recorder_session' not in g:
+        g.recorder_session = sessions.get(request.headers.get('X-Session-Id') or request.args.get('session'))
+    return g.recorder_session
+
+# Routes act on the recorder of the requested session
+recorder = LocalProxy(lambda: current_session().recorder)
+
+@app.before_request
+def resolve_session():
+    """Look the session up before any route runs, so routes catching every error cannot hide an unknown one"""
+    current_session()
+
+@app.errorhandler(UnknownSession)
+def unknown_session(e):
+    return jsonify({'status': 'error', 'message': str(e)}), 404
+
+@app.route('/sessions', methods=['GET', 'POST'])
+def recorder_sessions():
+    """
+    GET reports every session with its resource usage; POST opens session
+    'session_id' (generated when omitted) with recorder options 'compression'
+    and 'record_keyboard'.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify({'status': 'success', **sessions.usage()})
+        data = request.get_json(silent=True) or {}
+        options = {key: data[key] for key in ('compression', 'record_keyboard') if key in data}
+        session = sessions.create(data.get('session_id'), **options)
+        return jsonify({'status': 'success', 'session': session.usage()})
+    except SessionLimitReached as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/sessions/<session_id>', methods=['GET', 'DELETE'])
+def recorder_session(session_id):
+    """GET reports one session; DELETE closes an idle session, keeping its recordings"""
+    try:
+        if request.method == 'GET':
+            return jsonify({'status': 'success', 'session': sessions.get(session_id).usage()})
+        sessions.close(session_id)
+        return jsonify({'status': 'success', 'message': f'Closed session {session_id}'})
+    except UnknownSession as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/')
 def index():
@@ -28,16 +116,23 @@ def index():
 def start_button():
     """Handle start recording button"""
     try:
-        if not recorder.recording:
-            # Start recording in a non-blocking thread
-            recording_thread = threading.Thread(target=recorder.start_recording)
-            recording_thread.daemon = True
-            recording_thread.start()
-            return jsonify({
-                'status': 'success',
-                'message': 'Recording started',
-                'is_recording': True
-            })
+        data = request.get_json(silent=True) or {}
+        profile = bool(data.get('profile', False))
+        # Claim the recorder here so that of concurrent requests only one starts
+        recorder.begin_recording()
+        # Capture in a non-blocking thread
+        recording_thread = threading.Thread(
+            target=run_profiled,
+            args=(recorder.capture_until_stopped, 'recording', profile, 'sampling', PROFILE_DIR)
+        )
+        recording_thread.daemon = True
+        recording_thread.start()
+        return jsonify({
+            'status': 'success',
+            'message': 'Recording started',
+            'is_recording': True
+        })
+    except RecorderBusy:
         return jsonify({
             'status': 'error',
             'message': 'Recording already in progress'
@@ -77,6 +172,22 @@ def refresh_button():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def replay_options(data):
+    """Extract optional seek (start/end time or index), speed and idle-compression parameters from a request body"""
+    options = {}
+    for name, cast in (('start_time', float), ('end_time', float), ('start_index', int), ('end_index', int)):
+        if data.get(name) is not None:
+            options[name] = cast(data[name])
+    if 'fast_forward' in data:
+        options['fast_forward'] = bool(data['fast_forward'])
+    if data.get('speed') is not None:
+        options['speed'] = float(data['speed'])
+    if data.get('idle_threshold') is not None:
+        options['idle_threshold'] = float(data['idle_threshold'])
+    if data.get('max_idle') is not None:
+        options['max_idle'] = float(data['max_idle'])
+    return options
+
 @app.route('/replay_button', methods=['POST'])
 def replay_button():
     """Handle replay selected recording button"""
@@ -85,6 +196,8 @@ def replay_button():
         recording = data.get('recording')
         precision = data.get('precision', True)
         loop_count = int(data.get('loop_count', 1))
+        profile = bool(data.get('profile', False))
+        options = replay_options(data)
 
         if not recording:
             return jsonify({
@@ -102,8 +215,10 @@ def replay_button():
         
         # Start replay in a non-blocking thread
         replay_thread = threading.Thread(
-            target=recorder.replay_events,
-            args=(log_path, precision, None, loop_count)
+            target=run_profiled,
+            args=(recorder.replay_events, recording, profile, 'cprofile', PROFILE_DIR,
+                  log_path, precision, None, loop_count),
+            kwargs=options
         )
         replay_thread.daemon = True
         replay_thread.start()
@@ -115,57 +230,310 @@ def replay_button():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def delete_selection(data):
+    """Delete the recordings selected by a request body through the bulk deletion service."""
+    older_than = data.get('older_than_days')
+    return recorder.deletions.delete(
+        names=data.get('recordings') or None,
+        pattern=data.get('pattern'),
+        older_than_days=float(older_than) if older_than is not None else None
+    )
+
+def deletion_response(result):
+    deleted, failed = result['deleted'], result['failed']
+    if failed:
+        status = 'warning'
+        message = f"Deleted {len(deleted)} recording(s). Failed to delete {len(failed)} recording(s)."
+    else:
+        status = 'success'
+        message = f"Successfully deleted {len(deleted)} recording(s)."
+    return jsonify({
+        'status': status,
+        'message': message,
+        'deleted': deleted,
+        'failed': failed
+    })
+
 @app.route('/delete_button', methods=['POST'])
 def delete_button():
     """Handle delete selected recordings button"""
     try:
         data = request.json
-        recordings = data.get('recordings', [])
-
-        if not recordings:
+        if not data.get('recordings') and not data.get('pattern') and data.get('older_than_days') is None:
             return jsonify({
                 'status': 'error',
                 'message': 'No recordings selected for deletion'
             })
+        return deletion_response(delete_selection(data))
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
 
-        deleted = []
-        failed = []
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose recorder and replay metrics in Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype=metrics.CONTENT_TYPE)
 
-        for recording in recordings:
-            try:
-                file_path = os.path.join(recorder.log_dir, recording)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    deleted.append(recording)
-                else:
-                    failed.append(recording)
-            except Exception as e:
-                failed.append(recording)
-                print(f"Error deleting {recording}: {e}")
-
-        if failed:
-            status = 'warning'
-            message = f"Deleted {len(deleted)} recording(s). Failed to delete {len(failed)} recording(s)."
-        else:
-            status = 'success'
-            message = f"Successfully deleted {len(deleted)} recording(s)."
+@app.route('/replay_report/<recording>', methods=['GET'])
+def replay_report(recording):
+    """Return the timing-fidelity report of the last replay of a recording"""
+    try:
+        log_path = os.path.join(recorder.log_dir, secure_filename(recording))
+        report = load_report(log_path)
+        if report is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'No replay report for {recording}'
+            })
+        return jsonify({'status': 'success', 'report': report})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/dry_run', methods=['POST'])
+def dry_run_endpoint():
+    """Replay 'recording' against virtual input state and report anomalies, without a display"""
+    try:
+        data = request.json
+        recording = data.get('recording')
+        if recording not in recorder.list_recordings():
+            return jsonify({'status': 'error', 'message': 'Recording not found'})
+        report = dry_run(
+            os.path.join(recorder.log_dir, recording),
+            loop_count=int(data.get('loop_count', 1)),
+            **replay_options(data)
+        )
+        return jsonify({'status': 'success' if report['ok'] else 'warning', 'report': report})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/diff_recordings', methods=['GET'])
+def diff_recordings_endpoint():
+    """Inserted, removed and shifted segments between ?a= and ?b= (?tolerance= seconds)"""
+    try:
+        names = [request.args.get('a'), request.args.get('b')]
+        known = recorder.list_recordings()
+        missing = [name for name in names if name not in known]
+        if missing:
+            return jsonify({'status': 'error', 'message': f'Recording not found: {missing[0]}'})
+        result = diff_recordings(
+            *(os.path.join(recorder.log_dir, name) for name in names),
+            tolerance=float(request.args.get('tolerance', SHIFT_TOLERANCE))
+        )
+        return jsonify({'status': 'success', 'diff': result})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/splice_recordings', methods=['POST'])
+def splice_recordings():
+    """
+    Copy 'source' events between 'source_start' and 'source_end' into
+    'target' at 'at' (replacing target events up to 'replace_until') and
+    save the result as 'output'.
+    """
+    try:
+        data = request.json
+        known = recorder.list_recordings()
+        for name in (data.get('target'), data.get('source')):
+            if name not in known:
+                return jsonify({'status': 'error', 'message': f'Recording not found: {name}'})
+        output = secure_filename(data.get('output') or '')
+        if not output.endswith('.json'):
+            return jsonify({'status': 'error', 'message': 'Output must be a .json file name'})
+        spliced = splice(
+            load_recording(os.path.join(recorder.log_dir, data['target'])),
+            load_recording(os.path.join(recorder.log_dir, data['source'])),
+            float(data['source_start']),
+            float(data['source_end']),
+            float(data['at']),
+            float(data['replace_until']) if data.get('replace_until') is not None else None
+        )
+        recorder.store.save_bytes(serialize_recording(spliced), os.path.join(recorder.log_dir, output))
+        recorder.search.index_events(output, spliced['mouse_events'], spliced['keyboard_events'])
+        return jsonify({'status': 'success', 'message': f'Saved {output}', 'recording': output})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/segment_recording', methods=['POST'])
+def segment_recording():
+    """
+    Cut 'recording' into shared segments at idle gaps ('idle_gap' seconds),
+    after 'keys' or at 'times', and save it as playlist 'playlist'.
+    'replace': true then deletes the original recording.
+    """
+    try:
+        data = request.json
+        recording = data.get('recording')
+        if recording not in recorder.list_recordings():
+            return jsonify({'status': 'error', 'message': 'Recording not found'})
+        result = recorder.segments.segment_recording(
+            os.path.join(recorder.log_dir, recording),
+            playlist=data.get('playlist'),
+            idle_gap=float(data['idle_gap']) if data.get('idle_gap') is not None else None,
+            keys=data.get('keys'),
+            times=[float(t) for t in data.get('times') or []],
+            dedupe=data.get('dedupe', 'exact')
+        )
+        if data.get('replace'):
+            # The playlist now stands in for the recording; cloud copies stay
+            result['deleted'] = recorder.deletions.delete(names=[recording], sync_remote=False)['deleted']
+        return jsonify({'status': 'success', 'playlist': result})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/playlists', methods=['GET', 'POST', 'DELETE'])
+def playlists():
+    """
+    GET lists playlists and segment storage; POST saves playlist 'name' from
+    'items' ([{'segment': id, 'gap': seconds}]); DELETE removes playlist 'name'.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify({
+                'status': 'success',
+                'playlists': recorder.segments.playlists(),
+                'stats': recorder.segments.stats()
+            })
+        data = request.json
+        if request.method == 'POST':
+            playlist = recorder.segments.save_playlist(data['name'], data.get('items') or [])
+            return jsonify({'status': 'success', 'playlist': playlist})
+        result = recorder.segments.delete_playlist(data['name'])
+        return jsonify({'status': 'success', 'message': f"Deleted {data['name']}", **result})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/replay_playlist', methods=['POST'])
+def replay_playlist():
+    """Replay playlist 'playlist' with the options of /replay_button"""
+    try:
+        data = request.json
+        loop_count = int(data.get('loop_count', 1))
+        if loop_count < 1 or loop_count > 10:
+            return jsonify({'status': 'error', 'message': 'Loop count must be between 1 and 10'})
+        log_data = recorder.segments.compile(data['playlist'])
+        replay_thread = threading.Thread(
+            target=recorder.replay_events,
+            args=(recorder.segments.playlist_path(data['playlist']), data.get('precision', True), None, loop_count),
+            kwargs={**replay_options(data), 'log_data': log_data}
+        )
+        replay_thread.daemon = True
+        replay_thread.start()
+        return jsonify({'status': 'success', 'message': 'Replay started'})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/search', methods=['GET'])
+def search():
+    """
+    Search recording contents without opening them:
+    ?text=hello, ?key=ctrl+tab (repeatable), ?sequence=ctrl,c,
+    ?region=x0,y0,x1,y1, optionally narrowed by ?tag= / ?category=.
+    """
+    try:
+        started = time.perf_counter()
+        region = request.args.get('region')
+        sequence = request.args.get('sequence')
+        results = recorder.search.search(
+            text=request.args.get('text'),
+            keys=[key.replace(' ', '+') for key in request.args.getlist('key')],  # '+' arrives as a space
+            sequence=sequence.split(',') if sequence else None,
+            region=[float(v) for v in region.split(',')] if region else None
+        )
+        tags_filter = request.args.getlist('tag')
+        category = request.args.get('category')
+        if tags_filter or category:
+            allowed = recorder.catalog.select(tags_filter, category)
+            results = [r for r in results if r['recording'] in allowed]
         return jsonify({
-            'status': status,
-            'message': message,
-            'deleted': deleted,
-            'failed': failed
+            'status': 'success',
+            'results': results,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def session_analytics():
+    """Analytics over the requested session's recordings, created on first use"""
+    session = current_session()
+    if session is sessions.default:
+        return analytics
+    if getattr(session, 'analytics', None) is None:
+        session.analytics = Analytics(session.recorder.catalog, session.recorder.log_dir)
+        session.recorder.deletions.add_hook(session.analytics.forget)
+    return session.analytics
+
+@app.route('/analytics', methods=['GET'])
+def analytics_endpoint():
+    """
+    Aggregates and click heatmap of ?recording=name, or a rollup over the
+    library (narrowed by ?tag= / ?category=). ?grid=48x27 sets the heatmap
+    resolution, ?idle=2.0 the idle-gap threshold in seconds.
+    """
+    try:
+        grid = tuple(int(v) for v in request.args.get('grid', '').split('x')) if request.args.get('grid') else DEFAULT_GRID
+        idle = float(request.args.get('idle', IDLE_THRESHOLD))
+        recording = request.args.get('recording')
+        if recording:
+            if recording not in recorder.list_recordings():
+                return jsonify({'status': 'error', 'message': 'Recording not found'})
+            result = session_analytics().recording(recording, grid, idle)
+        else:
+            recordings = filtered_recordings(request.args.getlist('tag'), request.args.get('category'))
+            result = session_analytics().library(recordings, grid, idle)
+        return jsonify({'status': 'success', 'analytics': result})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/storage_stats', methods=['GET'])
+def storage_stats():
+    """Directory size, tier contents and retention progress"""
+    try:
+        return jsonify({'status': 'success', 'stats': current_session().retention.stats()})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/profiles', methods=['GET'])
+def profiles():
+    """List stored record/replay profiles"""
+    try:
+        return jsonify({'status': 'success', 'profiles': list_profiles(PROFILE_DIR)})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download a stored profile"""
+    try:
+        file_path = os.path.join(PROFILE_DIR, secure_filename(name))
+        if not os.path.exists(file_path):
+            return jsonify({'status': 'error', 'message': 'Profile not found'})
+        return send_file(file_path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+def recorder_status(target=None):
+    """Snapshot of a recorder's state (the requested session's by default) shared by the polling and push endpoints"""
+    if target is None:
+        target = recorder
+    return {
+        'state': target.state.state,
+        'is_recording': target.recording,
+        'is_paused': target.paused,
+        'budgets': target.budget_usage()
+    }
+
+@app.route('/stream_events', methods=['GET'])
+def stream_events():
+    """Stream events of the in-progress recording as batched Server-Sent Events"""
+    return Response(
+        stream_with_context(recorder.live_stream.sse()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/get_recording_status', methods=['GET'])
 def get_recording_status():
     """Get current recording status"""
-    return jsonify({
-        'is_recording': recorder.recording,
-        'is_paused': recorder.paused
-    })
+    return jsonify(recorder_status())
 
 @app.route('/start_recording', methods=['POST'])
 def start_recording():
@@ -184,11 +552,77 @@ def stop_recording():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def filtered_recordings(tags=None, category=None, match_all=True):
+    """List recordings, narrowed by catalog tags and/or category"""
+    return recorder.catalog.filter(recorder.list_recordings(), tags, category, match_all)
+
 @app.route('/list_recordings', methods=['GET'])
 def list_recordings():
+    """List recordings; ?tag=a&tag=b (&match=any) and ?category=c filter on the server"""
     try:
-        recordings = recorder.list_recordings()
-        return jsonify({'status': 'success', 'recordings': recordings})
+        recordings = filtered_recordings(
+            request.args.getlist('tag'),
+            request.args.get('category'),
+            request.args.get('match', 'all') != 'any'
+        )
+        return jsonify({
+            'status': 'success',
+            'recordings': recordings,
+            'categories': {r: recorder.catalog.category_of(r) for r in recordings}
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+def known_recordings(names):
+    """Split request names into existing recordings and unknown ones"""
+    existing = set(recorder.list_recordings())
+    return [n for n in names if n in existing], [n for n in names if n not in existing]
+
+@app.route('/set_category', methods=['POST'])
+def set_category():
+    """Assign one category to the given recordings (an empty category clears it)"""
+    try:
+        data = request.json
+        recordings, unknown = known_recordings(data.get('recordings', []))
+        if not recordings:
+            return jsonify({'status': 'error', 'message': 'No recordings selected'})
+        category = (data.get('category') or '').strip() or None
+        recorder.catalog.set_category(recordings, category)
+        message = (f"Category '{category}' set on {len(recordings)} recording(s)." if category
+                   else f"Category cleared on {len(recordings)} recording(s).")
+        return jsonify({'status': 'warning' if unknown else 'success', 'message': message, 'unknown': unknown})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+@app.route('/tags', methods=['GET', 'POST', 'DELETE'])
+def tags():
+    """
+    GET: tag and category counts (or the tags of ?recording=name).
+    POST / DELETE: bulk assign / unassign {'recordings': [...], 'tags': [...]}.
+    """
+    try:
+        if request.method == 'GET':
+            recording = request.args.get('recording')
+            if recording:
+                return jsonify({
+                    'status': 'success',
+                    'tags': recorder.catalog.tags_of(recording),
+                    'category': recorder.catalog.category_of(recording)
+                })
+            return jsonify({'status': 'success', **recorder.catalog.summary()})
+
+        data = request.json
+        recordings, unknown = known_recordings(data.get('recordings', []))
+        tag_names = data.get('tags', [])
+        if not recordings or not tag_names:
+            return jsonify({'status': 'error', 'message': 'Recordings and tags are required'})
+        if request.method == 'POST':
+            recorder.catalog.assign(recordings, tag_names)
+            message = f"Tagged {len(recordings)} recording(s)."
+        else:
+            recorder.catalog.unassign(recordings, tag_names)
+            message = f"Untagged {len(recordings)} recording(s)."
+        return jsonify({'status': 'warning' if unknown else 'success', 'message': message, 'unknown': unknown})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -205,44 +639,16 @@ def replay():
             return jsonify({'status': 'error', 'message': 'Loop count must be between 1 and 10'})
         
         log_path = os.path.join(recorder.log_dir, recording)
-        recorder.replay_events(log_path, precision_mode=precision, loop_count=loop_count)
+        recorder.replay_events(log_path, precision_mode=precision, loop_count=loop_count, **replay_options(data))
         return jsonify({'status': 'success', 'message': 'Replay completed'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
 @app.route('/delete_recordings', methods=['POST'])
 def delete_recordings():
+    """Bulk delete by 'recordings' list, glob 'pattern' and/or 'older_than_days'"""
     try:
-        data = request.json
-        recordings = data['recordings']
-        deleted = []
-        failed = []
-
-        for recording in recordings:
-            try:
-                file_path = os.path.join(recorder.log_dir, recording)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    deleted.append(recording)
-                else:
-                    failed.append(recording)
-            except Exception as e:
-                failed.append(recording)
-                print(f"Error deleting {recording}: {e}")
-
-        if failed:
-            message = f"Deleted {len(deleted)} recording(s). Failed to delete {len(failed)} recording(s)."
-            status = 'warning'
-        else:
-            message = f"Successfully deleted {len(deleted)} recording(s)."
-            status = 'success'
-
-        return jsonify({
-            'status': status,
-            'message': message,
-            'deleted': deleted,
-            'failed': failed
-        })
+        return deletion_response(delete_selection(request.json))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
@@ -250,21 +656,13 @@ def delete_recordings():
 @app.route('/toggle_pause', methods=['POST'])
 def toggle_pause():
     try:
-        if recorder.recording:
-            if recorder.paused:
-                recorder.resume_recording()
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Recording resumed',
-                    'is_paused': False
-                })
-            else:
-                recorder.pause_recording()
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Recording paused',
-                    'is_paused': True
-                })
+        paused = recorder.toggle_pause()
+        if paused is not None:
+            return jsonify({
+                'status': 'success',
+                'message': 'Recording paused' if paused else 'Recording resumed',
+                'is_paused': paused
+            })
         return jsonify({
             'status': 'error',
             'message': 'No recording in progress'
@@ -282,8 +680,7 @@ def export_recordings():
         for recording in recordings:
             file_path = os.path.join(recorder.log_dir, recording)
             if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    export_data[recording] = json.load(f)
+                export_data[recording] = load_recording(file_path)
 
         temp_file = os.path.join(recorder.log_dir, 'temp_export.json')
         with open(temp_file, 'w') as f:
@@ -298,6 +695,8 @@ def export_recordings():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+IMPORT_EXTENSIONS = ('.json', '.json.gz', '.json.zst', '.json.lz4')
+
 @app.route('/import_recordings', methods=['POST'])
 def import_recordings():
     try:
@@ -305,17 +704,20 @@ def import_recordings():
             return jsonify({'status': 'error', 'message': 'No file provided'})
 
         file = request.files['file']
-        if not file.filename.endswith('.json'):
+        if not file.filename.endswith(IMPORT_EXTENSIONS):
             return jsonify({'status': 'error', 'message': 'Invalid file type'})
 
-        import_data = json.loads(file.read())
+        # Compressed exports are recognised by their magic bytes
+        import_data = json.loads(decompress_bytes(file.read()))
         imported = 0
 
         for filename, data in import_data.items():
             safe_filename = secure_filename(filename)
             file_path = os.path.join(recorder.log_dir, safe_filename)
-            with open(file_path, 'w') as f:
-                json.dump(data, f)
+            # Chunks already in the store are not written again
+            recorder.store.save_bytes(serialize_recording(data), file_path)
+            recorder.search.index_events(safe_filename, data.get('mouse_events', []), data.get('keyboard_events', []))
+            imported += 1
         recordings = recorder.list_recordings()
         return jsonify({'status': 'success', 'message': 'Recordings imported successfully', 'recordings': recordings})
     except Exception as e:
@@ -334,9 +736,7 @@ def delete_recording():
                 'message': 'No recording selected for deletion'
             })
 
-        file_path = os.path.join(recorder.log_dir, recording)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if recorder.deletions.delete(names=[recording])['deleted']:
             return jsonify({
                 'status': 'success',
                 'message': f'Recording {recording} deleted successfully'
@@ -0,0 +1,327 @@
+"""
+Asyncio (ASGI) entry point for the recorder control server.
+
+Every route of the Flask app in ``app.py`` is served unchanged through a
+WSGI bridge whose views run on a thread pool, so long calls such as
+``/replay`` or ``/export_recordings`` never block the event loop. Live
+status is pushed natively:
+
+    GET  /status/stream   Server-Sent Events, one ``data:`` line per change
+    WS   /ws/status       JSON message per change
+    GET  /events/stream   Live recording events (see ``live_stream``), SSE
+    WS   /ws/events       Live recording events, websocket
+
+Like the Flask routes, each stream serves the session named by the
+``X-Session-Id`` header or ``?session=`` (the default session otherwise).
+Per session, a single broadcaster task publishes the recorder status after
+every state transition and fans it out to every subscriber, so the cost of
+status updates does not grow with the number of dashboard clients.
+
+Run with ``python asgi_app.py`` or ``uvicorn asgi_app:application``.
+"""
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app, recorder_status, sessions
+from recorder_state import RECORDING
+from sessions import UnknownSession
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+WSGI_WORKERS = int(os.environ.get('RECORDER_WSGI_WORKERS', '16'))
+# Event budgets fill up without a transition; refresh them this often while recording
+BUDGET_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15.0
+# Application close code (4000-4999) for a websocket naming an unknown session
+WS_UNKNOWN_SESSION = 4404
+
+
+class Broadcaster:
+    """
+    Fan-out of JSON payloads to many asyncio subscribers.
+
+    Each subscriber owns a small queue; when a slow client falls behind the
+    oldest pending payload is discarded so publishers never block.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 8,
+        replay_last: bool = True,
+        on_active: Optional[Callable[[bool], None]] = None
+    ):
+        """
+        Args:
+            max_pending (int): Payloads buffered per subscriber
+            replay_last (bool): Send the latest payload to new subscribers
+            on_active (Optional[Callable[[bool], None]]): Called with True when
+                the first subscriber arrives and False when the last one leaves
+        """
+        self.max_pending = max_pending
+        self.replay_last = replay_last
+        self.on_active = on_active
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.last: Optional[Dict[str, Any]] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.max_pending)
+        if self.replay_last and self.last is not None:
+            queue.put_nowait(self.last)
+        self._subscribers.add(queue)
+        if len(self._subscribers) == 1 and self.on_active is not None:
+            self.on_active(True)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue not in self._subscribers:
+            return
+        self._subscribers.discard(queue)
+        if not self._subscribers and self.on_active is not None:
+            self.on_active(False)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, payload: Dict[str, Any]) -> None:
+        self.last = payload
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+
+class SessionFeeds:
+    """
+    Status and live-event broadcasters of one recorder session.
+
+    The status task and the live-stream forwarder only run while the
+    matching broadcaster has subscribers.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.status = Broadcaster(on_active=self._toggle_status)
+        self.events = Broadcaster(max_pending=64, replay_last=False, on_active=self._toggle_events)
+        self._status_task: Optional[asyncio.Future] = None
+        self._forwarder: Optional[Callable[[str], None]] = None
+
+    @property
+    def idle(self) -> bool:
+        return not self.status.subscriber_count and not self.events.subscriber_count
+
+    def _toggle_status(self, active: bool) -> None:
+        if active:
+            self._status_task = asyncio.ensure_future(self._publish_status())
+        elif self._status_task is not None:
+            self._status_task.cancel()
+            self._status_task = None
+            # Do not greet the next subscriber with a stale status
+            self.status.last = None
+
+    def _toggle_events(self, active: bool) -> None:
+        """Attach to the recorder's live stream only while websocket/SSE clients listen."""
+        live_stream = self.session.recorder.live_stream
+        if active:
+            loop = asyncio.get_running_loop()
+
+            def forward_batch(payload: str) -> None:
+                # Runs on the live stream's flusher thread
+                loop.call_soon_threadsafe(self.events.publish, json.loads(payload))
+
+            self._forwarder = forward_batch
+            live_stream.add_listener(forward_batch)
+        elif self._forwarder is not None:
+            live_stream.remove_listener(self._forwarder)
+            self._forwarder = None
+
+    async def _publish_status(self) -> None:
+        """Publish the recorder status after every state transition."""
+        recorder = self.session.recorder
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def on_transition(state: str) -> None:
+            # Runs on whichever thread made the transition
+            loop.call_soon_threadsafe(changed.set)
+
+        recorder.state.add_listener(on_transition)
+        previous = None
+        try:
+            while True:
+                changed.clear()
+                status = recorder_status(recorder)
+                if status != previous:
+                    self.status.publish(status)
+                    previous = status
+                timeout = BUDGET_INTERVAL if status['state'] == RECORDING else None
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            recorder.state.remove_listener(on_transition)
+
+    def close(self) -> None:
+        self._toggle_status(False)
+        self._toggle_events(False)
+
+
+# Feeds of sessions with subscribers, by session id
+_feeds: Dict[str, SessionFeeds] = {}
+
+
+def session_feeds(scope: Scope) -> SessionFeeds:
+    """
+    Feeds of the session named by the X-Session-Id header or ?session= (the
+    default session otherwise).
+
+    Raises:
+        UnknownSession: If the session is not open
+    """
+    headers = dict(scope.get('headers') or [])
+    query = parse_qs(scope.get('query_string', b'').decode())
+    session = sessions.get(headers.get(b'x-session-id', b'').decode() or query.get('session', [None])[0])
+    for session_id in [key for key, feeds in _feeds.items() if feeds.idle and key != session.id]:
+        del _feeds[session_id]
+    feeds = _feeds.get(session.id)
+    # A session evicted and opened again under the same id has a new recorder
+    if feeds is None or feeds.session is not session:
+        feeds = _feeds[session.id] = SessionFeeds(session)
+    return feeds
+
+
+async def _wait_for_disconnect(receive: Receive, disconnect_type: str) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == disconnect_type:
+            return
+
+
+async def stream_sse(broadcaster: Broadcaster, scope: Scope, receive: Receive, send: Send) -> None:
+    """Stream a broadcaster to an HTTP client as Server-Sent Events."""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+    queue = broadcaster.subscribe()
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive, 'http.disconnect'))
+    try:
+        while not disconnected.done():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected}, timeout=HEARTBEAT_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                body = f"data: {json.dumps(getter.result(), separators=(',', ':'))}\n\n"
+            else:
+                getter.cancel()
+                body = ': keep-alive\n\n'
+            if disconnected.done():
+                break
+            await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        broadcaster.unsubscribe(queue)
+
+
+async def stream_websocket(broadcaster: Broadcaster, scope: Scope, receive: Receive, send: Send) -> None:
+    """Stream a broadcaster to a websocket client, one JSON text frame per payload."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+    queue = broadcaster.subscribe()
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive, 'websocket.disconnect'))
+    try:
+        while not disconnected.done():
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            await send({'type': 'websocket.send', 'text': json.dumps(getter.result(), separators=(',', ':'))})
+    finally:
+        disconnected.cancel()
+        broadcaster.unsubscribe(queue)
+
+
+async def _lifespan(scope: Scope, receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            for feeds in list(_feeds.values()):
+                feeds.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def _not_found(send: Send, message: str) -> None:
+    body = json.dumps({'status': 'error', 'message': message}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 404,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+wsgi_application = WSGIMiddleware(flask_app, workers=WSGI_WORKERS)
+
+# Native async routes, given the requested session's feeds; everything else
+# falls through to the Flask app.
+Route = Callable[[SessionFeeds, Scope, Receive, Send], Awaitable[None]]
+HTTP_ROUTES: Dict[str, Route] = {
+    '/status/stream': lambda feeds, scope, receive, send: stream_sse(feeds.status, scope, receive, send),
+    '/events/stream': lambda feeds, scope, receive, send: stream_sse(feeds.events, scope, receive, send),
+}
+WEBSOCKET_ROUTES: Dict[str, Route] = {
+    '/ws/status': lambda feeds, scope, receive, send: stream_websocket(feeds.status, scope, receive, send),
+    '/ws/events': lambda feeds, scope, receive, send: stream_websocket(feeds.events, scope, receive, send),
+}
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    """ASGI entry point."""
+    if scope['type'] == 'lifespan':
+        await _lifespan(scope, receive, send)
+    elif scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await send({'type': 'websocket.close', 'code': 1000})
+            return
+        try:
+            feeds = session_feeds(scope)
+        except UnknownSession:
+            await send({'type': 'websocket.close', 'code': WS_UNKNOWN_SESSION})
+            return
+        await handler(feeds, scope, receive, send)
+    else:
+        handler = HTTP_ROUTES.get(scope['path'])
+        if handler is None:
+            await wsgi_application(scope, receive, send)
+            return
+        try:
+            feeds = session_feeds(scope)
+        except UnknownSession as e:
+            await _not_found(send, str(e))
+            return
+        await handler(feeds, scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', '5000')))
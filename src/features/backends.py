@@ -0,0 +1,450 @@
+"""
+Input injection backends for replay.
+
+Replay talks to an :class:`InputBackend` instead of calling pynput or
+pyautogui directly. Backends:
+
+    xtest      Direct XTest requests through python-xlib. Requests are
+               queued in the client's output buffer and sent in one write
+               by :meth:`flush`, which the replay scheduler calls once per
+               tick (before it sleeps) instead of once per event.
+    pynput     pynput controllers (one X round trip per event).
+    pyautogui  pyautogui calls, with its per-call pause disabled.
+    stub       Records every call in ``calls``; used for tests.
+    virtual    Tracks cursor, held keys and buttons and scroll totals in
+               memory and flags impossible input; used by ``dry_run.py``.
+
+:func:`replay_mouse_event` and :func:`replay_keyboard_event` translate
+recorded events into backend calls for live replay and dry runs alike.
+:func:`create_backend` picks the configured backend
+(``RECORDER_INPUT_BACKEND``, default 'xtest') and falls back to pynput and
+then pyautogui when it cannot be initialised.
+
+Keys use the names recordings store: single characters ('a', 'A'),
+pynput names ('Key.enter', 'Key.ctrl_l') or bare names ('ctrl', 'tab').
+Buttons are 'left', 'right' or 'middle'.
+"""
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_BACKEND = 'xtest'
+# Queued events after which a backend flushes on its own, so unpaced
+# replays still reach the server in bounded batches
+AUTO_FLUSH_EVENTS = 512
+
+logger = logging.getLogger(__name__)
+
+
+def key_name(key: str) -> str:
+    """'Key.enter' -> 'enter'; characters and bare names are returned as is."""
+    return key[4:] if key.startswith('Key.') else key
+
+
+def button_name(button: str) -> str:
+    """'Button.left' -> 'left'."""
+    button = button.lower()
+    for name in ('left', 'right', 'middle'):
+        if name in button:
+            return name
+    return 'left'
+
+
+class InputBackend:
+    """Base class of input injection backends."""
+
+    name = 'base'
+
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def move(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def button(self, button: str, pressed: bool) -> None:
+        raise NotImplementedError
+
+    def scroll(self, dx: int, dy: int) -> None:
+        raise NotImplementedError
+
+    def key(self, key: str, pressed: bool) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Deliver queued input; a no-op for unbuffered backends."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class StubBackend(InputBackend):
+    """Records calls instead of injecting input."""
+
+    name = 'stub'
+
+    def __init__(self, size: Tuple[int, int] = (1920, 1080)):
+        self.size = size
+        self.calls: List[Tuple[Any, ...]] = []
+        self.flushes = 0
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self.size
+
+    def move(self, x: int, y: int) -> None:
+        self.calls.append(('move', x, y))
+
+    def button(self, button: str, pressed: bool) -> None:
+        self.calls.append(('button', button, pressed))
+
+    def scroll(self, dx: int, dy: int) -> None:
+        self.calls.append(('scroll', dx, dy))
+
+    def key(self, key: str, pressed: bool) -> None:
+        self.calls.append(('key', key, pressed))
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+class VirtualBackend(InputBackend):
+    """
+    In-memory input state: cursor position, held keys and buttons and
+    scroll totals. Input that a real device could not produce (releasing
+    something that is not held, pressing a held button, moving off screen)
+    is appended to ``anomalies`` instead of raising.
+    """
+
+    name = 'virtual'
+
+    def __init__(self, size: Tuple[int, int] = (1920, 1080)):
+        self.size = size
+        self.cursor: Optional[Tuple[int, int]] = None
+        self.keys: Dict[str, int] = {}
+        self.buttons: Dict[str, int] = {}
+        self.scrolled = [0, 0]
+        self.counts = {'moves': 0, 'button_presses': 0, 'key_presses': 0, 'key_repeats': 0, 'scrolls': 0}
+        self.anomalies: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _key_id(key: str) -> str:
+        # Shifted characters are released under their unshifted name when
+        # Shift goes up first; both map to the same key
+        name = key_name(key)
+        return name.lower() if len(name) == 1 else name
+
+    def _flag(self, kind: str, detail: Any) -> None:
+        self.anomalies.append({'kind': kind, 'detail': detail})
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self.size
+
+    def move(self, x: int, y: int) -> None:
+        if not (0 <= x < self.size[0] and 0 <= y < self.size[1]):
+            self._flag('out_of_bounds', [x, y])
+        self.cursor = (x, y)
+        self.counts['moves'] += 1
+
+    def button(self, button: str, pressed: bool) -> None:
+        if pressed:
+            if button in self.buttons:
+                self._flag('button_already_pressed', button)
+            self.buttons[button] = self.buttons.get(button, 0) + 1
+            self.counts['button_presses'] += 1
+        elif self.buttons.pop(button, None) is None:
+            self._flag('button_release_without_press', button)
+
+    def scroll(self, dx: int, dy: int) -> None:
+        self.scrolled[0] += dx
+        self.scrolled[1] += dy
+        self.counts['scrolls'] += 1
+
+    def key(self, key: str, pressed: bool) -> None:
+        key_id = self._key_id(key)
+        if pressed:
+            # Auto-repeat records further keydowns while a key is held
+            if key_id in self.keys:
+                self.counts['key_repeats'] += 1
+            else:
+                self.counts['key_presses'] += 1
+            self.keys[key_id] = self.keys.get(key_id, 0) + 1
+        elif self.keys.pop(key_id, None) is None:
+            self._flag('key_release_without_press', key_id)
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot of the input state (JSON-serialisable)."""
+        return {
+            'cursor': list(self.cursor) if self.cursor is not None else None,
+            'keys_pressed': sorted(self.keys),
+            'buttons_pressed': sorted(self.buttons),
+            'scroll': list(self.scrolled),
+            'counts': dict(self.counts)
+        }
+
+
+class PynputBackend(InputBackend):
+    """Injects input through pynput controllers."""
+
+    name = 'pynput'
+
+    def __init__(self):
+        import pyautogui
+        from pynput.keyboard import Controller as KeyboardController, Key
+        from pynput.mouse import Button, Controller as MouseController
+        self._key = Key
+        self._button = Button
+        self.mouse = MouseController()
+        self.keyboard = KeyboardController()
+        self._size = tuple(pyautogui.size())
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._size
+
+    def _resolve(self, key: str):
+        name = key_name(key)
+        if len(name) == 1:
+            return name
+        return getattr(self._key, name, name)
+
+    def move(self, x: int, y: int) -> None:
+        self.mouse.position = (x, y)
+
+    def button(self, button: str, pressed: bool) -> None:
+        target = getattr(self._button, button)
+        if pressed:
+            self.mouse.press(target)
+        else:
+            self.mouse.release(target)
+
+    def scroll(self, dx: int, dy: int) -> None:
+        self.mouse.scroll(dx, dy)
+
+    def key(self, key: str, pressed: bool) -> None:
+        resolved = self._resolve(key)
+        if pressed:
+            self.keyboard.press(resolved)
+        else:
+            self.keyboard.release(resolved)
+
+
+class PyautoguiBackend(InputBackend):
+    """Injects input through pyautogui, skipping its per-call pause."""
+
+    name = 'pyautogui'
+    _KEYS = {
+        'ctrl_l': 'ctrlleft', 'ctrl_r': 'ctrlright', 'shift_l': 'shiftleft', 'shift_r': 'shiftright',
+        'alt_l': 'altleft', 'alt_r': 'altright', 'alt_gr': 'altright', 'cmd': 'win', 'cmd_l': 'winleft',
+        'cmd_r': 'winright', 'caps_lock': 'capslock', 'page_up': 'pageup', 'page_down': 'pagedown',
+        'num_lock': 'numlock', 'scroll_lock': 'scrolllock', 'print_screen': 'printscreen',
+    }
+
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+        self._size = tuple(pyautogui.size())
+        self._position = (0, 0)
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._size
+
+    def move(self, x: int, y: int) -> None:
+        self._position = (x, y)
+        self.pyautogui.moveTo(x, y, duration=0, _pause=False)
+
+    def button(self, button: str, pressed: bool) -> None:
+        x, y = self._position
+        if pressed:
+            self.pyautogui.mouseDown(x, y, button=button, duration=0, _pause=False)
+        else:
+            self.pyautogui.mouseUp(x, y, button=button, duration=0, _pause=False)
+
+    def scroll(self, dx: int, dy: int) -> None:
+        if dy:
+            self.pyautogui.scroll(dy, _pause=False)
+        if dx:
+            self.pyautogui.hscroll(dx, _pause=False)
+
+    def key(self, key: str, pressed: bool) -> None:
+        name = key_name(key)
+        name = self._KEYS.get(name, name)
+        if pressed:
+            self.pyautogui.keyDown(name, _pause=False)
+        else:
+            self.pyautogui.keyUp(name, _pause=False)
+
+
+class XTestBackend(InputBackend):
+    """
+    Injects input with XTest fake_input requests over one X connection.
+
+    Requests are buffered by python-xlib and written by :meth:`flush`.
+    Characters without a keycode in the current keymap are typed through a
+    pynput controller, which remaps a spare keycode for them.
+    """
+
+    name = 'xtest'
+    _KEYSYMS = {
+        'enter': 'Return', 'backspace': 'BackSpace', 'tab': 'Tab', 'space': 'space', 'esc': 'Escape',
+        'delete': 'Delete', 'insert': 'Insert', 'home': 'Home', 'end': 'End', 'page_up': 'Prior',
+        'page_down': 'Next', 'up': 'Up', 'down': 'Down', 'left': 'Left', 'right': 'Right',
+        'shift': 'Shift_L', 'shift_l': 'Shift_L', 'shift_r': 'Shift_R',
+        'ctrl': 'Control_L', 'ctrl_l': 'Control_L', 'ctrl_r': 'Control_R',
+        'alt': 'Alt_L', 'alt_l': 'Alt_L', 'alt_r': 'Alt_R', 'alt_gr': 'ISO_Level3_Shift',
+        'cmd': 'Super_L', 'cmd_l': 'Super_L', 'cmd_r': 'Super_R', 'caps_lock': 'Caps_Lock',
+        'num_lock': 'Num_Lock', 'scroll_lock': 'Scroll_Lock', 'print_screen': 'Print',
+        'pause': 'Pause', 'menu': 'Menu',
+    }
+    _BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+    def __init__(self, display_name: Optional[str] = None):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X server has no XTEST extension")
+        screen = self.display.screen()
+        self._size = (screen.width_in_pixels, screen.height_in_pixels)
+        self._keycodes = {}
+        self._fallback = None
+        self._pending = 0
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._size
+
+    def _fake(self, event_type: int, detail: int = 0, **kwargs) -> None:
+        self.xtest.fake_input(self.display, event_type, detail, **kwargs)
+        self._pending += 1
+        if self._pending >= AUTO_FLUSH_EVENTS:
+            self.flush()
+
+    def _keycode(self, key: str) -> Tuple[int, bool]:
+        """Keycode of a recorded key name and whether it needs Shift."""
+        cached = self._keycodes.get(key)
+        if cached is not None:
+            return cached
+        name = key_name(key)
+        if len(name) == 1:
+            keysym = ord(name) if ord(name) < 0x100 else 0x01000000 | ord(name)
+        else:
+            keysym = self.XK.string_to_keysym(self._KEYSYMS.get(name, name.capitalize() if name.startswith('f') else name))
+        keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+        shift = bool(keycode) and self.display.keycode_to_keysym(keycode, 0) != keysym \
+            and self.display.keycode_to_keysym(keycode, 1) == keysym
+        self._keycodes[key] = (keycode, shift)
+        return keycode, shift
+
+    def move(self, x: int, y: int) -> None:
+        self._fake(self.X.MotionNotify, x=x, y=y)
+
+    def button(self, button: str, pressed: bool) -> None:
+        self._fake(self.X.ButtonPress if pressed else self.X.ButtonRelease, self._BUTTONS[button])
+
+    def scroll(self, dx: int, dy: int) -> None:
+        # Wheel clicks are buttons 4/5 (vertical) and 6/7 (horizontal)
+        for amount, positive, negative in ((dy, 4, 5), (dx, 7, 6)):
+            button = positive if amount > 0 else negative
+            for _ in range(abs(int(amount))):
+                self._fake(self.X.ButtonPress, button)
+                self._fake(self.X.ButtonRelease, button)
+
+    def key(self, key: str, pressed: bool) -> None:
+        keycode, shift = self._keycode(key)
+        if not keycode:
+            self.flush()
+            if self._fallback is None:
+                self._fallback = PynputBackend()
+            self._fallback.key(key, pressed)
+            return
+        if shift and pressed:
+            self._fake(self.X.KeyPress, self._keycode('shift')[0])
+        self._fake(self.X.KeyPress if pressed else self.X.KeyRelease, keycode)
+        if shift and not pressed:
+            self._fake(self.X.KeyRelease, self._keycode('shift')[0])
+
+    def flush(self) -> None:
+        if self._pending:
+            self.display.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.display.close()
+
+
+BACKENDS = {
+    'xtest': XTestBackend,
+    'pynput': PynputBackend,
+    'pyautogui': PyautoguiBackend,
+    'stub': StubBackend,
+    'virtual': VirtualBackend,
+}
+FALLBACK_ORDER = ('xtest', 'pynput', 'pyautogui')
+
+
+def create_backend(name: Optional[str] = None) -> InputBackend:
+    """
+    Instantiate the named backend (default $RECORDER_INPUT_BACKEND, read at
+    call time, or ``DEFAULT_BACKEND``), falling back along ``FALLBACK_ORDER``
+    when it cannot be initialised.
+    """
+    name = name or os.environ.get('RECORDER_INPUT_BACKEND') or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name not in FALLBACK_ORDER:
+        return BACKENDS[name]()
+    candidates = [name] + [fallback for fallback in FALLBACK_ORDER if fallback != name]
+    if sys.platform == 'win32':
+        candidates = [candidate for candidate in candidates if candidate != 'xtest']
+    errors = []
+    for candidate in candidates:
+        try:
+            backend = BACKENDS[candidate]()
+        except Exception as e:
+            errors.append(f"{candidate}: {e}")
+            continue
+        if candidate != name:
+            logger.warning(f"Input backend '{name}' unavailable, using '{candidate}' ({'; '.join(errors)})")
+        return backend
+    raise RuntimeError(f"No input backend available ({'; '.join(errors)})")
+
+
+def replay_mouse_event(backend: InputBackend, event: Dict[str, Any]) -> None:
+    """Inject a recorded mouse event, scaled to the backend's screen size."""
+    original_resolution = event.get('screen_resolution') or (1920, 1080)
+    current_resolution = backend.screen_size()
+
+    x, y = event['pos']
+    scaled_x = int(x * (current_resolution[0] / original_resolution[0]))
+    scaled_y = int(y * (current_resolution[1] / original_resolution[1]))
+
+    if event['type'] == 'move':
+        backend.move(scaled_x, scaled_y)
+    elif event['type'] == 'click':
+        # Move instantly then click
+        backend.move(scaled_x, scaled_y)
+        backend.button(button_name(event['button']), event['pressed'])
+    elif event['type'] == 'scroll':
+        if event.get('trackpad', False):
+            # Simulate trackpad scroll using Shift + Space bar and Down arrow key
+            for key, pressed in (('Key.shift', True), ('Key.space', True), ('Key.space', False),
+                                 ('Key.shift', False), ('Key.down', True), ('Key.down', False)):
+                backend.key(key, pressed)
+        else:
+            backend.scroll(0, event['dy'])
+
+
+def replay_keyboard_event(backend: InputBackend, event: Dict[str, Any]) -> None:
+    """Inject a recorded keyboard event; a keypress is a press and a release."""
+    event_type = event['type']
+    key = event['key']
+    if event_type == 'keydown':
+        backend.key(key, True)
+    elif event_type == 'keyup':
+        backend.key(key, False)
+    elif event_type == 'keypress':
+        backend.key(key, True)
+        backend.key(key, False)
@@ -0,0 +1,202 @@
+"""
+Non-interactive batch replay for regression suites.
+
+Usage:
+    python batch_runner.py manifest.json [--workers N] [--summary summary.json]
+
+The manifest lists the recordings to replay::
+
+    {
+      "log_dir": "../user_action_logs",          (optional)
+      "max_p95_lateness": 0.05,                  (optional, seconds)
+      "recordings": [
+        {"recording": "user_actions_2024_1.json", "loop_count": 2, "speed": 1.5},
+        {"recording": "user_actions_2024_2.json", "precision": false},
+        {"recording": "user_actions_2024_3.json", "idle_threshold": 2.0, "max_idle": 0.5}
+      ]
+    }
+
+Recordings can also be selected from the catalog (see ``catalog.py``)
+by tag and/or category; ``defaults`` then supplies their replay options::
+
+    {"tags": ["smoke"], "category": "testing", "match": "all", "defaults": {"speed": 2.0}}
+
+A bare list of entries is accepted too. Runs are spread over a process
+pool; each worker process imports the recorder, which starts its own
+virtual display (see ``new_.py``), so replays never share an X server.
+The summary holds per-run timing and fidelity results and the process
+exits non-zero if any run failed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from catalog import Catalog
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'user_action_logs')
+
+_recorder = None
+
+
+def _init_worker(log_dir: str) -> None:
+    """Create this worker's recorder (and, via the import, its own virtual display)."""
+    global _recorder
+    import atexit
+    import new_
+    if getattr(new_, 'display', None) is not None:
+        atexit.register(new_.display.stop)
+    _recorder = new_.PreciseActionRecorder(log_dir=log_dir)
+
+
+def _run_entry(entry: Dict[str, Any], max_p95_lateness: Optional[float]) -> Dict[str, Any]:
+    """Replay one manifest entry and summarise the outcome."""
+    recording = entry['recording']
+    log_path = os.path.join(_recorder.log_dir, os.path.basename(recording))
+    result: Dict[str, Any] = {
+        'recording': recording,
+        'loop_count': int(entry.get('loop_count', 1)),
+        'speed': float(entry.get('speed', 1.0)),
+        'worker_pid': os.getpid()
+    }
+    started = time.perf_counter()
+    _recorder.stop_replay = False
+    try:
+        report = _recorder.replay_events(
+            log_path,
+            precision_mode=bool(entry.get('precision', True)),
+            loop_count=result['loop_count'],
+            start_time=entry.get('start_time'),
+            end_time=entry.get('end_time'),
+            speed=result['speed'],
+            idle_threshold=entry.get('idle_threshold'),
+            max_idle=float(entry.get('max_idle', 1.0))
+        )
+    except Exception as e:
+        report = None
+        result['error'] = str(e)
+    result['wall_time'] = round(time.perf_counter() - started, 3)
+
+    if report is None:
+        result['status'] = 'failed'
+        result.setdefault('error', 'replay failed (see worker log)')
+        return result
+
+    result['fidelity'] = {
+        'total_events': report['total_events'],
+        'idle_time_saved': report.get('idle_compression', {}).get('wall_time_saved', 0.0),
+        'throughput_eps': report['throughput_eps'],
+        'lateness': report['lateness'],
+        'drift': [loop['drift'] for loop in report['loops']]
+    }
+    if not report['completed']:
+        result['status'] = 'failed'
+        result['error'] = 'replay did not complete'
+    elif max_p95_lateness is not None and report['lateness']['p95'] > max_p95_lateness:
+        result['status'] = 'failed'
+        result['error'] = f"p95 lateness {report['lateness']['p95']:.4f}s exceeds {max_p95_lateness}s"
+    else:
+        result['status'] = 'passed'
+    return result
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Read a manifest file, normalising a bare list into ``{'recordings': [...]}``."""
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'recordings': manifest}
+    if 'recordings' not in manifest and not manifest.get('tags') and not manifest.get('category'):
+        raise ValueError("Manifest needs 'recordings' or a 'tags'/'category' selection")
+    for entry in manifest.get('recordings', []):
+        if 'recording' not in entry:
+            raise ValueError(f"Manifest entry without 'recording': {entry}")
+    return manifest
+
+
+def select_entries(manifest: Dict[str, Any], log_dir: str) -> List[Dict[str, Any]]:
+    """Explicit manifest entries followed by the recordings matching its catalog selection."""
+    entries = list(manifest.get('recordings', []))
+    if not manifest.get('tags') and not manifest.get('category'):
+        return entries
+    catalog = Catalog.for_log_dir(log_dir)
+    try:
+        selected = catalog.select(manifest.get('tags'), manifest.get('category'), manifest.get('match', 'all') != 'any')
+    finally:
+        catalog.close()
+    explicit = {entry['recording'] for entry in entries}
+    defaults = manifest.get('defaults', {})
+    for recording in sorted(selected - explicit):
+        if os.path.exists(os.path.join(log_dir, recording)):
+            entries.append({**defaults, 'recording': recording})
+    return entries
+
+
+def run_batch(manifest: Dict[str, Any], workers: Optional[int] = None, log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replay every manifest entry across a process pool.
+
+    Args:
+        manifest (Dict[str, Any]): Parsed manifest
+        workers (Optional[int]): Pool size (defaults to the CPU count)
+        log_dir (Optional[str]): Directory containing the recordings
+
+    Returns:
+        Dict[str, Any]: Summary with per-run results
+    """
+    log_dir = log_dir or manifest.get('log_dir') or DEFAULT_LOG_DIR
+    entries = select_entries(manifest, log_dir)
+    max_p95 = manifest.get('max_p95_lateness')
+    workers = max(1, min(workers or os.cpu_count() or 1, len(entries) or 1))
+
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    # 'spawn' so no worker inherits the parent's X connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(log_dir,)) as pool:
+        futures = {pool.submit(_run_entry, entry, max_p95): i for i, entry in enumerate(entries)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'recording': entries[index]['recording'], 'status': 'failed', 'error': str(e)}
+            result['index'] = index
+            results.append(result)
+            print(f"[{result['status']}] {result['recording']} ({result.get('wall_time', 0)}s)")
+
+    results.sort(key=lambda r: r['index'])
+    failed = [r for r in results if r['status'] != 'passed']
+    return {
+        'workers': workers,
+        'total_runs': len(results),
+        'passed': len(results) - len(failed),
+        'failed': len(failed),
+        'wall_time': round(time.perf_counter() - started, 3),
+        'results': results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a manifest of recordings in parallel")
+    parser.add_argument('manifest', help="Path to the manifest JSON file")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--summary', default='replay_summary.json', help="Where to write the summary")
+    parser.add_argument('--log-dir', default=None, help="Directory containing the recordings")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(load_manifest(args.manifest), args.workers, args.log_dir)
+    with open(args.summary, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"{summary['passed']}/{summary['total_runs']} runs passed in {summary['wall_time']}s "
+          f"on {summary['workers']} workers. Summary written to {args.summary}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compare compression codecs on real recordings.
+
+Usage:
+    python bench_compression.py [recordings ...] [--log-dir DIR] [--repeat N] [--json out.json]
+
+Without explicit paths every recording in the log directory is used. For
+each available codec (see ``compression.py``) the report shows the
+compression ratio, one-shot compression and decompression throughput and
+the time until the first bytes of a streamed read are available, which is
+what bounds how quickly a replay can start.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from compression import CODECS
+from recording_index import SIDECAR_SUFFIXES
+from storage import read_recording_bytes
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'user_action_logs')
+
+
+def _best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark(corpus: List[bytes], repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Measure every available codec on ``corpus``.
+
+    Returns:
+        List[Dict[str, Any]]: One row per codec with ratio and throughput (MB/s)
+    """
+    raw_size = sum(len(data) for data in corpus)
+    megabytes = raw_size / 1e6
+    rows = []
+    for name, codec in CODECS.items():
+        compressed = [codec.compress(data) for data in corpus]
+        compressed_size = sum(len(data) for data in compressed)
+        compress_time = _best_time(lambda: [codec.compress(data) for data in corpus], repeat)
+        decompress_time = _best_time(lambda: [codec.decompress(data) for data in compressed], repeat)
+        first_read = _best_time(lambda: [codec.reader(io.BytesIO(data)).read(4096) for data in compressed], repeat)
+        rows.append({
+            'codec': name,
+            'raw_bytes': raw_size,
+            'compressed_bytes': compressed_size,
+            'ratio': round(raw_size / compressed_size, 2) if compressed_size else 0.0,
+            'compress_mb_s': round(megabytes / compress_time, 1) if compress_time else 0.0,
+            'decompress_mb_s': round(megabytes / decompress_time, 1) if decompress_time else 0.0,
+            'first_read_ms': round(first_read * 1000 / len(corpus), 3)
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark recording compression codecs")
+    parser.add_argument('recordings', nargs='*', help="Recording files (default: all in --log-dir)")
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR, help="Directory containing the recordings")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per measurement (best is kept)")
+    parser.add_argument('--json', default=None, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    paths = args.recordings or [
+        os.path.join(args.log_dir, f) for f in sorted(os.listdir(args.log_dir))
+        if f.endswith('.json') and not f.endswith(SIDECAR_SUFFIXES)
+    ]
+    if not paths:
+        print("No recordings found.")
+        return 1
+    corpus = [read_recording_bytes(path) for path in paths]
+    rows = benchmark(corpus, args.repeat)
+
+    print(f"{len(corpus)} recording(s), {sum(len(d) for d in corpus) / 1e6:.2f} MB uncompressed")
+    print(f"{'codec':<6} {'ratio':>7} {'compress MB/s':>14} {'decompress MB/s':>16} {'first read ms':>14}")
+    for row in rows:
+        print(f"{row['codec']:<6} {row['ratio']:>7} {row['compress_mb_s']:>14} "
+              f"{row['decompress_mb_s']:>16} {row['first_read_ms']:>14}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+# stop             - keep the first ``capacity`` events, drop anything newer
+# ring             - keep the newest ``capacity`` events, drop the oldest
+# drop_moves_first - when full, evict the oldest mouse moves in a batch; behaves
+#                    like 'stop' once only clicks/scrolls/keys remain
+# spill            - keep at most ``capacity`` events in memory and append the
+#                    overflow to a JSON-lines file on disk (bounded memory,
+#                    unbounded disk)
+OVERFLOW_POLICIES = ('stop', 'ring', 'drop_moves_first', 'spill')
+
+# Fraction of the capacity evicted at once by 'drop_moves_first', so the O(n)
+# compaction pass is amortised over many appends.
+MOVE_EVICTION_FRACTION = 0.1
+
+
+class EventBuffer:
+    """
+    Bounded, list-like event store for a single input stream.
+
+    Supports the operations the recorder relies on (``append``, ``clear``,
+    ``len``, iteration, truthiness and ``[-1]``) so it can stand in for the
+    plain lists previously used for ``mouse_events``/``keyboard_events``.
+    """
+
+    def __init__(self, stream: str, capacity: int, policy: str = 'stop', spill_dir: Optional[str] = None):
+        """
+        Args:
+            stream (str): Stream name, used in reports and spill filenames
+            capacity (int): Maximum number of events held in memory
+            policy (str): One of ``OVERFLOW_POLICIES``
+            spill_dir (Optional[str]): Directory for spill files (policy 'spill')
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.stream = stream
+        self.capacity = capacity
+        self.policy = policy
+        self.spill_dir = spill_dir or tempfile.gettempdir()
+        self._lock = threading.Lock()
+        self._events: Any = deque(maxlen=capacity) if policy == 'ring' else []
+        self._spill_path: Optional[str] = None
+        self._spill_file = None
+        self._spilled = 0
+        self._last: Optional[Dict[str, Any]] = None
+        self.accepted = 0
+        self.dropped = 0
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        """
+        Store an event according to the overflow policy.
+
+        Returns:
+            bool: False if the event itself was dropped
+        """
+        with self._lock:
+            if len(self._events) >= self.capacity:
+                if self.policy == 'stop':
+                    self.dropped += 1
+                    return False
+                if self.policy == 'ring':
+                    self.dropped += 1
+                elif self.policy == 'drop_moves_first':
+                    if not self._evict_moves():
+                        self.dropped += 1
+                        return False
+                elif self.policy == 'spill':
+                    self._spill()
+            self._events.append(event)
+            self._last = event
+            self.accepted += 1
+            return True
+
+    def _evict_moves(self) -> bool:
+        """Drop the oldest moves in one pass; returns False if there were none."""
+        budget = max(1, int(self.capacity * MOVE_EVICTION_FRACTION))
+        kept: List[Dict[str, Any]] = []
+        evicted = 0
+        for event in self._events:
+            if evicted < budget and event.get('type') == 'move':
+                evicted += 1
+            else:
+                kept.append(event)
+        if not evicted:
+            return False
+        self._events = kept
+        self.dropped += evicted
+        return True
+
+    def _spill(self) -> None:
+        """Move the in-memory events to the spill file."""
+        if self._spill_file is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            fd, self._spill_path = tempfile.mkstemp(
+                prefix=f'{self.stream}_', suffix='.spill.jsonl', dir=self.spill_dir)
+            self._spill_file = os.fdopen(fd, 'w')
+        self._spill_file.write(''.join(json.dumps(e) + '\n' for e in self._events))
+        self._spill_file.flush()
+        self._spilled += len(self._events)
+        self._events = []
+
+    def clear(self) -> None:
+        """Discard all events, including any spill file."""
+        with self._lock:
+            self._events = deque(maxlen=self.capacity) if self.policy == 'ring' else []
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            if self._spill_path and os.path.exists(self._spill_path):
+                os.remove(self._spill_path)
+            self._spill_path = None
+            self._spilled = 0
+            self._last = None
+            self.accepted = 0
+            self.dropped = 0
+
+    def iter_json(self) -> Iterator[str]:
+        """Yield every event serialised as JSON, oldest first, without loading spills."""
+        if self._spill_path:
+            self._spill_file.flush()
+            with open(self._spill_path, 'r') as f:
+                for line in f:
+                    yield line.rstrip('\n')
+        for event in list(self._events):
+            yield json.dumps(event)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._spill_path:
+            self._spill_file.flush()
+            with open(self._spill_path, 'r') as f:
+                for line in f:
+                    yield json.loads(line)
+        yield from list(self._events)
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._events)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index == -1 and self._last is not None:
+            return self._last
+        if -len(self._events) <= index < 0:
+            return self._events[index]
+        if 0 <= index < self._spilled or index < 0:
+            return list(self)[index]
+        return self._events[index - self._spilled]
+
+    def usage(self) -> Dict[str, Any]:
+        """Budget and usage summary for metadata and status reporting."""
+        return {
+            'capacity': self.capacity,
+            'policy': self.policy,
+            'in_memory': len(self._events),
+            'spilled': self._spilled,
+            'accepted': self.accepted,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,87 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from metrics import CAPTURE_LAG
+
+_STOP = object()
+_MARKER = '_marker'
+
+
+class CaptureConsumer:
+    """
+    Single consumer thread for raw input events.
+
+    Listener callbacks only call :meth:`put` with a ``(kind, timestamp, *args)``
+    tuple, which is an allocation plus a lock-free ``SimpleQueue.put``. All
+    normalisation, modifier tracking, sampling, budgeting and saving happens
+    on the consumer thread, in the order the events arrived.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Any]], name: str = 'capture-consumer'):
+        """
+        Args:
+            handlers (Dict[str, Callable[..., Any]]): Maps an event kind to a
+                callable taking ``(timestamp, *args)``
+            name (str): Thread name
+        """
+        self.handlers = handlers
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._queue: 'queue.SimpleQueue[Any]' = queue.SimpleQueue()
+        self.put = self._queue.put
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_consumer_thread(self) -> bool:
+        """Check whether the caller is the consumer thread itself."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every event queued before this call has been handled.
+
+        Returns immediately when called from the consumer thread or when the
+        consumer is not running.
+        """
+        if not self.running or self.in_consumer_thread():
+            return True
+        done = threading.Event()
+        self._queue.put((_MARKER, 0.0, done))
+        return done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Handle everything still queued, then stop the consumer thread."""
+        if not self.running or self.in_consumer_thread():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        get = self._queue.get
+        handlers = self.handlers
+        while True:
+            item = get()
+            if item is _STOP:
+                break
+            kind, timestamp = item[0], item[1]
+            if kind == _MARKER:
+                item[2].set()
+                continue
+            CAPTURE_LAG.observe(time.time() - timestamp)
+            try:
+                handlers[kind](timestamp, *item[2:])
+            except Exception as e:
+                self.logger.error(f"Error handling {kind} event: {e}")
@@ -0,0 +1,137 @@
+import math
+from typing import Any, Dict, List, Optional
+
+
+class MoveSampler:
+    """
+    Thins out mouse-move events during capture without hurting replay fidelity.
+
+    A move is kept when it is at least ``min_distance`` pixels from the last
+    kept move and at least the adaptive interval has elapsed. The interval
+    shrinks linearly from ``max_interval`` (slow drift) to ``min_interval``
+    (at ``fast_velocity`` px/s or above), which keeps the spatial gap between
+    kept samples roughly constant whatever the pointer speed.
+
+    Regardless of thinning, the sampler always keeps:
+        - the first and last sample of a movement run (a run ends after
+          ``run_gap`` seconds without motion or at any click/scroll)
+        - the last move before a click/scroll and the first move after it
+
+    The last rejected move is held back rather than discarded so it can be
+    emitted when the run turns out to have ended; the caller must call
+    :meth:`flush` before storing any non-move event and when recording stops.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.008,
+        max_interval: float = 0.05,
+        min_distance: float = 2.0,
+        fast_velocity: float = 1500.0,
+        run_gap: float = 0.1,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            min_interval (float): Shortest spacing between kept moves (seconds)
+            max_interval (float): Spacing used for slow movements (seconds)
+            min_distance (float): Minimum distance from the last kept move (pixels)
+            fast_velocity (float): Speed at which ``min_interval`` applies (pixels/second)
+            run_gap (float): Idle time that ends a movement run (seconds)
+            enabled (bool): If False every move is kept
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_distance = min_distance
+        self.fast_velocity = fast_velocity
+        self.run_gap = run_gap
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all state; call when a new recording starts."""
+        self._last_kept: Optional[Dict[str, Any]] = None
+        self._last_seen: Optional[Dict[str, Any]] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._force_next = True
+        self.offered = 0
+        self.kept = 0
+
+    def _interval_for(self, velocity: float) -> float:
+        if velocity >= self.fast_velocity:
+            return self.min_interval
+        ratio = velocity / self.fast_velocity
+        return self.max_interval - (self.max_interval - self.min_interval) * ratio
+
+    def _keep(self, event: Dict[str, Any], out: List[Dict[str, Any]]) -> None:
+        out.append(event)
+        self._last_kept = event
+        self.kept += 1
+
+    def offer(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Offer a move event and return the events that should be stored now.
+
+        Args:
+            event (Dict[str, Any]): Move event with 'pos' and 'relative_time'
+
+        Returns:
+            List[Dict[str, Any]]: Zero, one or two events to store, in time order
+        """
+        self.offered += 1
+        out: List[Dict[str, Any]] = []
+        if not self.enabled:
+            self._keep(event, out)
+            return out
+
+        previous = self._last_seen
+        self._last_seen = event
+        run_ended = previous is not None and event['relative_time'] - previous['relative_time'] > self.run_gap
+
+        if run_ended or self._force_next or self._last_kept is None:
+            # Close the previous run with its last sample, then open a new one.
+            if run_ended and self._pending is not None:
+                self._keep(self._pending, out)
+            self._pending = None
+            self._force_next = False
+            self._keep(event, out)
+            return out
+
+        last = self._last_kept
+        elapsed = event['relative_time'] - last['relative_time']
+        distance = math.hypot(event['pos'][0] - last['pos'][0], event['pos'][1] - last['pos'][1])
+        velocity = distance / elapsed if elapsed > 0 else float('inf')
+
+        if (elapsed >= self.min_interval and distance >= self.min_distance
+                and elapsed >= self._interval_for(velocity)):
+            self._pending = None
+            self._keep(event, out)
+        else:
+            self._pending = event
+        return out
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Emit the held-back move (if any) and force the next move to be kept.
+
+        Call before storing a click or scroll, and when recording stops.
+        """
+        out: List[Dict[str, Any]] = []
+        if self._pending is not None:
+            self._keep(self._pending, out)
+            self._pending = None
+        self._force_next = True
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary stored in recording metadata."""
+        return {
+            'enabled': self.enabled,
+            'moves_offered': self.offered,
+            'moves_kept': self.kept,
+            'min_interval': self.min_interval,
+            'max_interval': self.max_interval,
+            'min_distance': self.min_distance,
+            'fast_velocity': self.fast_velocity,
+            'run_gap': self.run_gap
+        }
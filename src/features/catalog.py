@@ -0,0 +1,236 @@
+"""
+Recording catalog: categories and tags.
+
+The catalog is a SQLite database stored inside ``log_dir``
+(``.catalog.db``, next to the other dot-directories). Catalogs of older
+versions, kept beside ``log_dir``, are moved in when first opened. Tags live in one table keyed by
+``(tag, recording)``, which is the on-disk inverted index; a recording's
+category is the tag ``category:<name>``, of which it has at most one.
+
+The whole tag table is also held in memory as ``tag -> set(recordings)``
+and ``recording -> set(tags)`` maps, so filtering by a tag is a single
+dictionary lookup however large the library grows. Every write updates
+SQLite and both maps under one lock.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+CATALOG_FILE = '.catalog.db'
+# Catalogs used to live beside log_dir as '<log_dir>.catalog.db'
+LEGACY_CATALOG_SUFFIX = '.catalog.db'
+SQLITE_SIDECARS = ('', '-wal', '-shm')
+CATEGORY_PREFIX = 'category:'
+
+
+def catalog_path(log_dir: str) -> str:
+    """Path of the catalog database belonging to ``log_dir``."""
+    return os.path.join(log_dir, CATALOG_FILE)
+
+
+def _move_legacy_catalog(log_dir: str) -> None:
+    """Move a catalog kept beside ``log_dir`` into it, unless one is already there."""
+    log_dir = os.path.abspath(log_dir)
+    legacy = os.path.join(os.path.dirname(log_dir), os.path.basename(log_dir) + LEGACY_CATALOG_SUFFIX)
+    path = catalog_path(log_dir)
+    if not os.path.exists(legacy) or os.path.exists(path):
+        return
+    for suffix in SQLITE_SIDECARS:
+        if os.path.exists(legacy + suffix):
+            os.replace(legacy + suffix, path + suffix)
+
+
+def category_tag(category: str) -> str:
+    return CATEGORY_PREFIX + category
+
+
+def normalize_tag(tag: str) -> str:
+    tag = str(tag).strip()
+    if not tag:
+        raise ValueError("Tags must not be empty")
+    return tag
+
+
+class Catalog:
+    """
+    Persistent tag store with an in-memory inverted index.
+
+    Args:
+        path (str): SQLite database file (``':memory:'`` for a throwaway catalog)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS tags ('
+            ' tag TEXT NOT NULL, recording TEXT NOT NULL,'
+            ' PRIMARY KEY (tag, recording)) WITHOUT ROWID')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tags_by_recording ON tags (recording)')
+        self._conn.commit()
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._by_recording: Dict[str, Set[str]] = {}
+        for tag, recording in self._conn.execute('SELECT tag, recording FROM tags'):
+            self._by_tag.setdefault(tag, set()).add(recording)
+            self._by_recording.setdefault(recording, set()).add(tag)
+
+    @classmethod
+    def for_log_dir(cls, log_dir: str) -> 'Catalog':
+        os.makedirs(log_dir, exist_ok=True)
+        _move_legacy_catalog(log_dir)
+        return cls(catalog_path(log_dir))
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Hold the catalog lock and commit (or roll back) the statements run inside."""
+        with self._lock:
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def execute(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        """Run a statement on the catalog database and return its rows (used by other catalog tables)."""
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def executemany(self, sql: str, rows: Iterable[Iterable]) -> None:
+        with self._lock:
+            self._conn.executemany(sql, rows)
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def _add(self, pairs: List[tuple]) -> None:
+        self._conn.executemany('INSERT OR IGNORE INTO tags (tag, recording) VALUES (?, ?)', pairs)
+        for tag, recording in pairs:
+            self._by_tag.setdefault(tag, set()).add(recording)
+            self._by_recording.setdefault(recording, set()).add(tag)
+
+    def _remove(self, pairs: List[tuple]) -> None:
+        self._conn.executemany('DELETE FROM tags WHERE tag = ? AND recording = ?', pairs)
+        for tag, recording in pairs:
+            recordings = self._by_tag.get(tag)
+            if recordings is not None:
+                recordings.discard(recording)
+                if not recordings:
+                    del self._by_tag[tag]
+            tags = self._by_recording.get(recording)
+            if tags is not None:
+                tags.discard(tag)
+                if not tags:
+                    del self._by_recording[recording]
+
+    def assign(self, recordings: Iterable[str], tags: Iterable[str]) -> int:
+        """Add every tag to every recording; returns the number of pairs written."""
+        tags = [normalize_tag(tag) for tag in tags]
+        pairs = [(tag, recording) for recording in recordings for tag in tags]
+        with self._lock:
+            self._add(pairs)
+            self._conn.commit()
+        return len(pairs)
+
+    def unassign(self, recordings: Iterable[str], tags: Iterable[str]) -> int:
+        """Remove every tag from every recording."""
+        tags = [normalize_tag(tag) for tag in tags]
+        pairs = [(tag, recording) for recording in recordings for tag in tags]
+        with self._lock:
+            self._remove(pairs)
+            self._conn.commit()
+        return len(pairs)
+
+    def set_category(self, recordings: Iterable[str], category: Optional[str]) -> int:
+        """Replace the category of each recording (``None`` clears it)."""
+        recordings = list(recordings)
+        with self._lock:
+            stale = [
+                (tag, recording) for recording in recordings
+                for tag in self._by_recording.get(recording, ())
+                if tag.startswith(CATEGORY_PREFIX)
+            ]
+            self._remove(stale)
+            if category:
+                self._add([(category_tag(normalize_tag(category)), recording) for recording in recordings])
+            self._conn.commit()
+        return len(recordings)
+
+    def forget(self, recordings: Iterable[str]) -> None:
+        """Drop all tags of deleted recordings (deletion hook)."""
+        with self._lock:
+            pairs = [(tag, recording) for recording in recordings for tag in self._by_recording.get(recording, ())]
+            self._remove(pairs)
+            self._conn.commit()
+
+    def tags_of(self, recording: str) -> List[str]:
+        return sorted(tag for tag in self._by_recording.get(recording, ()) if not tag.startswith(CATEGORY_PREFIX))
+
+    def category_of(self, recording: str) -> Optional[str]:
+        for tag in self._by_recording.get(recording, ()):
+            if tag.startswith(CATEGORY_PREFIX):
+                return tag[len(CATEGORY_PREFIX):]
+        return None
+
+    def recordings_with(self, tags: Iterable[str], match_all: bool = True) -> Set[str]:
+        """Recordings carrying all (or, with ``match_all=False``, any) of ``tags``."""
+        with self._lock:
+            sets = [self._by_tag.get(tag, set()) for tag in tags]
+            if not sets:
+                return set()
+            if match_all:
+                sets.sort(key=len)
+                return set(sets[0]).intersection(*sets[1:])
+            return set().union(*sets)
+
+    def select(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        match_all: bool = True
+    ) -> Optional[Set[str]]:
+        """
+        Recordings in ``category`` carrying all (or any) of ``tags``;
+        ``None`` when neither filter is given.
+        """
+        selected: Optional[Set[str]] = None
+        if category:
+            selected = self.recordings_with([category_tag(category)])
+        if tags:
+            tagged = self.recordings_with(tags, match_all)
+            selected = tagged if selected is None else selected & tagged
+        return selected
+
+    def filter(
+        self,
+        recordings: Iterable[str],
+        tags: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        match_all: bool = True
+    ) -> List[str]:
+        """Keep the recordings matching :meth:`select`, preserving order."""
+        allowed = self.select(tags, category, match_all)
+        if allowed is None:
+            return list(recordings)
+        return [recording for recording in recordings if recording in allowed]
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Recording counts per tag and per category."""
+        with self._lock:
+            tags: Dict[str, int] = {}
+            categories: Dict[str, int] = {}
+            for tag, recordings in self._by_tag.items():
+                if tag.startswith(CATEGORY_PREFIX):
+                    categories[tag[len(CATEGORY_PREFIX):]] = len(recordings)
+                else:
+                    tags[tag] = len(recordings)
+        return {'tags': tags, 'categories': categories}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,223 @@
+"""
+Pluggable compression codecs for stored recordings.
+
+Codecs are selected by name ('none', 'gzip', 'zstd', 'lz4'); the default
+comes from the ``RECORDER_COMPRESSION`` environment variable, read when a
+codec is looked up, and is 'none': recordings keep their ``.json`` names,
+so they stay plain JSON unless compression is asked for. Compressed data
+is always recognised by its magic bytes, so readers never need to know
+which codec wrote a file and stores can switch codecs at any time.
+
+gzip ships with Python; zstd and lz4 need the optional ``zstandard`` and
+``lz4`` packages and are only available when those are installed.
+"""
+import gzip
+import io
+import os
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+DEFAULT_CODEC = 'none'
+# Decompressed bytes read per step when skipping forward
+SKIP_BLOCK = 1024 * 1024
+
+
+class _NonClosingWrapper(io.RawIOBase):
+    """Keep a stream compressor from closing the file it writes into."""
+
+    def __init__(self, raw: BinaryIO):
+        super().__init__()
+        self.raw = raw
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.raw.write(data)
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+
+class _ClosingReader(io.RawIOBase):
+    """
+    Decompressing stream that also closes the file underneath it.
+
+    Decompressors differ in what seeking they support (zstd's stream reader
+    supports none), so seeking is done here for every codec: forward by
+    decompressing and discarding, backward by restarting from the start.
+    """
+
+    def __init__(self, codec: 'Codec', raw: BinaryIO):
+        super().__init__()
+        self.codec = codec
+        self.raw = raw
+        self.stream = codec.reader(raw)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def _skip(self, size: int) -> None:
+        while size > 0:
+            data = self.stream.read(min(size, SKIP_BLOCK))
+            if not data:
+                return
+            self._pos += len(data)
+            size -= len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            self._skip(float('inf'))
+            target = self._pos + offset
+        elif whence == io.SEEK_CUR:
+            target = self._pos + offset
+        else:
+            target = offset
+        target = max(0, target)
+        if target < self._pos:
+            # The old decompressor is dropped, not closed: some close the file
+            self.raw.seek(0)
+            self.stream = self.codec.reader(self.raw)
+            self._pos = 0
+        self._skip(target - self._pos)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self.stream.close()
+            self.raw.close()
+        super().close()
+
+
+class Codec:
+    """
+    A compression format.
+
+    Args:
+        name (str): Configuration name
+        magic (bytes): Leading bytes identifying compressed data ('' for none)
+        compress (Callable[[bytes], bytes]): One-shot compression
+        decompress (Callable[[bytes], bytes]): One-shot decompression
+        reader (Callable[[BinaryIO], BinaryIO]): Wrap a file in a streaming decompressor
+        writer (Callable[[BinaryIO], BinaryIO]): Wrap a file in a streaming compressor;
+            closing the wrapper finishes the frame but leaves the file open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        magic: bytes,
+        compress: Callable[[bytes], bytes],
+        decompress: Callable[[bytes], bytes],
+        reader: Callable[[BinaryIO], BinaryIO],
+        writer: Callable[[BinaryIO], BinaryIO]
+    ):
+        self.name = name
+        self.magic = magic
+        self.compress = compress
+        self.decompress = decompress
+        self.reader = reader
+        self.writer = writer
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r})"
+
+
+CODECS: Dict[str, Codec] = {
+    'none': Codec('none', b'', lambda data: data, lambda data: data, lambda f: f, _NonClosingWrapper),
+    'gzip': Codec(
+        'gzip', b'\x1f\x8b',
+        lambda data: gzip.compress(data, compresslevel=6),
+        gzip.decompress,
+        lambda f: gzip.GzipFile(fileobj=f, mode='rb'),
+        lambda f: gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6)
+    ),
+}
+
+if zstandard is not None:
+    CODECS['zstd'] = Codec(
+        'zstd', b'\x28\xb5\x2f\xfd',
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        # Frames written in streaming mode carry no content size
+        lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+        lambda f: zstandard.ZstdDecompressor().stream_reader(f),
+        lambda f: zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=False)
+    )
+
+if lz4_frame is not None:
+    CODECS['lz4'] = Codec(
+        'lz4', b'\x04\x22\x4d\x18',
+        lz4_frame.compress,
+        lz4_frame.decompress,
+        lambda f: lz4_frame.LZ4FrameFile(f, mode='rb'),
+        lambda f: lz4_frame.LZ4FrameFile(_NonClosingWrapper(f), mode='wb')
+    )
+
+MAGIC_LENGTH = 4
+
+
+def available_codecs() -> List[str]:
+    return list(CODECS)
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Look up a codec by name (``None`` selects $RECORDER_COMPRESSION or ``DEFAULT_CODEC``)."""
+    name = name or os.environ.get('RECORDER_COMPRESSION') or DEFAULT_CODEC
+    if name not in CODECS:
+        raise ValueError(f"Compression codec '{name}' is not available (choose from {', '.join(CODECS)})")
+    return CODECS[name]
+
+
+def detect_codec(head: bytes) -> Codec:
+    """Identify the codec of data from its first bytes; 'none' when unrecognised."""
+    for codec in CODECS.values():
+        if codec.magic and head.startswith(codec.magic):
+            return codec
+    if head.startswith(b'\x28\xb5\x2f\xfd') or head.startswith(b'\x04\x22\x4d\x18'):
+        raise ValueError("Data is compressed with a codec whose package is not installed")
+    return CODECS['none']
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """Decompress ``data`` if it carries a known magic, else return it unchanged."""
+    return detect_codec(data[:MAGIC_LENGTH]).decompress(data)
+
+
+def open_decompressed(f: BinaryIO) -> BinaryIO:
+    """
+    Wrap an open, seekable binary file in a streaming decompressor.
+
+    Closing the returned stream closes ``f``. Uncompressed files are
+    returned as they are, so callers keep fast random access to them;
+    compressed streams of every codec seek forward by decompressing and
+    discarding, and backwards only by decompressing again from the start.
+    """
+    f.seek(0)
+    head = f.read(MAGIC_LENGTH)
+    f.seek(0)
+    codec = detect_codec(head)
+    if codec.name == 'none':
+        return f
+    return io.BufferedReader(_ClosingReader(codec, f))
@@ -0,0 +1,242 @@
+"""
+Bulk deletion of recordings.
+
+All delete routes go through :class:`DeletionService`. It validates names
+(no path traversal, only actual recordings), selects by explicit names,
+glob pattern and/or age, removes every recording together with its
+sidecar files on a thread pool, then runs one maintenance pass: chunk
+store garbage collection and the registered deletion hooks (catalogs,
+caches). Cloud copies are removed asynchronously through
+:class:`RemoteDeleteQueue`.
+"""
+import fnmatch
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fidelity import report_path
+from recording_index import index_path
+
+DEFAULT_WORKERS = 8
+REMOTE_SYNC = os.environ.get('RECORDER_FIREBASE_SYNC', '0') == '1'
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteDeleteQueue:
+    """
+    Background queue of cloud deletions.
+
+    Recording ids are collected by a single worker thread and deleted with
+    one batched write (``FirebaseManager.delete_recordings``) per
+    ``batch_size`` ids, so a bulk delete never waits on the network.
+    ``firebase_config`` initialises credentials on import, so it is only
+    imported by the worker. The worker exits once the queue stays empty for
+    ``interval`` seconds; ``submit`` starts a new one.
+    """
+
+    def __init__(self, batch_size: int = 100, interval: float = 1.0):
+        # Firestore accepts at most 500 writes per batch
+        batch_size = min(batch_size, 500)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: 'queue.SimpleQueue[str]' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._manager = None
+        self.disabled = False
+        self.deleted = 0
+        self.failed = 0
+
+    def submit(self, recording_ids: Iterable[str]) -> None:
+        if self.disabled:
+            return
+        for recording_id in recording_ids:
+            self._queue.put(recording_id)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='remote-delete', daemon=True)
+                self._thread.start()
+
+    def _load_manager(self):
+        if self._manager is None:
+            from firebase_config import FirebaseManager
+            self._manager = FirebaseManager
+        return self._manager
+
+    def _next_batch(self) -> List[str]:
+        batch = [self._queue.get(timeout=self.interval)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                with self._lock:
+                    # Ids submitted after the timeout saw this thread alive
+                    # and started none, so they must be drained here
+                    if not self._queue.empty():
+                        continue
+                    self._thread = None
+                    return
+            try:
+                manager = self._load_manager()
+            except Exception as e:
+                logger.error(f"Remote deletion disabled, Firebase unavailable: {e}")
+                self.disabled = True
+                return
+            if manager.delete_recordings(batch):
+                self.deleted += len(batch)
+            else:
+                self.failed += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'pending': self._queue.qsize(), 'deleted': self.deleted,
+                'failed': self.failed, 'disabled': self.disabled}
+
+
+remote_deletes = RemoteDeleteQueue()
+
+
+def recording_id(recording: str) -> str:
+    """Document id of a recording in the cloud store (its file name without extension)."""
+    return os.path.splitext(recording)[0]
+
+
+class DeletionService:
+    """
+    Deletes recordings of one recorder.
+
+    Args:
+        recorder: The owning ``PreciseActionRecorder``
+        workers (int): Threads used for file removal
+        remote (Optional[RemoteDeleteQueue]): Queue for cloud deletions;
+            ``None`` unless $RECORDER_FIREBASE_SYNC=1
+    """
+
+    def __init__(self, recorder, workers: int = DEFAULT_WORKERS, remote: Optional[RemoteDeleteQueue] = None):
+        self.recorder = recorder
+        self.workers = workers
+        self.remote = remote if remote is not None else (remote_deletes if REMOTE_SYNC else None)
+        self._hooks: List[Callable[[List[str]], None]] = []
+
+    def add_hook(self, hook: Callable[[List[str]], None]) -> None:
+        """Register a callable invoked once per batch with the deleted recording names."""
+        self._hooks.append(hook)
+
+    def _validate(self, name: str) -> Optional[str]:
+        """Return the path of recording ``name`` if it is safe to delete it."""
+        if not isinstance(name, str) or not name or name != os.path.basename(name) or name.startswith('.'):
+            return None
+        log_dir = os.path.realpath(self.recorder.log_dir)
+        path = os.path.realpath(os.path.join(log_dir, name))
+        if os.path.dirname(path) != log_dir:
+            return None
+        return path
+
+    def select(
+        self,
+        names: Optional[Iterable[str]] = None,
+        pattern: Optional[str] = None,
+        older_than_days: Optional[float] = None
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Resolve a selection to existing recordings.
+
+        Explicit names are used as given; otherwise every recording matching
+        ``pattern`` (a glob such as ``user_actions_2024_1*.json``) is selected.
+        ``older_than_days`` narrows either selection by modification time.
+
+        Returns:
+            Tuple[List[str], List[str]]: (selected names, rejected names)
+        """
+        rejected: List[str] = []
+        if names is not None:
+            known = set(self.recorder.list_recordings())
+            selected = []
+            for name in dict.fromkeys(names):
+                if self._validate(name) is not None and name in known:
+                    selected.append(name)
+                else:
+                    rejected.append(name)
+        else:
+            selected = self.recorder.list_recordings()
+            if pattern:
+                selected = fnmatch.filter(selected, pattern)
+        if older_than_days is not None:
+            cutoff = time.time() - older_than_days * 86400
+            old = []
+            for name in selected:
+                try:
+                    if os.path.getmtime(os.path.join(self.recorder.log_dir, name)) < cutoff:
+                        old.append(name)
+                except OSError:
+                    rejected.append(name)
+            selected = old
+        return selected, rejected
+
+    def _remove(self, name: str) -> bool:
+        path = os.path.join(self.recorder.log_dir, name)
+        try:
+            os.remove(path)
+        except OSError as e:
+            self.recorder.logger.error(f"Error deleting {name}: {e}")
+            return False
+        for sidecar in (index_path(path), report_path(path)):
+            try:
+                os.remove(sidecar)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.recorder.logger.warning(f"Could not remove {sidecar}: {e}")
+        return True
+
+    def delete(
+        self,
+        names: Optional[Iterable[str]] = None,
+        pattern: Optional[str] = None,
+        older_than_days: Optional[float] = None,
+        sync_remote: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Delete a selection of recordings (see :meth:`select`).
+
+        ``sync_remote=False`` keeps the cloud copies, e.g. when recordings
+        are only moved to another tier.
+
+        Returns:
+            Dict[str, Any]: 'deleted' and 'failed' names and the garbage
+            collection result
+        """
+        if names is None and pattern is None and older_than_days is None:
+            raise ValueError("Refusing to delete without names, a pattern or an age filter")
+        selected, failed = self.select(names, pattern, older_than_days)
+        deleted: List[str] = []
+        if selected:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(selected))) as pool:
+                for name, removed in zip(selected, pool.map(self._remove, selected)):
+                    (deleted if removed else failed).append(name)
+
+        result: Dict[str, Any] = {'deleted': deleted, 'failed': failed, 'gc': None}
+        if not deleted:
+            return result
+        result['gc'] = self.recorder.store.collect_garbage()
+        for hook in self._hooks:
+            try:
+                hook(deleted)
+            except Exception as e:
+                self.recorder.logger.error(f"Deletion hook failed: {e}")
+        if sync_remote and self.remote is not None:
+            self.remote.submit(recording_id(name) for name in deleted)
+        self.recorder.logger.info(f"Deleted {len(deleted)} recording(s), {len(failed)} failed.")
+        return result
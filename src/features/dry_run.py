@@ -0,0 +1,239 @@
+"""
+Headless dry-run replay.
+
+Runs the replay plan of a recording (``replay_plan.build_plan``, the same
+plan live replay uses, including seeking and idle compression) through
+the same event translation into a ``VirtualBackend`` instead of a real
+display, without waiting between events. The report gives the final
+virtual input state and every anomaly found:
+
+    key_release_without_press, button_release_without_press,
+    button_already_pressed     impossible input sequences
+    out_of_bounds              cursor moved off the (scaled) screen
+    key_left_pressed,
+    button_left_pressed        input still held when the replay ends
+    time_regression            a stream's timestamps go backwards
+    invalid_event              an event replay cannot interpret
+
+This module does not import the recorder, so it needs neither a display
+nor pynput. Validate a library in CI with::
+
+    python dry_run.py --log-dir user_action_logs --workers 4 --json dry_run.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends import VirtualBackend, replay_keyboard_event, replay_mouse_event
+from recording_index import SIDECAR_SUFFIXES
+from replay_plan import build_plan
+from storage import load_recording
+
+# Anomalies listed per report; the rest are only counted
+MAX_ANOMALIES = 100
+
+
+def _dispatch(backend: VirtualBackend, event: Dict[str, Any]) -> None:
+    if event['event_type'] == 'mouse':
+        replay_mouse_event(backend, event)
+    else:
+        replay_keyboard_event(backend, event)
+
+
+def _time_regressions(log_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Events whose timestamp is earlier than the one before, in file order."""
+    found = []
+    for stream in ('mouse_events', 'keyboard_events'):
+        previous = None
+        for index, event in enumerate(log_data.get(stream, [])):
+            current = event.get('relative_time')
+            if previous is not None and current is not None and current < previous:
+                found.append({
+                    'kind': 'time_regression', 'detail': f'{stream}[{index}]',
+                    'time': current, 'previous': previous
+                })
+            previous = current if current is not None else previous
+    return found
+
+
+def dry_run(
+    log_file: str,
+    filter_events: Optional[List[str]] = None,
+    loop_count: int = 1,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    start_index: Optional[int] = None,
+    end_index: Optional[int] = None,
+    fast_forward: bool = True,
+    speed: float = 1.0,
+    idle_threshold: Optional[float] = None,
+    max_idle: float = 1.0,
+    size: Tuple[int, int] = (1920, 1080)
+) -> Dict[str, Any]:
+    """
+    Replay a recording against virtual input state at full speed.
+
+    Arguments match ``PreciseActionRecorder.replay_events``; ``size`` is the
+    virtual screen that positions are scaled to.
+
+    Returns:
+        Dict[str, Any]: Report with the final input state, anomalies, the
+        playback duration a live replay would take and the simulation throughput
+    """
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    started = time.perf_counter()
+    log_data = load_recording(log_file)
+    plan = build_plan(log_file, start_time, end_time, start_index, end_index, idle_threshold, max_idle,
+                      log_data=log_data)
+    backend = VirtualBackend(size)
+    anomalies = _time_regressions(log_data)
+    dispatched = 0
+
+    def run(events, index, play_time):
+        nonlocal dispatched
+        for event in events:
+            seen = len(backend.anomalies)
+            try:
+                _dispatch(backend, event)
+            except Exception as e:
+                backend.anomalies.append({'kind': 'invalid_event', 'detail': f'{type(e).__name__}: {e}'})
+            for anomaly in backend.anomalies[seen:]:
+                anomalies.append({**anomaly, 'index': index, 'time': play_time})
+            dispatched += 1
+
+    lo, hi = plan.lo, plan.hi
+    for _ in range(loop_count):
+        if fast_forward and plan.seeks:
+            run(plan.restore_events(), lo, plan.play_times[0] if plan.play_times else None)
+        for i, event in enumerate(plan.segment):
+            if filter_events and event['type'] in filter_events:
+                continue
+            run((event,), lo + i, plan.play_times[i])
+        if plan.stops_early:
+            # Live replay releases input held at the cut point
+            run(plan.release_events(), hi, plan.play_times[-1] if plan.play_times else None)
+
+    for key in sorted(backend.keys):
+        anomalies.append({'kind': 'key_left_pressed', 'detail': key, 'index': hi, 'time': None})
+    for button in sorted(backend.buttons):
+        anomalies.append({'kind': 'button_left_pressed', 'detail': button, 'index': hi, 'time': None})
+
+    elapsed = time.perf_counter() - started
+    by_kind: Dict[str, int] = {}
+    for anomaly in anomalies:
+        by_kind[anomaly['kind']] = by_kind.get(anomaly['kind'], 0) + 1
+    span = plan.play_times[-1] - plan.play_times[0] if plan.play_times else 0.0
+    report = {
+        'recording': os.path.basename(log_file),
+        'ok': not anomalies,
+        'events': len(plan.events),
+        'dispatched': dispatched,
+        'loops': loop_count,
+        'replay_duration': span / speed * loop_count,
+        'elapsed': elapsed,
+        'events_per_second': dispatched / elapsed if elapsed > 0 else 0.0,
+        'final_state': backend.state(),
+        'anomaly_counts': by_kind,
+        'anomalies': anomalies[:MAX_ANOMALIES],
+        'range': {
+            'start_time': start_time,
+            'end_time': end_time,
+            'start_index': lo,
+            'end_index': hi
+        }
+    }
+    if plan.idle_summary is not None:
+        report['idle_compression'] = plan.idle_summary
+    return report
+
+
+def _dry_run_file(args: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    path, options = args
+    try:
+        return dry_run(path, **options)
+    except Exception as e:
+        return {'recording': os.path.basename(path), 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+
+def dry_run_many(paths: List[str], workers: int = 1, **options) -> Dict[str, Any]:
+    """
+    Dry-run several recordings, in ``workers`` processes when above one.
+
+    Returns:
+        Dict[str, Any]: Per-recording reports and totals
+    """
+    started = time.perf_counter()
+    jobs = [(path, options) for path in paths]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(_dry_run_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        reports = [_dry_run_file(job) for job in jobs]
+    elapsed = time.perf_counter() - started
+    events = sum(report.get('dispatched', 0) for report in reports)
+    return {
+        'recordings': len(reports),
+        'passed': sum(1 for report in reports if report['ok']),
+        'errors': sum(1 for report in reports if 'error' in report),
+        'events': events,
+        'elapsed': elapsed,
+        'events_per_second': events / elapsed if elapsed > 0 else 0.0,
+        'reports': reports
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dry-run recordings against virtual input state")
+    parser.add_argument('recordings', nargs='*', help="Recording files (default: every recording in --log-dir)")
+    parser.add_argument('--log-dir', help="Directory of recordings to validate")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+    parser.add_argument('--compress-idle', type=float, metavar='SECONDS', help="Plan with idle gaps over SECONDS clamped")
+    parser.add_argument('--max-idle', type=float, default=1.0, help="Length idle gaps are clamped to")
+    parser.add_argument('--speed', type=float, default=1.0, help="Playback speed used for replay_duration")
+    parser.add_argument('--size', default='1920x1080', help="Virtual screen size, WIDTHxHEIGHT")
+    parser.add_argument('--ignore', action='append', default=[], metavar='KIND', help="Anomaly kind that does not fail a recording")
+    parser.add_argument('--json', metavar='PATH', help="Write the full results to PATH")
+    args = parser.parse_args()
+
+    paths = list(args.recordings)
+    if args.log_dir:
+        paths.extend(
+            os.path.join(args.log_dir, name) for name in sorted(os.listdir(args.log_dir))
+            if name.endswith('.json') and not name.endswith(SIDECAR_SUFFIXES)
+        )
+    if not paths:
+        parser.error("no recordings given")
+    width, height = (int(v) for v in args.size.lower().split('x'))
+
+    results = dry_run_many(
+        paths, args.workers, idle_threshold=args.compress_idle, max_idle=args.max_idle,
+        speed=args.speed, size=(width, height))
+    ignored = set(args.ignore)
+    failed = 0
+    for report in results['reports']:
+        if 'error' in report:
+            failed += 1
+            print(f"ERROR {report['recording']}: {report['error']}")
+            continue
+        counts = {kind: n for kind, n in report['anomaly_counts'].items() if kind not in ignored}
+        if counts:
+            failed += 1
+            summary = ', '.join(f'{kind}={n}' for kind, n in sorted(counts.items()))
+            print(f"FAIL  {report['recording']}: {summary}")
+    print(
+        f"{results['recordings'] - failed}/{results['recordings']} recordings passed, "
+        f"{results['events']} events in {results['elapsed']:.2f}s ({results['events_per_second']:.0f} events/s)"
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
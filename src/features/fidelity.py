@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+FIDELITY_SUFFIX = '.fidelity.json'
+
+
+def report_path(log_file: str) -> str:
+    """Return the path of the fidelity report stored next to a recording."""
+    base, _ = os.path.splitext(log_file)
+    return base + FIDELITY_SUFFIX
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class FidelityTracker:
+    """
+    Collects intended vs actual dispatch times during a replay.
+
+    Times are stored relative to the start of each loop so reports stay
+    comparable across hosts. Appending is O(1) and allocation free apart
+    from list growth, so it is safe to call from the replay hot path.
+    """
+
+    def __init__(self, recording: str, precision_mode: bool, speed: float = 1.0):
+        self.recording = recording
+        self.precision_mode = precision_mode
+        self.speed = speed
+        self.loops: List[Dict[str, List[float]]] = []
+        self.started_at = time.time()
+        self._loop_start = 0.0
+        self._intended: List[float] = []
+        self._actual: List[float] = []
+        self._wall_start = time.perf_counter()
+
+    def start_loop(self, loop_start: float) -> None:
+        """Begin tracking a new loop; ``loop_start`` is a ``time.perf_counter`` value."""
+        self._loop_start = loop_start
+        self._intended = []
+        self._actual = []
+
+    def record(self, intended_offset: float, actual: float) -> None:
+        """Record one dispatched event.
+
+        Args:
+            intended_offset (float): Scheduled time relative to loop start
+            actual (float): ``time.perf_counter`` value at dispatch
+        """
+        self._intended.append(intended_offset)
+        self._actual.append(actual - self._loop_start)
+
+    def end_loop(self) -> None:
+        """Close the current loop."""
+        self.loops.append({'intended': self._intended, 'actual': self._actual})
+        self._intended = []
+        self._actual = []
+
+    def build_report(self, completed: bool = True) -> Dict[str, Any]:
+        """Summarise the collected timings into a compact, JSON-serialisable report."""
+        duration = time.perf_counter() - self._wall_start
+        lateness: List[float] = []
+        loops = []
+        total_events = 0
+        for index, loop in enumerate(self.loops):
+            intended, actual = loop['intended'], loop['actual']
+            total_events += len(actual)
+            loop_lateness = [a - i for i, a in zip(intended, actual)]
+            if self.precision_mode:
+                lateness.extend(loop_lateness)
+            loops.append({
+                'loop': index,
+                'events': len(actual),
+                'duration': round(actual[-1], 6) if actual else 0.0,
+                'drift': round(loop_lateness[-1], 6) if loop_lateness else 0.0,
+                'intended': [round(v, 6) for v in intended],
+                'actual': [round(v, 6) for v in actual]
+            })
+        lateness.sort()
+        return {
+            'recording': os.path.basename(self.recording),
+            'started_at': self.started_at,
+            'completed': completed,
+            'precision_mode': self.precision_mode,
+            'speed': self.speed,
+            'total_events': total_events,
+            'duration': round(duration, 6),
+            'throughput_eps': round(total_events / duration, 3) if duration > 0 else 0.0,
+            'lateness': {
+                'p50': round(percentile(lateness, 50), 6),
+                'p95': round(percentile(lateness, 95), 6),
+                'p99': round(percentile(lateness, 99), 6),
+                'max': round(lateness[-1], 6) if lateness else 0.0
+            },
+            'loops': loops
+        }
+
+
+def save_report(log_file: str, report: Dict[str, Any]) -> str:
+    """Persist a report next to its recording and return the report path."""
+    path = report_path(log_file)
+    with open(path, 'w') as f:
+        json.dump(report, f, separators=(',', ':'))
+    return path
+
+
+def load_report(log_file: str) -> Optional[Dict[str, Any]]:
+    """Load the latest report for a recording, or ``None`` if it was never replayed."""
+    path = report_path(log_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
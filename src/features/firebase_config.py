@@ -41,6 +41,19 @@ class FirebaseManager:
             print(f"Error deleting from Firebase: {e}")
             return False
 
+    @staticmethod
+    def delete_recordings(recording_ids):
+        """Delete several recordings from Firebase in one batched write (at most 500)"""
+        try:
+            batch = db.batch()
+            for recording_id in recording_ids:
+                batch.delete(db.collection('recordings').document(recording_id))
+            batch.commit()
+            return True
+        except Exception as e:
+            print(f"Error deleting from Firebase: {e}")
+            return False
+
     @staticmethod
     def list_recordings():
         """List all recordings from Firebase"""
@@ -0,0 +1,202 @@
+"""
+Live fan-out of events captured during an in-progress recording.
+
+Events are coalesced into one batch every ``interval`` seconds and encoded
+compactly so a busy recording costs a few hundred bytes per batch::
+
+    {"seq": 12, "t0": 3.512,
+     "m": [[dt_ms, code, x, y, ...], ...],
+     "k": [[dt_ms, code, key], ...]}
+
+``t0`` is the relative time (seconds) of the first event in the batch and
+``dt_ms`` the delay in milliseconds from the previous row of the same
+stream (the first row is relative to ``t0``). Mouse positions after the
+first row are deltas from the previous row.
+
+    mouse codes:    0 move, 1 click (+ button, pressed 0/1), 2 scroll (+ dx, dy)
+    keyboard codes: 0 keypress, 1 keydown, 2 keyup
+
+Control messages (``{"seq": n, "control": "start" | "stop", ...}``) mark
+recording boundaries. :func:`decode_batch` reverses the encoding.
+"""
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+MOUSE_CODES = {'move': 0, 'click': 1, 'scroll': 2}
+KEYBOARD_CODES = {'keypress': 0, 'keydown': 1, 'keyup': 2}
+_MOUSE_TYPES = {code: name for name, code in MOUSE_CODES.items()}
+_KEYBOARD_TYPES = {code: name for name, code in KEYBOARD_CODES.items()}
+
+
+def _short_button(button: str) -> str:
+    return button.split('.')[-1]
+
+
+def encode_batch(seq: int, events: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Delta-encode a list of ``(stream, event)`` pairs captured in time order."""
+    t0 = events[0][1]['relative_time']
+    mouse: List[List[Any]] = []
+    keys: List[List[Any]] = []
+    last_mouse_t = last_key_t = t0
+    last_x = last_y = None
+    for stream, event in events:
+        t = event['relative_time']
+        if stream == 'mouse':
+            x, y = event['pos']
+            if last_x is None:
+                dx, dy = x, y
+            else:
+                dx, dy = x - last_x, y - last_y
+            last_x, last_y = x, y
+            row = [round((t - last_mouse_t) * 1000), MOUSE_CODES.get(event['type'], 0), dx, dy]
+            if event['type'] == 'click':
+                row.extend([_short_button(event['button']), 1 if event['pressed'] else 0])
+            elif event['type'] == 'scroll':
+                row.extend([event['dx'], event['dy']])
+            mouse.append(row)
+            last_mouse_t = t
+        else:
+            keys.append([round((t - last_key_t) * 1000), KEYBOARD_CODES.get(event['type'], 0), event['key']])
+            last_key_t = t
+    return {'seq': seq, 't0': round(t0, 3), 'm': mouse, 'k': keys}
+
+
+def decode_batch(batch: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Expand an encoded batch back into event dicts (times in seconds)."""
+    mouse_events = []
+    t = batch['t0']
+    x = y = 0
+    for index, row in enumerate(batch.get('m', [])):
+        t += row[0] / 1000.0
+        if index == 0:
+            x, y = row[2], row[3]
+        else:
+            x, y = x + row[2], y + row[3]
+        event = {'type': _MOUSE_TYPES[row[1]], 'pos': (x, y), 'relative_time': round(t, 3)}
+        if row[1] == MOUSE_CODES['click']:
+            event.update({'button': row[4], 'pressed': bool(row[5])})
+        elif row[1] == MOUSE_CODES['scroll']:
+            event.update({'dx': row[4], 'dy': row[5]})
+        mouse_events.append(event)
+    keyboard_events = []
+    t = batch['t0']
+    for row in batch.get('k', []):
+        t += row[0] / 1000.0
+        keyboard_events.append({'type': _KEYBOARD_TYPES[row[1]], 'key': row[2], 'relative_time': round(t, 3)})
+    return {'mouse_events': mouse_events, 'keyboard_events': keyboard_events}
+
+
+class LiveEventStream:
+    """
+    Batches captured events and fans them out to live subscribers.
+
+    :meth:`publish` is called on the capture consumer thread and returns
+    immediately when nobody is watching. A flusher thread, alive only while
+    there are subscribers, encodes the pending events every ``interval``
+    seconds into a bounded history that SSE generators and listener
+    callbacks read from.
+    """
+
+    def __init__(self, interval: float = 0.05, history: int = 256):
+        """
+        Args:
+            interval (float): Coalescing window in seconds
+            history (int): Number of encoded batches kept for slow subscribers
+        """
+        self.interval = interval
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._batches: Deque[Tuple[int, str]] = deque(maxlen=history)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._new_batch = threading.Condition(self._lock)
+        self._subscribers = 0
+        self._listeners: List[Callable[[str], None]] = []
+        self._flusher: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._subscribers > 0 or bool(self._listeners)
+
+    def publish(self, stream: str, event: Dict[str, Any]) -> None:
+        """Queue a stored event for the next batch ('mouse' or 'keyboard' stream)."""
+        if not self.active:
+            return
+        with self._lock:
+            self._pending.append((stream, event))
+
+    def control(self, kind: str, **fields: Any) -> None:
+        """Flush pending events, then emit a control message such as 'start' or 'stop'."""
+        if not self.active:
+            return
+        with self._lock:
+            self._flush_locked()
+            self._seq += 1
+            self._emit_locked(json.dumps({'seq': self._seq, 'control': kind, **fields}, separators=(',', ':')))
+
+    def _emit_locked(self, payload: str) -> None:
+        self._batches.append((self._seq, payload))
+        self._new_batch.notify_all()
+        for listener in list(self._listeners):
+            listener(payload)
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        self._seq += 1
+        self._emit_locked(json.dumps(encode_batch(self._seq, events), separators=(',', ':')))
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not (self._subscribers or self._listeners):
+                    self._pending = []
+                    self._flusher = None
+                    return
+                self._flush_locked()
+
+    def _ensure_flusher(self) -> None:
+        # Called with the lock held
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run_flusher, name='live-stream-flusher', daemon=True)
+            self._flusher.start()
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback receiving each encoded batch (called on the flusher thread)."""
+        with self._lock:
+            self._listeners.append(listener)
+            self._ensure_flusher()
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def sse(self, heartbeat: float = 15.0) -> Iterator[str]:
+        """Generator of Server-Sent Events frames for one subscriber."""
+        with self._lock:
+            self._subscribers += 1
+            self._ensure_flusher()
+            last_seq = self._seq
+        try:
+            yield ': connected\n\n'
+            while True:
+                with self._lock:
+                    if self._seq == last_seq:
+                        self._new_batch.wait(heartbeat)
+                    fresh = [(seq, payload) for seq, payload in self._batches if seq > last_seq]
+                if not fresh:
+                    yield ': keep-alive\n\n'
+                    continue
+                if fresh[0][0] > last_seq + 1:
+                    yield f'event: gap\ndata: {fresh[0][0] - last_seq - 1}\n\n'
+                for seq, payload in fresh:
+                    yield f'id: {seq}\ndata: {payload}\n\n'
+                last_seq = fresh[-1][0]
+        finally:
+            with self._lock:
+                self._subscribers -= 1
@@ -8,17 +8,40 @@ if sys.platform != 'win32':
 
 import time
 import os
-import json
+import argparse
+import tempfile
 import threading
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 
 import pyautogui
 from pynput import mouse, keyboard
 from pynput.mouse import Listener as MouseListener, Controller as MouseController, Button
 from pynput.keyboard import Listener as KeyboardListener, Key, KeyCode
 
+from metrics import (
+    EVENTS_CAPTURED, EVENTS_DROPPED, CALLBACK_DURATION, REPLAY_LATENESS,
+    REPLAY_CONTROLLER_DURATION, REPLAY_EVENTS, SAVE_DURATION, LOAD_DURATION, BYTES_WRITTEN
+)
+from fidelity import FidelityTracker, save_report
+from profiling import PROFILE_DIR, profile_session, run_profiled
+from capture_policy import MoveSampler
+from budgets import EventBuffer
+from recording_io import write_recording
+from capture_pipeline import CaptureConsumer
+from live_stream import LiveEventStream
+from recording_index import SIDECAR_SUFFIXES, write_index
+from replay_plan import build_plan
+from storage import RecordingStore
+from deletion import DeletionService
+from retention import archived_recordings
+from catalog import Catalog
+from search_index import SearchIndex
+from segments import SegmentLibrary
+from recorder_state import IDLE, PAUSED, RECORDING, REPLAYING, SAVING, StateMachine
+from backends import InputBackend, create_backend, replay_keyboard_event, replay_mouse_event
+
 class PreciseActionRecorder:
     """
     A comprehensive tool for recording and precisely replaying user interactions.
@@ -32,24 +55,51 @@ class PreciseActionRecorder:
         log_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'user_action_logs'), 
         max_events: int = 50000, 
         record_keyboard: bool = True,
-        speed_multiplier: float = 5.0  # Remove configuration file support
+        speed_multiplier: float = 5.0,  # Remove configuration file support
+        move_sampler: Optional[MoveSampler] = None,
+        max_keyboard_events: int = 50000,
+        mouse_overflow: str = 'stop',
+        keyboard_overflow: str = 'stop',
+        spill_dir: Optional[str] = None,
+        dedupe_storage: Optional[bool] = None,
+        compression: Optional[str] = None,
+        input_backend: Optional[Union[str, InputBackend]] = None
     ):
         """
         Initialize the action recorder with configurable parameters.
 
         Args:
             log_dir (str): Directory to store log files
-            max_events (int): Maximum number of events to record
+            max_events (int): Maximum number of mouse events to record
             record_keyboard (bool): Whether to record keyboard events
+            move_sampler (Optional[MoveSampler]): Capture policy for mouse moves;
+                defaults to adaptive sampling, pass ``MoveSampler(enabled=False)``
+                to keep every move
+            max_keyboard_events (int): Maximum number of keyboard events to record
+            mouse_overflow (str): Policy once the mouse budget is full
+                ('stop', 'ring', 'drop_moves_first' or 'spill')
+            keyboard_overflow (str): Policy once the keyboard budget is full
+            spill_dir (Optional[str]): Directory for spilled events (defaults to
+                a '.spill' folder inside log_dir)
+            dedupe_storage (Optional[bool]): Store recordings as manifests over a shared,
+                content-addressed chunk store (see ``storage.py``); defaults to
+                $RECORDER_DEDUPE, off unless set to 1
+            compression (Optional[str]): Codec for stored recordings ('none',
+                'gzip', 'zstd', 'lz4'); defaults to $RECORDER_COMPRESSION or none
+            input_backend (Optional[Union[str, InputBackend]]): Replay injection backend
+                or its name ('xtest', 'pynput', 'pyautogui', 'stub'); defaults to
+                $RECORDER_INPUT_BACKEND or xtest, see ``backends.py``
         """
-        self.mouse_events: List[Dict[str, Any]] = []
-        self.keyboard_events: List[Dict[str, Any]] = []
-        self.recording = False
+        spill_dir = spill_dir or os.path.join(log_dir, '.spill')
+        self.mouse_events = EventBuffer('mouse', max_events, mouse_overflow, spill_dir)
+        self.keyboard_events = EventBuffer('keyboard', max_keyboard_events, keyboard_overflow, spill_dir)
+        self.state = StateMachine()
         self.record_keyboard = record_keyboard
         self.max_events = max_events
         self.speed_multiplier = speed_multiplier
-        self.paused = False  # Add paused state
-        self.stop_replay = False  # Add stop replay flag
+        self._stop_replay = threading.Event()
+        self.move_sampler = move_sampler or MoveSampler()
+        self.screen_resolution = pyautogui.size()
         
         # Setup logging
         logging.basicConfig(
@@ -61,23 +111,48 @@ class PreciseActionRecorder:
         # Create log directory
         os.makedirs(log_dir, exist_ok=True)
         self.log_dir = log_dir
+        self.store = RecordingStore(log_dir, dedupe=dedupe_storage, compression=compression)
+        self.deletions = DeletionService(self)
+        self.catalog = Catalog.for_log_dir(log_dir)
+        self.deletions.add_hook(self.catalog.forget)
+        self.search = SearchIndex(self.catalog, log_dir)
+        self.deletions.add_hook(self.search.forget)
+        self.segments = SegmentLibrary(self.store)
         
         # Controllers
         self.mouse_controller = MouseController()
         self.keyboard_controller = keyboard.Controller()
+        self.input = input_backend if isinstance(input_backend, InputBackend) else create_backend(input_backend)
         
-        # Timing tracking
+        # Timing tracking (changed only inside state transitions)
         self.start_time = 0
+        self.pause_time = 0.0
 
         # Modifier key states
         self.ctrl_pressed = False
         self.alt_pressed = False
         self.shift_pressed = False
+
+        # Listener callbacks hand raw events to this consumer thread
+        self.capture = CaptureConsumer({
+            'move': self._handle_move,
+            'click': self._handle_click,
+            'scroll': self._handle_scroll,
+            'press': self._handle_press,
+            'release': self._handle_release
+        })
+        self._listeners: List[Any] = []
+
+        # Batched, delta-coded feed of captured events for live preview
+        self.live_stream = LiveEventStream()
     
     def _generate_log_filename(self) -> str:
         """Generate a log filename with sequential numbering."""
-        # Get existing files
-        existing_files = [f for f in os.listdir(self.log_dir) if f.startswith('user_actions_2024_')]
+        # Get existing files, archived ones included so their numbers are never reused
+        existing_files = [
+            f for f in os.listdir(self.log_dir) + archived_recordings(self.log_dir)
+            if f.startswith('user_actions_2024_') and not f.endswith(SIDECAR_SUFFIXES)
+        ]
         
         # If no files exist, start with 1
         if not existing_files:
@@ -89,76 +164,216 @@ class PreciseActionRecorder:
         
         return os.path.join(self.log_dir, f"user_actions_2024_{next_num}.json")
     
-    def pause_recording(self) -> None:
-        """Pause the recording."""
-        self.paused = True
-        self.pause_time = time.time()  # Track the time when paused
+    @property
+    def recording(self) -> bool:
+        """Whether a recording is in progress (including while paused)."""
+        return self.state.state in (RECORDING, PAUSED)
+
+    @property
+    def paused(self) -> bool:
+        return self.state.state == PAUSED
+
+    @property
+    def stop_replay(self) -> bool:
+        """Request flag checked by the replay loop; setting it wakes a waiting replay."""
+        return self._stop_replay.is_set()
+
+    @stop_replay.setter
+    def stop_replay(self, value: bool) -> None:
+        if value:
+            self._stop_replay.set()
+        else:
+            self._stop_replay.clear()
+
+    def pause_recording(self, timestamp: Optional[float] = None) -> bool:
+        """
+        Pause the recording.
+
+        Args:
+            timestamp (Optional[float]): When the pause was requested (defaults to now)
+
+        Returns:
+            bool: False if no unpaused recording was in progress
+        """
+        def mark():
+            self.pause_time = timestamp or time.time()  # Track the time when paused
+
+        if not self.state.transition(PAUSED, (RECORDING,), mark):
+            return False
         self.logger.info("Recording paused.")
         print("Recording is being paused.")
+        return True
+
+    def resume_recording(self, timestamp: Optional[float] = None) -> bool:
+        """
+        Resume the recording.
 
-    def resume_recording(self) -> None:
-        """Resume the recording."""
-        self.paused = False
-        pause_duration = time.time() - self.pause_time  # Calculate the duration of the pause
-        self.start_time += pause_duration  # Adjust the start time to account for the pause
+        Args:
+            timestamp (Optional[float]): When the resume was requested (defaults to now)
+
+        Returns:
+            bool: False if the recording was not paused
+        """
+        def shift():
+            # Adjust the start time to account for the pause
+            self.start_time += (timestamp or time.time()) - self.pause_time
+
+        if not self.state.transition(RECORDING, (PAUSED,), shift):
+            return False
         self.logger.info("Recording resumed.")
         print("Recording is being unpaused.")
+        return True
+
+    def toggle_pause(self, timestamp: Optional[float] = None) -> Optional[bool]:
+        """
+        Pause a running recording or resume a paused one.
+
+        Returns:
+            Optional[bool]: Whether the recording is now paused, or None if
+            no recording is in progress
+        """
+        if self.resume_recording(timestamp):
+            return False
+        if self.pause_recording(timestamp):
+            return True
+        return None
+
+    def _capturing(self) -> bool:
+        """Check whether input events should currently be captured."""
+        return self.state.state == RECORDING
+
+    def _store_mouse_event(self, event: Dict[str, Any]) -> None:
+        """Append a mouse event, counting events dropped by the overflow policy."""
+        dropped_before = self.mouse_events.dropped
+        if self.mouse_events.append(event):
+            EVENTS_CAPTURED.labels('mouse').inc()
+            self.live_stream.publish('mouse', event)
+        dropped = self.mouse_events.dropped - dropped_before
+        if dropped:
+            EVENTS_DROPPED.labels('mouse').inc(dropped)
+
+    def _store_keyboard_event(self, event: Dict[str, Any]) -> None:
+        """Append a keyboard event and forward it to live subscribers."""
+        if self.keyboard_events.append(event):
+            self.live_stream.publish('keyboard', event)
+
+    def budget_usage(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stream event budget and usage."""
+        return {
+            'mouse': self.mouse_events.usage(),
+            'keyboard': self.keyboard_events.usage()
+        }
+
+    def _flush_pending_moves(self) -> None:
+        """Store the move held back by the sampler before a non-move event."""
+        for move in self.move_sampler.flush():
+            self._store_mouse_event(move)
+
+    # Listener callbacks run on pynput threads and only enqueue raw events;
+    # the capture consumer does everything else (see _handle_* below).
 
     def on_move(self, x: int, y: int) -> None:
-        """Record mouse movement events with precise timing."""
-        if self.recording and not self.paused and len(self.mouse_events) < self.max_events:
-            current_time = time.time()
-            self.mouse_events.append({
+        """Queue a mouse movement event."""
+        callback_start = time.perf_counter()
+        self.capture.put(('move', time.time(), x, y))
+        CALLBACK_DURATION.labels('on_move').observe(time.perf_counter() - callback_start)
+    
+    def on_click(self, x: int, y: int, button: Button, pressed: bool) -> None:
+        """Queue a mouse click event."""
+        callback_start = time.perf_counter()
+        self.capture.put(('click', time.time(), x, y, button, pressed))
+        CALLBACK_DURATION.labels('on_click').observe(time.perf_counter() - callback_start)
+    
+    def on_scroll(self, x: int, y: int, dx: int, dy: int) -> None:
+        """Queue a mouse scroll event."""
+        callback_start = time.perf_counter()
+        self.capture.put(('scroll', time.time(), x, y, dx, dy))
+        CALLBACK_DURATION.labels('on_scroll').observe(time.perf_counter() - callback_start)
+    
+    def on_press(self, key: Key) -> Any:
+        """
+        Queue a keyboard press event.
+        Stops the keyboard listener if Escape key is pressed.
+        """
+        callback_start = time.perf_counter()
+        self.capture.put(('press', time.time(), key))
+        CALLBACK_DURATION.labels('on_press').observe(time.perf_counter() - callback_start)
+        if key == Key.esc:
+            return False
+        return True
+
+    def on_release(self, key: Key) -> Any:
+        """Queue a keyboard release event."""
+        callback_start = time.perf_counter()
+        self.capture.put(('release', time.time(), key))
+        CALLBACK_DURATION.labels('on_release').observe(time.perf_counter() - callback_start)
+        return True
+
+    def _handle_move(self, timestamp: float, x: int, y: int) -> None:
+        """Record mouse movement events, thinned by the move sampler."""
+        if self._capturing():
+            kept = self.move_sampler.offer({
                 'type': 'move',
                 'pos': (x, y),
-                'relative_time': current_time - self.start_time,
-                'screen_resolution': pyautogui.size()
+                'relative_time': timestamp - self.start_time,
+                'screen_resolution': self.screen_resolution
             })
-    
-    def on_click(self, x: int, y: int, button: Button, pressed: bool) -> None:
+            for move in kept:
+                self._store_mouse_event(move)
+
+    def _handle_click(self, timestamp: float, x: int, y: int, button: Button, pressed: bool) -> None:
         """Record mouse click events with precise timing and button details."""
-        if self.recording and not self.paused and len(self.mouse_events) < self.max_events:
-            current_time = time.time()
-            self.mouse_events.append({
+        if self._capturing():
+            self._flush_pending_moves()
+            self._store_mouse_event({
                 'type': 'click',
                 'pos': (x, y),
                 'button': str(button),
                 'pressed': pressed,
-                'relative_time': current_time - self.start_time,
-                'screen_resolution': pyautogui.size()
+                'relative_time': timestamp - self.start_time,
+                'screen_resolution': self.screen_resolution
             })
-    
-    def on_scroll(self, x: int, y: int, dx: int, dy: int) -> None:
+
+    def _handle_scroll(self, timestamp: float, x: int, y: int, dx: int, dy: int) -> None:
         """Record mouse scroll events with precise timing."""
-        if self.recording and not self.paused and len(self.mouse_events) < self.max_events:
-            current_time = time.time()
-            self.mouse_events.append({
+        if self._capturing():
+            self._flush_pending_moves()
+            self._store_mouse_event({
                 'type': 'scroll',
                 'pos': (x, y),
                 'dx': dx,
                 'dy': dy,
-                'relative_time': current_time - self.start_time,
-                'screen_resolution': pyautogui.size(),
+                'relative_time': timestamp - self.start_time,
+                'screen_resolution': self.screen_resolution,
                 'trackpad': True  # Indicate trackpad scroll
             })
-    
-    def on_press(self, key: Key) -> Any:
-        """
-        Record keyboard press events.
-        Stops recording if Escape key is pressed.
-        """
+
+    def _handle_press(self, timestamp: float, key: Key) -> None:
+        """Record a key press, counting stored and dropped keyboard events."""
+        accepted_before = self.keyboard_events.accepted
+        dropped_before = self.keyboard_events.dropped
+        try:
+            self._record_key_press(timestamp, key)
+        finally:
+            accepted = self.keyboard_events.accepted - accepted_before
+            dropped = self.keyboard_events.dropped - dropped_before
+            if accepted > 0:
+                EVENTS_CAPTURED.labels('keyboard').inc(accepted)
+            if dropped > 0:
+                EVENTS_DROPPED.labels('keyboard').inc(dropped)
+
+    def _record_key_press(self, timestamp: float, key: Key) -> None:
+        """Handle a key press: control hotkeys, modifier tracking and event storage."""
         if key == Key.esc:
-            self.stop_recording()
-            return False
+            if self.recording:
+                self.stop_recording()
+            return
         if key == KeyCode(char='p'):
-            if self.paused:
-                self.resume_recording()
-            else:
-                self.pause_recording()
-            return True  # Continue listening for other keys
+            self.toggle_pause(timestamp)
+            return
         
-        if self.recording and not self.paused and self.record_keyboard:
-            current_time = time.time()
+        if self._capturing() and self.record_keyboard:
+            relative_time = timestamp - self.start_time
             try:
                 key_name = key.char  # For regular keys
             except AttributeError:
@@ -172,57 +387,24 @@ class PreciseActionRecorder:
             elif key == Key.shift or key == Key.shift_l or key == Key.shift_r:
                 self.shift_pressed = True
 
-            # Check for Ctrl+Tab and Ctrl+Backspace combinations
-            if key == Key.tab and self.ctrl_pressed:
-                self.keyboard_events.append({
-                    'type': 'keydown',
-                    'key': 'ctrl',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keydown',
-                    'key': 'tab',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keyup',
-                    'key': 'tab',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keyup',
-                    'key': 'ctrl',
-                    'relative_time': current_time - self.start_time
-                })
-            elif key == Key.backspace and self.ctrl_pressed:
-                self.keyboard_events.append({
-                    'type': 'keydown',
-                    'key': 'ctrl',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keydown',
-                    'key': 'backspace',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keyup',
-                    'key': 'backspace',
-                    'relative_time': current_time - self.start_time
-                })
-                self.keyboard_events.append({
-                    'type': 'keyup',
-                    'key': 'ctrl',
-                    'relative_time': current_time - self.start_time
-                })
+            # Expand Ctrl+Tab and Ctrl+Backspace into explicit down/up sequences
+            if (key == Key.tab or key == Key.backspace) and self.ctrl_pressed:
+                combo_key = 'tab' if key == Key.tab else 'backspace'
+                for event_type, event_key in (('keydown', 'ctrl'), ('keydown', combo_key),
+                                              ('keyup', combo_key), ('keyup', 'ctrl')):
+                    self._store_keyboard_event({
+                        'type': event_type,
+                        'key': event_key,
+                        'relative_time': relative_time
+                    })
             else:
-                self.keyboard_events.append({
+                self._store_keyboard_event({
                     'type': 'keypress',
                     'key': key_name,
-                    'relative_time': current_time - self.start_time
+                    'relative_time': relative_time
                 })
     
-    def on_release(self, key: Key) -> Any:
+    def _handle_release(self, timestamp: float, key: Key) -> None:
         """
         Track key release events for modifier keys.
         """
@@ -232,8 +414,6 @@ class PreciseActionRecorder:
             self.alt_pressed = False
         elif key == Key.shift or key == Key.shift_l or key == Key.shift_r:
             self.shift_pressed = False
-        
-        return True
 
     def _is_ctrl_pressed(self) -> bool:
         """Check if the Ctrl key is currently pressed."""
@@ -247,12 +427,35 @@ class PreciseActionRecorder:
         """
         Initiate recording of user actions.
         Captures mouse and keyboard events until Escape is pressed.
+
+        Raises:
+            RecorderBusy: If the recorder is not idle
         """
-        self.mouse_events.clear()
-        self.keyboard_events.clear()
-        self.recording = True
-        self.start_time = time.time()
-        
+        self.begin_recording()
+        self.capture_until_stopped()
+
+    def begin_recording(self) -> None:
+        """
+        Claim the recorder and reset the buffers for a new recording, without
+        starting the listeners (see :meth:`capture_until_stopped`).
+
+        Raises:
+            RecorderBusy: If the recorder is not idle; of several concurrent
+            callers exactly one succeeds
+        """
+        def reset():
+            self.mouse_events.clear()
+            self.keyboard_events.clear()
+            self.move_sampler.reset()
+            self.start_time = time.time()
+
+        self.state.require(RECORDING, (IDLE,), reset)
+        self.screen_resolution = pyautogui.size()
+
+    def capture_until_stopped(self) -> None:
+        """Run the input listeners of a recording claimed by :meth:`begin_recording` until it stops."""
+        self.capture.start()
+        self.live_stream.control('start', start_time=self.start_time)
         self.logger.info("Recording started. Press Esc to stop.")
         
         with MouseListener(
@@ -261,12 +464,19 @@ class PreciseActionRecorder:
             on_scroll=self.on_scroll
         ) as mouse_listener, \
              KeyboardListener(on_press=self.on_press, on_release=self.on_release) as keyboard_listener:
+            self._listeners = [mouse_listener, keyboard_listener]
+            if not self.recording:
+                # Stopped before the listeners were up
+                keyboard_listener.stop()
             try:
                 keyboard_listener.join()
             except KeyboardInterrupt:
                 self.stop_recording()
             finally:
                 mouse_listener.stop()
+                self._listeners = []
+        # Let the consumer finish (including a save triggered by Esc)
+        self.capture.stop()
     
     def stop_recording(self) -> str:
         """
@@ -275,7 +485,23 @@ class PreciseActionRecorder:
         Returns:
             str: Path to the saved log file
         """
-        self.recording = False
+        if not self.recording:
+            return ""
+        # Store everything the listeners queued before the stop request
+        self.capture.drain()
+        # Of concurrent stop requests only one saves
+        if not self.state.transition(SAVING, (RECORDING, PAUSED)):
+            return ""
+        try:
+            return self._save_recording()
+        finally:
+            self.state.transition(IDLE, (SAVING,))
+
+    def _save_recording(self) -> str:
+        for listener in self._listeners:
+            listener.stop()
+        self._flush_pending_moves()
+        self.live_stream.control('stop')
         
         if not self.mouse_events and not self.keyboard_events:
             self.logger.warning("No events to save.")
@@ -284,19 +510,25 @@ class PreciseActionRecorder:
         log_file = self._generate_log_filename()
         
         try:
-            with open(log_file, 'w') as f:
-                json.dump({
-                    'mouse_events': self.mouse_events,
-                    'keyboard_events': self.keyboard_events,
-                    'metadata': {
+            with SAVE_DURATION.time():
+                fd, tmp_file = tempfile.mkstemp(dir=self.log_dir, suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    write_recording(f, self.mouse_events, self.keyboard_events, {
                         'total_mouse_events': len(self.mouse_events),
                         'total_keyboard_events': len(self.keyboard_events),
                         'total_recording_time': self.mouse_events[-1]['relative_time'] 
-                            if self.mouse_events else 0
-                    }
-                }, f, indent=2)
+                            if self.mouse_events else 0,
+                        'move_sampling': self.move_sampler.stats(),
+                        'budgets': self.budget_usage()
+                    })
+                BYTES_WRITTEN.inc(self.store.save_file(tmp_file, log_file))
             
             self.logger.info(f"Events saved to {log_file}")
+            try:
+                write_index(log_file)
+                self.search.index_events(os.path.basename(log_file), self.mouse_events, self.keyboard_events)
+            except Exception as e:
+                self.logger.error(f"Error indexing {log_file}: {e}")
             return log_file
         except Exception as e:
             self.logger.error(f"Error saving log: {e}")
@@ -305,57 +537,119 @@ class PreciseActionRecorder:
     def list_recordings(self) -> List[str]:
         """List all recordings in the log directory."""
         try:
-            return [f for f in os.listdir(self.log_dir) if f.endswith('.json')]
+            return [
+                f for f in os.listdir(self.log_dir)
+                if f.endswith('.json') and not f.endswith(SIDECAR_SUFFIXES)
+            ]
         except Exception as e:
             self.logger.error(f"Error listing recordings: {e}")
             return []
 
-    def replay_events(self, log_file: str, precision_mode: bool = True, filter_events: List[str] = None, loop_count: int = 1) -> None:
+    def close(self) -> None:
+        """Release the input backend and the catalog database (shared by the search index)."""
+        try:
+            self.input.close()
+        finally:
+            self.catalog.close()
+
+    def replay_events(
+        self,
+        log_file: str,
+        precision_mode: bool = True,
+        filter_events: List[str] = None,
+        loop_count: int = 1,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        start_index: Optional[int] = None,
+        end_index: Optional[int] = None,
+        fast_forward: bool = True,
+        speed: float = 1.0,
+        idle_threshold: Optional[float] = None,
+        max_idle: float = 1.0,
+        log_data: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Precisely replay recorded user actions.
 
+        A timing-fidelity report is written next to the recording after
+        every replay (see ``fidelity.report_path``). When only a time range
+        is requested, just the chunks overlapping it are read, using the
+        recording's time index (see ``recording_index``).
+
         Args:
             log_file (str): Path to the JSON log file
             precision_mode (bool): If True, maintains exact timing of original actions
             filter_events (List[str]): List of event types to filter out during replay
             loop_count (int): Number of times to loop the replay (2 to 10)
+            start_time (Optional[float]): Replay only events at or after this offset (seconds)
+            end_time (Optional[float]): Replay only events up to this offset (seconds)
+            start_index (Optional[int]): Replay only events from this index of the merged event list
+            end_index (Optional[int]): Replay only events before this index
+            fast_forward (bool): When starting mid-recording, restore the cursor position
+                and held keys/buttons at the seek point before replaying
+            speed (float): Playback speed factor applied to recorded delays (precision mode)
+            idle_threshold (Optional[float]): Clamp idle gaps longer than this many seconds
+                to ``max_idle`` (precision mode); gaps while a key or button is held keep
+                their timing. None replays every gap as recorded
+            max_idle (float): Length, in recorded seconds, that idle gaps are clamped to
+            log_data (Optional[Dict[str, Any]]): Events to replay instead of reading
+                ``log_file`` (e.g. a compiled playlist); the report is still saved next to ``log_file``
+
+        Returns:
+            Optional[Dict[str, Any]]: The fidelity report, or None if the replay failed
         """
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        # A new replay starts without a pending stop request
+        if not self.state.transition(REPLAYING, (IDLE,), self._stop_replay.clear):
+            self.logger.error(f"Cannot replay while the recorder is {self.state.state}.")
+            print(f"Cannot replay while the recorder is {self.state.state}.")
+            return None
         try:
-            with open(log_file, 'r') as f:
-                log_data = json.load(f)
-            
-            # Combine and sort events
-            all_events = []
-            all_events.extend([
-                {**event, 'event_type': 'mouse'} 
-                for event in log_data.get('mouse_events', [])
-            ])
-            all_events.extend([
-                {**event, 'event_type': 'keyboard'} 
-                for event in log_data.get('keyboard_events', [])
-            ])
-            
-            # Sort events by relative time
-            all_events.sort(key=lambda x: x['relative_time'])
+            with LOAD_DURATION.time():
+                plan = build_plan(log_file, start_time, end_time, start_index, end_index, idle_threshold, max_idle,
+                                  log_data=log_data)
+            if plan.events is not None and (plan.lo > 0 or plan.hi < len(plan.events)):
+                self.logger.info(f"Replaying events {plan.lo}-{plan.hi} of {len(plan.events)}.")
             
+            tracker = FidelityTracker(log_file, precision_mode, speed)
+            loops_played = 0
+
             # Replay events
             for _ in range(loop_count):
                 if self.stop_replay:
                     self.logger.info("Replay stopped by user.")
                     print("Replay stopped by user.")
                     break
-                for i, event in enumerate(all_events):
+                if fast_forward and plan.seeks:
+                    self._replay_all(plan.restore_events())
+                loop_start = time.perf_counter()
+                first_time = previous_time = None
+                tracker.start_loop(loop_start)
+                loops_played += 1
+                for event, play_time in plan.playback():
+                    if first_time is None:
+                        first_time = play_time
+                    wait_time = (play_time - previous_time) / speed if previous_time is not None else 0.0
+                    previous_time = play_time
+                    if filter_events and event['type'] in filter_events:
+                        continue
+                    # Wait for the precise moment; a stop request ends the wait early
+                    if precision_mode and wait_time > 0:
+                        # End of a scheduler tick: deliver everything queued so far
+                        self.input.flush()
+                        self._stop_replay.wait(wait_time)
                     if self.stop_replay:
                         self.logger.info("Replay stopped by user.")
                         print("Replay stopped by user.")
                         break
-                    if filter_events and event['type'] in filter_events:
-                        continue
-                    # Wait for the precise moment
-                    if i > 0 and precision_mode:
-                        wait_time = (event['relative_time'] - all_events[i-1]['relative_time'])
-                        time.sleep(max(0, wait_time))
                     
+                    dispatch_start = time.perf_counter()
+                    intended_offset = (play_time - first_time) / speed if precision_mode else 0.0
+                    if precision_mode:
+                        REPLAY_LATENESS.observe(max(0.0, dispatch_start - loop_start - intended_offset))
+                    tracker.record(intended_offset, dispatch_start)
+
                     # Handle mouse events
                     if event['event_type'] == 'mouse':
                         self._replay_mouse_event(event)
@@ -363,9 +657,44 @@ class PreciseActionRecorder:
                     # Handle keyboard events
                     elif event['event_type'] == 'keyboard':
                         self._replay_keyboard_event(event)
+
+                    REPLAY_CONTROLLER_DURATION.labels(event['event_type']).observe(
+                        time.perf_counter() - dispatch_start)
+                    REPLAY_EVENTS.labels(event['event_type']).inc()
+                self.input.flush()
+                tracker.end_loop()
+                if plan.stops_early:
+                    # Do not leave keys or buttons down when stopping mid-recording
+                    self._replay_all(plan.release_events())
+                    self.input.flush()
             
-            self.logger.info("Replay completed successfully.")
+            report = tracker.build_report(completed=not self.stop_replay)
+            report['range'] = {
+                'start_time': start_time,
+                'end_time': end_time,
+                'start_index': plan.lo,
+                'end_index': plan.hi,
+                'loaded_events': plan.loaded_events,
+                'partial_load': plan.partial,
+                'streamed': plan.events is None
+            }
+            idle_summary = plan.idle_summary
+            if idle_summary is not None:
+                # Wall-clock seconds saved, at the requested speed, over every loop played
+                idle_summary['wall_time_saved'] = (
+                    idle_summary['time_saved'] / speed * loops_played if precision_mode else 0.0)
+                report['idle_compression'] = idle_summary
+            try:
+                save_report(log_file, report)
+            except OSError as e:
+                self.logger.error(f"Error saving fidelity report: {e}")
+
+            self.logger.info(
+                f"Replay completed successfully. p95 lateness {report['lateness']['p95'] * 1000:.2f} ms, "
+                f"{report['throughput_eps']} events/s."
+            )
             print("Replay completed successfully.")
+            return report
         
         except FileNotFoundError:
             self.logger.error(f"Log file not found: {log_file}")
@@ -373,6 +702,25 @@ class PreciseActionRecorder:
         except Exception as e:
             self.logger.error(f"Replay error: {e}")
             print(f"Replay error: {e}")
+        finally:
+            self.state.transition(IDLE, (REPLAYING,))
+        return None
+
+    def replay_playlist(self, name: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Replay a playlist of stored segments (see ``segments``) through
+        :meth:`replay_events`, which accepts the same keyword arguments.
+        """
+        return self.replay_events(self.segments.playlist_path(name), log_data=self.segments.compile(name), **kwargs)
+
+    def _replay_all(self, events: List[Dict[str, Any]]) -> None:
+        """Replay restore/release events of a plan (see ``replay_plan.ReplayPlan``) and deliver them."""
+        for event in events:
+            if event['event_type'] == 'mouse':
+                self._replay_mouse_event(event)
+            else:
+                self._replay_keyboard_event(event)
+        self.input.flush()
     
     def _replay_mouse_event(self, event: Dict[str, Any]) -> None:
         """
@@ -381,42 +729,7 @@ class PreciseActionRecorder:
         Args:
             event (Dict[str, Any]): Mouse event details
         """
-        # Scale coordinates for current screen resolution
-        original_resolution = event.get('screen_resolution', (1920, 1080))
-        current_resolution = pyautogui.size()
-        
-        x, y = event['pos']
-        scaled_x = int(x * (current_resolution[0] / original_resolution[0]))
-        scaled_y = int(y * (current_resolution[1] / original_resolution[1]))
-        
-        if event['type'] == 'move':
-            # Move immediately with no duration
-            self.mouse_controller.position = (scaled_x, scaled_y)
-        elif event['type'] == 'click':
-            # Move instantly then click
-            self.mouse_controller.position = (scaled_x, scaled_y)
-            button = event['button'].lower()
-            if 'left' in button:
-                if event['pressed']:
-                    pyautogui.mouseDown(scaled_x, scaled_y, button='left', duration=0)
-                else:
-                    pyautogui.mouseUp(scaled_x, scaled_y, button='left', duration=0)
-            elif 'right' in button:
-                if event['pressed']:
-                    pyautogui.mouseDown(scaled_x, scaled_y, button='right', duration=0)
-                else:
-                    pyautogui.mouseUp(scaled_x, scaled_y, button='right', duration=0)
-        elif event['type'] == 'scroll':
-            if event.get('trackpad', False):
-                # Simulate trackpad scroll using Shift + Space bar and Down arrow key
-                self.keyboard_controller.press(Key.shift)
-                self.keyboard_controller.press(Key.space)
-                self.keyboard_controller.release(Key.space)
-                self.keyboard_controller.release(Key.shift)
-                self.keyboard_controller.press(Key.down)
-                self.keyboard_controller.release(Key.down)
-            else:
-                pyautogui.scroll(event['dy'])
+        replay_mouse_event(self.input, event)
 
     def _replay_keyboard_event(self, event: Dict[str, Any]) -> None:
         """
@@ -426,58 +739,7 @@ class PreciseActionRecorder:
             event (Dict[str, Any]): Keyboard event details
         """
         try:
-            key_map = {
-                'Key.shift': Key.shift,
-                'Key.shift_r': Key.shift_r,
-                'Key.shift_l': Key.shift_l,
-                'Key.alt': Key.alt,
-                'Key.alt_l': Key.alt_l,
-                'Key.alt_r': Key.alt_r,
-                'Key.ctrl': Key.ctrl,
-                'Key.ctrl_l': Key.ctrl_l,
-                'Key.ctrl_r': Key.ctrl_r,
-                'Key.enter': Key.enter,
-                'Key.caps_lock': Key.caps_lock,
-                'Key.tab': Key.tab,
-                'Key.space': Key.space,
-                'Key.backspace': Key.backspace,
-                'Key.delete': Key.delete,
-                'Key.up': Key.up,
-                'Key.down': Key.down,
-                'Key.left': Key.left,
-                'Key.right': Key.right,
-                'Key.home': Key.home,
-                'Key.end': Key.end,
-                'Key.page_up': Key.page_up,
-                'Key.page_down': Key.page_down,
-                
-                # Added mappings for 'ctrl', 'tab', and 'backspace'
-                'ctrl': Key.ctrl,
-                'tab': Key.tab,
-                'backspace': Key.backspace,
-            }
-
-            event_type = event['type']
-            key = event['key']
-
-            if event_type == 'keydown':
-                if key in key_map:
-                    self.keyboard_controller.press(key_map[key])
-                else:
-                    self.keyboard_controller.press(key)
-            elif event_type == 'keyup':
-                if key in key_map:
-                    self.keyboard_controller.release(key_map[key])
-                else:
-                    self.keyboard_controller.release(key)
-            elif event_type == 'keypress':
-                if key in key_map:
-                    self.keyboard_controller.press(key_map[key])
-                    self.keyboard_controller.release(key_map[key])
-                else:
-                    self.keyboard_controller.press(key)
-                    self.keyboard_controller.release(key)
-
+            replay_keyboard_event(self.input, event)
         except Exception as e:
             self.logger.error(f"Error replaying keyboard event: {e}")
 
@@ -516,11 +778,35 @@ class PreciseActionRecorder:
         )
         self.listener.start()
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """
     Main application loop for the Precise Action Recorder.
     Provides an interactive menu for recording and replaying user actions.
+
+    Args:
+        argv (Optional[List[str]]): Command line arguments (defaults to sys.argv)
     """
+    parser = argparse.ArgumentParser(description="Precise Action Recorder")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile every record/replay session (written to --profile-dir)")
+    parser.add_argument('--profile-dir', default=PROFILE_DIR,
+                        help="Directory for profile files")
+    parser.add_argument('--start', type=float, default=None,
+                        help="Replay from this offset in seconds")
+    parser.add_argument('--end', type=float, default=None,
+                        help="Replay up to this offset in seconds")
+    parser.add_argument('--start-index', type=int, default=None,
+                        help="Replay from this event index")
+    parser.add_argument('--end-index', type=int, default=None,
+                        help="Replay up to (excluding) this event index")
+    parser.add_argument('--no-fast-forward', dest='fast_forward', action='store_false',
+                        help="Do not restore cursor position and held keys at the seek point")
+    parser.add_argument('--compress-idle', dest='idle_threshold', type=float, default=None, metavar='SECONDS',
+                        help="Clamp idle gaps longer than SECONDS to --max-idle during replay")
+    parser.add_argument('--max-idle', type=float, default=1.0,
+                        help="Length idle gaps are clamped to with --compress-idle (seconds)")
+    args = parser.parse_args(argv)
+
     recorder = PreciseActionRecorder()
     
     while True:
@@ -535,10 +821,12 @@ def main():
             
             if choice == '1':
                 # Start recording in a separate thread
-                recording_thread = threading.Thread(target=recorder.start_recording)
+                recording_thread = threading.Thread(
+                    target=run_profiled,
+                    args=(recorder.start_recording, 'recording', args.profile, 'sampling', args.profile_dir)
+                )
                 recording_thread.start()
                 recording_thread.join()
-                recorder.stop_recording()
             
             elif choice == '2':
                 recordings = recorder.list_recordings()
@@ -576,7 +864,14 @@ def main():
                         recorder.stop_replay = False
                         recorder.start_stop_hotkey_listener()
                         
-                        recorder.replay_events(log_path, precision_mode=precision, loop_count=loop_count)
+                        with profile_session(selected_recording, args.profile, 'cprofile', args.profile_dir):
+                            recorder.replay_events(
+                                log_path, precision_mode=precision, loop_count=loop_count,
+                                start_time=args.start, end_time=args.end,
+                                start_index=args.start_index, end_index=args.end_index,
+                                fast_forward=args.fast_forward,
+                                idle_threshold=args.idle_threshold, max_idle=args.max_idle
+                            )
                     
                     except (ValueError, IndexError):
                         print("Invalid selection.")
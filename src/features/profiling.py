@@ -0,0 +1,141 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles')
+
+# cProfile only sees the calling thread, which suits replay. Recording work
+# happens on pynput listener threads, so it is sampled across all threads.
+PROFILE_MODES = ('cprofile', 'sampling')
+PROFILE_EXTENSIONS = {'cprofile': '.prof', 'sampling': '.folded'}
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler covering every thread in the process.
+
+    A daemon thread snapshots ``sys._current_frames()`` at a fixed interval
+    and aggregates the stacks into the "folded" format understood by
+    flamegraph tools (``frame;frame;frame count``).
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack: List[str] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _profile_filename(label: str, mode: str) -> str:
+    safe_label = re.sub(r'[^A-Za-z0-9_.-]', '_', label) or 'session'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return f"{safe_label}_{timestamp}{PROFILE_EXTENSIONS[mode]}"
+
+
+@contextmanager
+def profile_session(label: str, enabled: bool = False, mode: str = 'cprofile', profile_dir: str = PROFILE_DIR):
+    """
+    Profile the enclosed block and write the result to ``profile_dir``.
+
+    When ``enabled`` is False nothing is started and the block runs
+    untouched, so the disabled path costs a single branch.
+
+    Args:
+        label (str): Prefix for the profile filename (e.g. the recording name)
+        enabled (bool): Whether to profile at all
+        mode (str): 'cprofile' for a deterministic dump of the calling thread,
+            'sampling' for a folded-stack sample of every thread
+        profile_dir (str): Directory to store profile files
+
+    Yields:
+        Optional[str]: Path the profile will be written to, or None when disabled
+    """
+    if not enabled:
+        yield None
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, _profile_filename(label, mode))
+    profiler: Any = cProfile.Profile() if mode == 'cprofile' else SamplingProfiler()
+    if mode == 'cprofile':
+        profiler.enable()
+    else:
+        profiler.start()
+    try:
+        yield path
+    finally:
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        profiler.dump_stats(path)
+
+
+def run_profiled(
+    func: Callable[..., Any],
+    label: str,
+    enabled: bool,
+    mode: str = 'cprofile',
+    profile_dir: str = PROFILE_DIR,
+    *args: Any,
+    **kwargs: Any
+) -> Any:
+    """Call ``func(*args, **kwargs)`` inside :func:`profile_session`; usable as a thread target."""
+    with profile_session(label, enabled, mode, profile_dir):
+        return func(*args, **kwargs)
+
+
+def list_profiles(profile_dir: str = PROFILE_DIR) -> List[Dict[str, Any]]:
+    """List stored profiles, newest first."""
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for name in os.listdir(profile_dir):
+        if not name.endswith(tuple(PROFILE_EXTENSIONS.values())):
+            continue
+        stat = os.stat(os.path.join(profile_dir, name))
+        profiles.append({'name': name, 'size': stat.st_size, 'modified': stat.st_mtime})
+    profiles.sort(key=lambda p: p['modified'], reverse=True)
+    return profiles
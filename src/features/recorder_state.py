@@ -0,0 +1,111 @@
+"""
+Recorder state machine.
+
+    idle --> recording <--> paused
+               |              |
+               +--> saving <--+
+                      |
+    idle <------------+
+    idle <--> replaying
+
+Every transition is a compare-and-set under one lock: a caller names the
+states it may leave, and exactly one of several concurrent callers
+(dashboard clients, listener hotkeys, replay threads) wins. Listeners are
+called after every transition, so status pushes follow state changes
+instead of polling for them. Reads of :attr:`StateMachine.state` take no
+lock, so the capture hot path can check it per event.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+IDLE = 'idle'
+RECORDING = 'recording'
+PAUSED = 'paused'
+SAVING = 'saving'
+REPLAYING = 'replaying'
+
+TRANSITIONS = {
+    IDLE: {RECORDING, REPLAYING},
+    RECORDING: {PAUSED, SAVING},
+    PAUSED: {RECORDING, SAVING},
+    SAVING: {IDLE},
+    REPLAYING: {IDLE},
+}
+
+
+class RecorderBusy(RuntimeError):
+    """Raised when an operation needs a state the recorder is not in."""
+
+
+class StateMachine:
+    """Current recorder state with atomic, validated transitions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str], None]] = []
+        self.state = IDLE
+        self.since = time.time()
+        self.transitions = 0
+        # Seconds spent in each state before the current one
+        self.durations = {state: 0.0 for state in TRANSITIONS}
+
+    def transition(
+        self,
+        target: str,
+        sources: Iterable[str],
+        action: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """
+        Move to ``target`` if the current state is one of ``sources``.
+
+        ``action`` runs under the lock just before the new state becomes
+        visible, so fields it sets (e.g. the recording start time) are
+        consistent with the state for every reader that sees it.
+
+        Listeners are called with the new state after the lock is released.
+
+        Returns:
+            bool: Whether this caller made the transition
+        """
+        with self._lock:
+            if self.state not in sources:
+                return False
+            if target not in TRANSITIONS[self.state]:
+                raise ValueError(f"Invalid transition {self.state} -> {target}")
+            if action is not None:
+                action()
+            now = time.time()
+            self.durations[self.state] += now - self.since
+            self.state = target
+            self.since = now
+            self.transitions += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(target)
+        return True
+
+    def require(self, target: str, sources: Iterable[str], action: Optional[Callable[[], None]] = None) -> None:
+        """:meth:`transition`, raising ``RecorderBusy`` when it is not possible."""
+        sources = tuple(sources)
+        if not self.transition(target, sources, action):
+            raise RecorderBusy(f"Recorder is {self.state}, expected {' or '.join(sources)}")
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(state)`` after every transition; it must not block."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            durations = dict(self.durations)
+            durations[self.state] += time.time() - self.since
+            return {
+                'state': self.state, 'since': self.since, 'transitions': self.transitions,
+                'durations': durations
+            }
@@ -0,0 +1,414 @@
+"""
+Diff and splice recordings.
+
+Two recordings are compared as sequences of actions. An action is one
+event, except that consecutive moves (and consecutive scrolls in one
+direction) collapse into a single action, so re-recording the same flow
+with a different pointer path still lines up. Tokens are the event type
+plus its key or button ('move', 'left:down', 'keydown:ctrl',
+'keypress:a'), so the alignment follows what was done, not where the
+pointer was.
+
+The alignment is Myers' O((N+M)D) diff in its linear-space form: each
+step finds the middle snake of the remaining range and recurses on both
+halves, so memory stays proportional to the number of actions. Events
+are streamed chunk by chunk through the recording's time index (see
+``recording_index``) and only a token id, a time and an event index are
+kept per action, which keeps 50k+ event recordings in bounded memory.
+Ranges that have not converged by the deadline are reported as replaced.
+
+Matched actions whose gap to the previous matched action changed by more
+than a tolerance start a 'shifted' segment: the same actions, at a
+different time relative to what precedes them.
+
+``splice`` copies a time range of one recording into another, shifting
+the target's later events to make room.
+"""
+import argparse
+import json
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from backends import button_name
+from recording_index import STREAMS, iter_events
+from recording_io import serialize_recording
+from search_index import normalize_key
+from storage import load_recording
+
+# Shift in seconds between matched actions that counts as a timing change
+SHIFT_TOLERANCE = 0.5
+# Seconds spent aligning before unresolved ranges are reported as replaced
+DIFF_DEADLINE = 10.0
+# Tokens whose consecutive repeats form one action
+_CONTINUOUS = ('move', 'scroll:')
+# Removals sort before insertions at the same position
+_TAG_ORDER = {'equal': 0, 'delete': 1, 'replace': 2, 'insert': 3}
+
+
+def event_token(stream: str, event: Dict[str, Any]) -> str:
+    """Alignment token of an event."""
+    event_type = event.get('type')
+    if stream == 'keyboard_events':
+        return f"{event_type}:{normalize_key(event.get('key') or '')}"
+    if event_type == 'click':
+        return f"{button_name(event.get('button', ''))}:{'down' if event.get('pressed') else 'up'}"
+    if event_type == 'scroll':
+        return 'scroll:up' if event.get('dy', 0) > 0 else 'scroll:down'
+    return event_type or 'unknown'
+
+
+class ActionSequence:
+    """
+    Compact action list of one recording.
+
+    Attributes:
+        tokens (array): Token id of each action
+        times (array): Time of each action's first event
+        starts (array): Merged-order index of each action's first event
+        events (int): Number of events in the recording
+        vocabulary (Dict[str, int]): Token -> id, shared between compared recordings
+    """
+
+    def __init__(self, log_file: str, vocabulary: Dict[str, int]):
+        self.tokens = array('l')
+        self.times = array('d')
+        self.starts = array('l')
+        self.vocabulary = vocabulary
+        previous = None
+        count = 0
+        for relative_time, stream, event in iter_events(log_file):
+            token = event_token(stream, event)
+            if not (token == previous and token.startswith(_CONTINUOUS)):
+                self.tokens.append(vocabulary.setdefault(token, len(vocabulary)))
+                self.times.append(relative_time)
+                self.starts.append(count)
+            previous = token
+            count += 1
+        self.events = count
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def event_range(self, lo: int, hi: int) -> List[int]:
+        """Merged-order event indices ``[start, end)`` covered by actions ``[lo, hi)``."""
+        start = self.starts[lo] if lo < len(self) else self.events
+        end = self.starts[hi] if hi < len(self) else self.events
+        return [start, end]
+
+    def time_range(self, lo: int, hi: int) -> List[Optional[float]]:
+        if lo >= hi:
+            return [None, None]
+        return [self.times[lo], self.times[hi - 1]]
+
+
+def _middle_snake(a, b, a0: int, a1: int, b0: int, b1: int, deadline: float) -> Optional[Tuple[int, int]]:
+    """
+    Split point of an optimal alignment of ``a[a0:a1]`` and ``b[b0:b1]``,
+    found by running Myers' search from both ends until the paths overlap.
+    None when the ranges share nothing or the deadline passed.
+    """
+    n, m = a1 - a0, b1 - b0
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    size = 2 * max_d + 2
+    forward = [-1] * size
+    backward = [-1] * size
+    forward[offset + 1] = 0
+    backward[offset + 1] = 0
+    delta = n - m
+    odd = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    for d in range(max_d):
+        if time.monotonic() > deadline:
+            return None
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif odd:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and backward[k2_offset] != -1:
+                    if x1 >= n - backward[k2_offset]:
+                        return a0 + x1, b0 + y1
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and backward[k2_offset - 1] < backward[k2_offset + 1]):
+                x2 = backward[k2_offset + 1]
+            else:
+                x2 = backward[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a1 - x2 - 1] == b[b1 - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            backward[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not odd:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    y1 = x1 - (k1_offset - offset)
+                    if x1 >= n - x2:
+                        return a0 + x1, b0 + y1
+    return None
+
+
+def align(a, b, deadline: float = DIFF_DEADLINE) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Opcodes ``(tag, a_lo, a_hi, b_lo, b_hi)`` turning ``a`` into ``b``, with
+    tags 'equal', 'delete', 'insert' and 'replace' (the latter only for
+    ranges left unresolved at the deadline).
+    """
+    stop = time.monotonic() + deadline
+    pieces: List[Tuple[int, int, int, str, int, int]] = []
+
+    def emit(tag: str, a_lo: int, a_hi: int, b_lo: int, b_hi: int) -> None:
+        pieces.append((a_lo, b_lo, _TAG_ORDER[tag], tag, a_hi, b_hi))
+
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        prefix = 0
+        while a0 + prefix < a1 and b0 + prefix < b1 and a[a0 + prefix] == b[b0 + prefix]:
+            prefix += 1
+        suffix = 0
+        while a1 - suffix > a0 + prefix and b1 - suffix > b0 + prefix and a[a1 - suffix - 1] == b[b1 - suffix - 1]:
+            suffix += 1
+        if prefix:
+            emit('equal', a0, a0 + prefix, b0, b0 + prefix)
+        if suffix:
+            emit('equal', a1 - suffix, a1, b1 - suffix, b1)
+        a0, b0, a1, b1 = a0 + prefix, b0 + prefix, a1 - suffix, b1 - suffix
+        if a0 == a1 or b0 == b1:
+            if a0 < a1:
+                emit('delete', a0, a1, b0, b0)
+            if b0 < b1:
+                emit('insert', a0, a0, b0, b1)
+            continue
+        split = _middle_snake(a, b, a0, a1, b0, b1, stop)
+        if split is None:
+            emit('replace', a0, a1, b0, b1)
+        else:
+            x, y = split
+            stack.append((a0, x, b0, y))
+            stack.append((x, a1, y, b1))
+
+    # Pieces never overlap and advance together in both sequences
+    pieces.sort()
+    return _absorb_short_matches([(tag, a_lo, a_hi, b_lo, b_hi) for a_lo, b_lo, _, tag, a_hi, b_hi in pieces])
+
+
+def _absorb_short_matches(opcodes: List[Tuple[str, int, int, int, int]]) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Fold matches no longer than the edits on both sides into one
+    replacement, until none are left: a few actions that happen to
+    coincide inside a re-recorded passage are not a shared segment.
+    """
+    def size(op):
+        return max(op[2] - op[1], op[4] - op[3])
+
+    def join(first, second):
+        tag = first[0] if first[0] == second[0] else 'replace'
+        return (tag, first[1], second[2], first[3], second[4])
+
+    changed = True
+    while changed:
+        changed = False
+        merged: List[Tuple[str, int, int, int, int]] = []
+        for op in opcodes:
+            if merged and op[0] != 'equal' and merged[-1][0] != 'equal':
+                merged[-1] = join(merged[-1], op)
+            elif merged and op[0] == 'equal' and merged[-1][0] == 'equal':
+                merged[-1] = ('equal', merged[-1][1], op[2], merged[-1][3], op[4])
+            else:
+                merged.append(op)
+        opcodes = []
+        for i, op in enumerate(merged):
+            if (op[0] == 'equal' and 0 < i < len(merged) - 1
+                    and size(op) <= min(size(opcodes[-1]), size(merged[i + 1]))):
+                opcodes[-1] = join(opcodes[-1], ('replace',) + op[1:])
+                changed = True
+            elif opcodes and op[0] != 'equal' and opcodes[-1][0] != 'equal':
+                opcodes[-1] = join(opcodes[-1], op)
+            else:
+                opcodes.append(op)
+    return opcodes
+
+
+def _segment(op: str, a: ActionSequence, b: ActionSequence, a_lo: int, a_hi: int, b_lo: int, b_hi: int,
+             **extra) -> Dict[str, Any]:
+    return {
+        'op': op,
+        'actions': max(a_hi - a_lo, b_hi - b_lo),
+        'a': {'events': a.event_range(a_lo, a_hi), 'time': a.time_range(a_lo, a_hi)},
+        'b': {'events': b.event_range(b_lo, b_hi), 'time': b.time_range(b_lo, b_hi)},
+        **extra
+    }
+
+
+def diff_actions(
+    a: ActionSequence,
+    b: ActionSequence,
+    tolerance: float = SHIFT_TOLERANCE,
+    deadline: float = DIFF_DEADLINE
+) -> Dict[str, Any]:
+    """Segments turning recording ``a`` into ``b`` (see ``diff_recordings``)."""
+    segments: List[Dict[str, Any]] = []
+    counts = {'equal': 0, 'shifted': 0, 'removed': 0, 'inserted': 0}
+    for tag, a_lo, a_hi, b_lo, b_hi in align(a.tokens, b.tokens, deadline):
+        if tag in ('delete', 'replace'):
+            segments.append(_segment('removed', a, b, a_lo, a_hi, b_lo, b_lo))
+            counts['removed'] += a_hi - a_lo
+        if tag in ('insert', 'replace'):
+            segments.append(_segment('inserted', a, b, a_hi, a_hi, b_lo, b_hi))
+            counts['inserted'] += b_hi - b_lo
+        if tag != 'equal':
+            continue
+        # Split matched runs where the gap to the previous action changed
+        run_start, op, shift = a_lo, 'equal', 0.0
+        for i in range(a_lo + 1, a_hi):
+            j = b_lo + (i - a_lo)
+            gap_change = (b.times[j] - b.times[j - 1]) - (a.times[i] - a.times[i - 1])
+            if abs(gap_change) > tolerance:
+                k = b_lo + (run_start - a_lo)
+                segments.append(_segment(op, a, b, run_start, i, k, j, offset=b.times[k] - a.times[run_start],
+                                         **({'shift': shift} if op == 'shifted' else {})))
+                counts[op] += i - run_start
+                run_start, op, shift = i, 'shifted', gap_change
+        k = b_lo + (run_start - a_lo)
+        segments.append(_segment(op, a, b, run_start, a_hi, k, b_hi, offset=b.times[k] - a.times[run_start],
+                                 **({'shift': shift} if op == 'shifted' else {})))
+        counts[op] += a_hi - run_start
+    matched = counts['equal'] + counts['shifted']
+    return {
+        'actions': {'a': len(a), 'b': len(b)},
+        'events': {'a': a.events, 'b': b.events},
+        'counts': counts,
+        'similarity': 2 * matched / (len(a) + len(b)) if len(a) + len(b) else 1.0,
+        'segments': segments
+    }
+
+
+def diff_recordings(
+    a_file: str,
+    b_file: str,
+    tolerance: float = SHIFT_TOLERANCE,
+    deadline: float = DIFF_DEADLINE
+) -> Dict[str, Any]:
+    """
+    Compare two recordings.
+
+    Args:
+        a_file (str): Path to the original recording
+        b_file (str): Path to the new recording
+        tolerance (float): Gap change in seconds that makes matched actions 'shifted'
+        deadline (float): Seconds to spend aligning
+
+    Returns:
+        Dict[str, Any]: Action counts per op, a similarity ratio and segments
+        ('equal', 'shifted', 'removed', 'inserted'), each with the merged-order
+        event range and time range it covers in both recordings
+    """
+    vocabulary: Dict[str, int] = {}
+    started = time.perf_counter()
+    result = diff_actions(ActionSequence(a_file, vocabulary), ActionSequence(b_file, vocabulary), tolerance, deadline)
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+
+def splice(
+    target: Dict[str, Any],
+    source: Dict[str, Any],
+    source_start: float,
+    source_end: float,
+    at: float,
+    replace_until: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Copy ``source`` events in ``[source_start, source_end)`` into ``target`` at ``at``.
+
+    Target events from ``at`` up to ``replace_until`` (default: none) are
+    dropped and later ones move by the difference in length, so the result
+    stays in time order. Cut at segment boundaries from ``diff_recordings``
+    to avoid splitting a key or button press (``dry_run`` reports any that are).
+
+    Returns:
+        Dict[str, Any]: A new recording; ``target`` and ``source`` are not modified
+    """
+    if source_end < source_start:
+        raise ValueError("source_end must not precede source_start")
+    replace_until = at if replace_until is None else replace_until
+    if replace_until < at:
+        raise ValueError("replace_until must not precede at")
+    shift = (source_end - source_start) - (replace_until - at)
+    result = {'metadata': dict(target.get('metadata') or {})}
+    for stream in STREAMS:
+        events = [event for event in target.get(stream, []) if event['relative_time'] < at]
+        events.extend(
+            {**event, 'relative_time': event['relative_time'] - source_start + at}
+            for event in source.get(stream, [])
+            if source_start <= event['relative_time'] < source_end
+        )
+        events.extend(
+            {**event, 'relative_time': event['relative_time'] + shift}
+            for event in target.get(stream, [])
+            if event['relative_time'] >= replace_until
+        )
+        result[stream] = events
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare or splice recordings")
+    commands = parser.add_subparsers(dest='command', required=True)
+    compare = commands.add_parser('diff', help="Show what changed between two recordings")
+    compare.add_argument('a', help="Original recording")
+    compare.add_argument('b', help="New recording")
+    compare.add_argument('--tolerance', type=float, default=SHIFT_TOLERANCE, help="Timing change that counts as shifted")
+    compare.add_argument('--json', action='store_true', help="Print the full result as JSON")
+    join = commands.add_parser('splice', help="Copy a time range of one recording into another")
+    join.add_argument('target', help="Recording to splice into")
+    join.add_argument('source', help="Recording to copy from")
+    join.add_argument('--from', dest='source_start', type=float, required=True, help="Start of the source range")
+    join.add_argument('--to', dest='source_end', type=float, required=True, help="End of the source range")
+    join.add_argument('--at', type=float, required=True, help="Insertion time in the target")
+    join.add_argument('--replace-until', type=float, help="Drop target events from --at up to this time")
+    join.add_argument('--output', required=True, help="Path of the spliced recording")
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        result = diff_recordings(args.a, args.b, args.tolerance)
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return
+        for segment in result['segments']:
+            if segment['op'] == 'equal':
+                continue
+            a_time, b_time = segment['a']['time'], segment['b']['time']
+            where = f"a {a_time[0]:.2f}-{a_time[1]:.2f}s" if a_time[0] is not None else f"b {b_time[0]:.2f}-{b_time[1]:.2f}s"
+            shift = f" ({segment['shift']:+.2f}s)" if 'shift' in segment else ''
+            print(f"{segment['op']:<9} {segment['actions']:>6} actions  {where}{shift}")
+        print(f"similarity {result['similarity']:.3f}, {result['counts']} in {result['elapsed']:.2f}s")
+    else:
+        data = splice(load_recording(args.target), load_recording(args.source),
+                      args.source_start, args.source_end, args.at, args.replace_until)
+        with open(args.output, 'wb') as f:
+            f.write(serialize_recording(data))
+
+
+if __name__ == '__main__':
+    main()
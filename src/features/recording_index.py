@@ -0,0 +1,275 @@
+"""
+Sparse time index and chunk table for random access into recordings.
+
+Each stream ('mouse_events', 'keyboard_events') is cut into chunks of
+consecutive events falling in the same ``bucket_seconds`` time bucket
+(split further at ``max_chunk_events``). For every chunk the index stores
+the byte range of its events inside the recording, the event count, the
+time span, the bounding box of positions and the input state on entry
+(cursor position, held keys/buttons). Readers can then seek straight to
+the chunks covering a time window and parse only those bytes. Offsets
+refer to the logical recording content, so they stay valid for
+deduplicated recordings read through ``storage.open_recording``.
+
+The index is stored next to the recording as ``<name>.index.json``. It
+is written at save time and rebuilt on demand when it is missing or the
+recording changed (legacy files), so callers should use :func:`get_index`.
+"""
+import heapq
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fidelity import FIDELITY_SUFFIX
+from storage import open_recording, read_recording_bytes
+
+INDEX_SUFFIX = '.index.json'
+# Files stored next to recordings that are not recordings themselves
+SIDECAR_SUFFIXES = (FIDELITY_SUFFIX, INDEX_SUFFIX)
+INDEX_VERSION = 1
+STREAMS = ('mouse_events', 'keyboard_events')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+def index_path(log_file: str) -> str:
+    """Return the path of the index stored next to a recording."""
+    base, _ = os.path.splitext(log_file)
+    return base + INDEX_SUFFIX
+
+
+def _skip(text: str, pos: int) -> int:
+    return _WHITESPACE.match(text, pos).end()
+
+
+def scan_events(data: bytes) -> Dict[str, List[Tuple[int, int, Dict[str, Any]]]]:
+    """
+    Locate every event of a recording document.
+
+    Works for any JSON layout (pretty-printed legacy files included). The
+    bytes are decoded as latin-1 so character offsets equal byte offsets;
+    only numeric fields of the decoded events are relied upon.
+
+    Returns:
+        Dict[str, List[Tuple[int, int, Dict[str, Any]]]]: Per stream, the
+        ``(start, end, event)`` byte span of each event
+    """
+    text = data.decode('latin-1')
+    spans: Dict[str, List[Tuple[int, int, Dict[str, Any]]]] = {stream: [] for stream in STREAMS}
+    pos = _skip(text, 0)
+    if text[pos] != '{':
+        raise ValueError("Recording is not a JSON object")
+    pos = _skip(text, pos + 1)
+    while text[pos] != '}':
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = _skip(text, pos)
+        if text[pos] != ':':
+            raise ValueError(f"Malformed recording near byte {pos}")
+        pos = _skip(text, pos + 1)
+        if key in spans and text[pos] == '[':
+            pos = _skip(text, pos + 1)
+            while text[pos] != ']':
+                event, end = _decoder.raw_decode(text, pos)
+                spans[key].append((pos, end, event))
+                pos = _skip(text, end)
+                if text[pos] == ',':
+                    pos = _skip(text, pos + 1)
+            pos += 1
+        else:
+            _, pos = _decoder.raw_decode(text, pos)
+        pos = _skip(text, pos)
+        if text[pos] == ',':
+            pos = _skip(text, pos + 1)
+    return spans
+
+
+def _build_chunks(
+    spans: List[Tuple[int, int, Dict[str, Any]]],
+    bucket_seconds: float,
+    max_chunk_events: int
+) -> List[Dict[str, Any]]:
+    chunks: List[Dict[str, Any]] = []
+    cursor: Optional[List[Any]] = None
+    held: Dict[str, Dict[str, Any]] = {}
+    current: Optional[Dict[str, Any]] = None
+    for index, (start, end, event) in enumerate(spans):
+        t = event['relative_time']
+        bucket = int(t // bucket_seconds)
+        if current is None or current['bucket'] != bucket or current['count'] >= max_chunk_events:
+            current = {
+                'bucket': bucket,
+                'first_index': index,
+                'count': 0,
+                'start_time': t,
+                'end_time': t,
+                'offset': start,
+                'length': 0,
+                'bbox': None,
+                'entry': {'cursor': cursor, 'held': list(held.values())}
+            }
+            chunks.append(current)
+        current['count'] += 1
+        current['end_time'] = t
+        current['length'] = end - current['offset']
+        pos = event.get('pos')
+        if pos is not None:
+            x, y = pos[0], pos[1]
+            bbox = current['bbox']
+            current['bbox'] = [x, y, x, y] if bbox is None else [
+                min(bbox[0], x), min(bbox[1], y), max(bbox[2], x), max(bbox[3], y)]
+            cursor = [x, y, event.get('screen_resolution')]
+        event_type = event.get('type')
+        if event_type == 'keydown':
+            held['key:' + event['key']] = event
+        elif event_type == 'keyup':
+            held.pop('key:' + event['key'], None)
+        elif event_type == 'click':
+            if event.get('pressed'):
+                held['button:' + event['button']] = event
+            else:
+                held.pop('button:' + event['button'], None)
+    return chunks
+
+
+def build_index(log_file: str, bucket_seconds: float = 1.0, max_chunk_events: int = 1024) -> Dict[str, Any]:
+    """
+    Scan a recording and build its index.
+
+    Args:
+        log_file (str): Path to the recording
+        bucket_seconds (float): Width of a time bucket
+        max_chunk_events (int): Maximum number of events in one chunk
+    """
+    stat = os.stat(log_file)
+    spans = scan_events(read_recording_bytes(log_file))
+    return {
+        'version': INDEX_VERSION,
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'bucket_seconds': bucket_seconds,
+        'streams': {
+            stream: {
+                'count': len(spans[stream]),
+                'duration': spans[stream][-1][2]['relative_time'] if spans[stream] else 0.0,
+                'chunks': _build_chunks(spans[stream], bucket_seconds, max_chunk_events)
+            }
+            for stream in STREAMS
+        }
+    }
+
+
+def write_index(log_file: str, index: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build (if not given) and store the index of a recording."""
+    if index is None:
+        index = build_index(log_file)
+    with open(index_path(log_file), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    return index
+
+
+def _is_current(index: Dict[str, Any], log_file: str) -> bool:
+    stat = os.stat(log_file)
+    return (index.get('version') == INDEX_VERSION
+            and index.get('source_size') == stat.st_size
+            and index.get('source_mtime') == stat.st_mtime)
+
+
+def get_index(log_file: str) -> Dict[str, Any]:
+    """Load the index of a recording, regenerating it if missing or stale."""
+    path = index_path(log_file)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                index = json.load(f)
+            if _is_current(index, log_file):
+                return index
+        except (OSError, ValueError):
+            pass
+    return write_index(log_file)
+
+
+def chunks_in_window(
+    index: Dict[str, Any],
+    stream: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Chunks of ``stream`` overlapping ``[start_time, end_time]``."""
+    chunks = index['streams'][stream]['chunks']
+    return [
+        chunk for chunk in chunks
+        if (start_time is None or chunk['end_time'] >= start_time)
+        and (end_time is None or chunk['start_time'] <= end_time)
+    ]
+
+
+def read_chunks(f, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Parse the events of consecutive chunks from an open binary file."""
+    if not chunks:
+        return []
+    start = chunks[0]['offset']
+    end = chunks[-1]['offset'] + chunks[-1]['length']
+    f.seek(start)
+    return json.loads(b'[' + f.read(end - start) + b']')
+
+
+def iter_events(log_file: str) -> Iterator[Tuple[float, str, Dict[str, Any]]]:
+    """
+    Yield ``(relative_time, stream, event)`` in time order, reading one
+    chunk per stream at a time.
+    """
+    index = get_index(log_file)
+    handles = []
+
+    def stream_events(stream: str) -> Iterator[Tuple[float, str, Dict[str, Any]]]:
+        f = open_recording(log_file)
+        handles.append(f)
+        for chunk in index['streams'][stream]['chunks']:
+            for event in read_chunks(f, [chunk]):
+                yield event['relative_time'], stream, event
+
+    try:
+        # Mouse events sort first on equal times, like replay_plan.merge_events
+        yield from heapq.merge(*(stream_events(stream) for stream in STREAMS), key=lambda item: item[0])
+    finally:
+        for f in handles:
+            f.close()
+
+
+def load_window(
+    log_file: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    index: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Load only the chunks of a recording that overlap a time window.
+
+    Events of the first overlapping chunk that precede ``start_time`` are
+    included so callers can rebuild the input state at the seek point from
+    the chunk's ``entry`` state; a stream with no event in the window
+    loads its last chunk before ``start_time`` for the same reason.
+
+    Returns:
+        Dict[str, Any]: 'mouse_events' and 'keyboard_events' lists plus an
+        'entry' map with the entry state of each stream's first loaded chunk
+    """
+    if index is None:
+        index = get_index(log_file)
+    result: Dict[str, Any] = {'entry': {}}
+    with open_recording(log_file) as f:
+        for stream in STREAMS:
+            chunks = chunks_in_window(index, stream, start_time, end_time)
+            if not chunks and start_time is not None:
+                # Nothing in the window: the last earlier chunk carries the
+                # input state (held keys, cursor) at the seek point
+                before = [chunk for chunk in index['streams'][stream]['chunks'] if chunk['end_time'] < start_time]
+                chunks = before[-1:]
+            events = read_chunks(f, chunks)
+            if end_time is not None:
+                events = [event for event in events if event['relative_time'] <= end_time]
+            result[stream] = events
+            result['entry'][stream] = chunks[0]['entry'] if chunks else {'cursor': None, 'held': []}
+    return result
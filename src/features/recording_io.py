@@ -0,0 +1,49 @@
+import io
+import json
+from typing import Any, Dict, IO, Iterable
+
+
+def _iter_json(events: Iterable[Dict[str, Any]]) -> Iterable[str]:
+    iter_json = getattr(events, 'iter_json', None)
+    if iter_json is not None:
+        return iter_json()
+    return (json.dumps(event) for event in events)
+
+
+def write_recording(
+    f: IO[str],
+    mouse_events: Iterable[Dict[str, Any]],
+    keyboard_events: Iterable[Dict[str, Any]],
+    metadata: Dict[str, Any]
+) -> None:
+    """
+    Stream a recording to ``f`` one event per line.
+
+    The output is the same JSON document ``json.dump`` would produce, but
+    events are serialised one at a time so spilled buffers are never
+    materialised in memory.
+    """
+    f.write('{\n')
+    for name, events in (('mouse_events', mouse_events), ('keyboard_events', keyboard_events)):
+        f.write(f'  "{name}": [')
+        separator = '\n    '
+        for line in _iter_json(events):
+            f.write(separator)
+            f.write(line)
+            separator = ',\n    '
+        f.write('\n  ],\n' if separator != '\n    ' else '],\n')
+    f.write('  "metadata": ')
+    f.write(json.dumps(metadata, indent=2).replace('\n', '\n  '))
+    f.write('\n}\n')
+
+
+def serialize_recording(data: Dict[str, Any]) -> bytes:
+    """
+    Encode a parsed recording exactly as ``write_recording`` stores it.
+
+    Recordings that round-trip through export/import therefore come back
+    byte-identical, which lets the content-addressed store deduplicate them.
+    """
+    buffer = io.StringIO()
+    write_recording(buffer, data.get('mouse_events', []), data.get('keyboard_events', []), data.get('metadata', {}))
+    return buffer.getvalue().encode()
@@ -0,0 +1,182 @@
+"""
+Replay planning, shared by live replay (``PreciseActionRecorder.replay_events``)
+and the headless dry run (``dry_run.py``).
+
+A plan is everything decided before the first event is injected: the
+merged, time-sorted event list (only the overlapping chunks are read for
+a pure time window), the ``[lo, hi)`` range to play and the playback
+schedule, with idle gaps compressed on request.
+
+A whole recording played from the start needs no seeking, so it is not
+loaded up front: a :class:`StreamedPlan` reads it chunk by chunk through
+the time index while it plays, and replay starts as soon as the first
+chunks are decompressed.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from recording_index import STREAMS, iter_events, load_window
+from storage import load_recording
+from timeline import IdleCompressor, ReplayTimeline, compress_idle
+
+_EVENT_TYPES = dict(zip(STREAMS, ('mouse', 'keyboard')))
+
+
+class ReplayPlan:
+    """
+    Attributes:
+        events (List[Dict[str, Any]]): Loaded events, merged and sorted by
+            'relative_time', each tagged with 'event_type' ('mouse' or 'keyboard')
+        timeline (ReplayTimeline): Index over ``events``
+        lo, hi (int): Range of ``events`` to play
+        segment (List[Dict[str, Any]]): ``events[lo:hi]``
+        play_times (List[float]): Playback time of each segment event
+        idle_summary (Optional[Dict[str, Any]]): ``compress_idle`` summary, if requested
+        partial (bool): Whether only a time window of the recording was loaded
+        stops_early (bool): Whether playback ends before the end of the recording
+        seeks (bool): Whether playback starts mid-recording, so input held at
+            the start must be restored (``restore_events``); after a partial
+            load ``lo == 0`` is the first loaded chunk, not the recording start
+        loaded_events (int): Number of events read
+    """
+
+    def __init__(
+        self,
+        events: List[Dict[str, Any]],
+        timeline: ReplayTimeline,
+        lo: int,
+        hi: int,
+        play_times: List[float],
+        idle_summary: Optional[Dict[str, Any]],
+        partial: bool,
+        stops_early: bool,
+        seeks: bool = False
+    ):
+        self.events = events
+        self.timeline = timeline
+        self.lo = lo
+        self.hi = hi
+        self.segment = events[lo:hi]
+        self.play_times = play_times
+        self.idle_summary = idle_summary
+        self.partial = partial
+        self.stops_early = stops_early
+        self.seeks = seeks
+        self.loaded_events = len(events)
+
+    def playback(self) -> Iterator[Tuple[Dict[str, Any], float]]:
+        """``(event, playback time)`` of every event to play, in order."""
+        return zip(self.segment, self.play_times)
+
+    def restore_events(self) -> List[Dict[str, Any]]:
+        """
+        Events that fast-forward to ``lo``: presses of the keys/buttons held
+        there, then a move to the cursor position. Held clicks carry their
+        press position, so the cursor is placed last.
+        """
+        events = list(self.timeline.held_before(self.lo))
+        cursor = self.timeline.cursor_before(self.lo)
+        if cursor is not None:
+            events.append({**cursor, 'type': 'move'})
+        return events
+
+    def release_events(self) -> List[Dict[str, Any]]:
+        """Events releasing the keys/buttons still held when playback stops at ``hi``."""
+        return [
+            {**event, 'pressed': False} if event['event_type'] == 'mouse' else {**event, 'type': 'keyup'}
+            for event in self.timeline.held_before(self.hi)
+        ]
+
+
+class StreamedPlan(ReplayPlan):
+    """
+    Plan of a whole recording played from the start, read while it plays.
+
+    ``events``, ``timeline``, ``segment`` and ``play_times`` are None;
+    ``hi``, ``loaded_events`` and ``idle_summary`` are filled in as
+    :meth:`playback` proceeds. Nothing is held at the start and playback
+    runs to the end, so there is nothing to restore or release.
+    """
+
+    def __init__(self, log_file: str, idle_threshold: Optional[float] = None, max_idle: float = 1.0):
+        self.log_file = log_file
+        self.idle_threshold = idle_threshold
+        self.max_idle = max_idle
+        self.events = self.timeline = self.segment = self.play_times = None
+        self.lo = self.hi = self.loaded_events = 0
+        self.idle_summary = None
+        self.partial = self.stops_early = self.seeks = False
+        if idle_threshold is not None:
+            # Reject invalid settings before playback starts
+            IdleCompressor(idle_threshold, max_idle)
+
+    def playback(self) -> Iterator[Tuple[Dict[str, Any], float]]:
+        compressor = IdleCompressor(self.idle_threshold, self.max_idle) if self.idle_threshold is not None else None
+        count = 0
+        try:
+            for relative_time, stream, event in iter_events(self.log_file):
+                event = {**event, 'event_type': _EVENT_TYPES[stream]}
+                count += 1
+                yield event, compressor.play_time(event) if compressor is not None else relative_time
+        finally:
+            self.hi = self.loaded_events = count
+            if compressor is not None:
+                self.idle_summary = compressor.summary()
+
+
+def merge_events(log_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mouse and keyboard events of a recording in one list sorted by time."""
+    events = [{**event, 'event_type': 'mouse'} for event in log_data.get('mouse_events', [])]
+    events.extend({**event, 'event_type': 'keyboard'} for event in log_data.get('keyboard_events', []))
+    events.sort(key=lambda x: x['relative_time'])
+    return events
+
+
+def build_plan(
+    log_file: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    start_index: Optional[int] = None,
+    end_index: Optional[int] = None,
+    idle_threshold: Optional[float] = None,
+    max_idle: float = 1.0,
+    log_data: Optional[Dict[str, Any]] = None
+) -> ReplayPlan:
+    """
+    Load a recording and plan its replay.
+
+    Arguments are those of ``PreciseActionRecorder.replay_events``;
+    ``log_data`` skips loading when the recording is already parsed.
+    Without a range or ``log_data`` the recording is streamed (see :class:`StreamedPlan`).
+    """
+    if log_data is None and all(bound is None for bound in (start_time, end_time, start_index, end_index)):
+        return StreamedPlan(log_file, idle_threshold, max_idle)
+    # A pure time window only needs the chunks that overlap it
+    partial = (log_data is None and (start_time is not None or end_time is not None)
+               and start_index is None and end_index is None)
+    entry_held: List[Dict[str, Any]] = []
+    entry_cursor = None
+    if partial:
+        log_data = load_window(log_file, start_time, end_time)
+        for stream, event_type in (('mouse_events', 'mouse'), ('keyboard_events', 'keyboard')):
+            entry = log_data['entry'][stream]
+            entry_held.extend({**event, 'event_type': event_type} for event in entry['held'])
+            if entry['cursor'] is not None:
+                x, y, resolution = entry['cursor']
+                entry_cursor = {
+                    'type': 'move', 'pos': (x, y), 'event_type': 'mouse',
+                    'screen_resolution': resolution or (1920, 1080)
+                }
+    elif log_data is None:
+        log_data = load_recording(log_file)
+
+    events = merge_events(log_data)
+    timeline = ReplayTimeline(events, initial_held=entry_held, initial_cursor=entry_cursor)
+    lo, hi = timeline.window(start_time, end_time, start_index, end_index)
+    segment = events[lo:hi]
+    if idle_threshold is not None:
+        play_times, idle_summary = compress_idle(segment, idle_threshold, max_idle, timeline.held_before(lo))
+    else:
+        play_times, idle_summary = [event['relative_time'] for event in segment], None
+    stops_early = hi < len(events) or (partial and end_time is not None)
+    seeks = lo > 0 or partial or start_time is not None or start_index is not None
+    return ReplayPlan(events, timeline, lo, hi, play_times, idle_summary, partial, stops_early, seeks)
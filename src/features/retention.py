@@ -0,0 +1,329 @@
+"""
+Retention and tiering for ``log_dir``.
+
+Recordings move through two tiers:
+
+    hot      ``log_dir`` itself, listed and replayable
+    archive  ``log_dir/.archive``, one compressed file per recording,
+             hidden from listings; purged after ``archive_max_age_days``.
+             Archived files are named ``<name>@<archive time in ms>.json``
+             so a recording name reused later never overwrites an archive
+
+A recording is archived when any rule selects it: older than
+``max_age_days``, beyond the newest ``keep_last`` of its category, or among
+the oldest recordings once the hot tier exceeds ``max_total_bytes``
+(measured as logical, uncompressed recording size). The engine runs on a
+background thread and handles at most ``batch_size`` recordings per pass,
+so a large backlog is worked off incrementally and never holds up
+requests. Rules default to the ``RECORDER_RETENTION_*`` environment
+variables; unset rules are disabled.
+"""
+import io
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from compression import get_codec, open_decompressed
+from deletion import recording_id
+from storage import open_recording, read_manifest
+
+ARCHIVE_DIR = '.archive'
+ARCHIVE_SEPARATOR = '@'
+DEFAULT_CATEGORY = 'uncategorized'
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def archived_recording(archive_name: str) -> str:
+    """Original recording name of an archived file."""
+    stem, ext = os.path.splitext(archive_name)
+    return stem.rsplit(ARCHIVE_SEPARATOR, 1)[0] + ext
+
+
+def archived_recordings(log_dir: str) -> List[str]:
+    """Original names of the recordings archived under ``log_dir``."""
+    archive_dir = os.path.join(log_dir, ARCHIVE_DIR)
+    if not os.path.isdir(archive_dir):
+        return []
+    return [archived_recording(name) for name in os.listdir(archive_dir) if not name.endswith('.tmp')]
+
+
+class RetentionPolicy:
+    """
+    Retention rules; ``None`` disables a rule.
+
+    Args:
+        max_age_days (Optional[float]): Archive recordings older than this
+        max_total_bytes (Optional[int]): Archive the oldest recordings while
+            the hot tier holds more than this many (uncompressed) bytes
+        keep_last (Optional[int]): Archive all but the newest N recordings of
+            each category
+        archive_max_age_days (Optional[float]): Purge archived recordings
+            this long after they were archived
+        archive_codec (str): Codec of archived files
+    """
+
+    def __init__(
+        self,
+        max_age_days: Optional[float] = None,
+        max_total_bytes: Optional[int] = None,
+        keep_last: Optional[int] = None,
+        archive_max_age_days: Optional[float] = None,
+        archive_codec: str = 'gzip'
+    ):
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_bytes
+        self.keep_last = keep_last
+        self.archive_max_age_days = archive_max_age_days
+        self.archive_codec = archive_codec
+
+    @classmethod
+    def from_env(cls) -> 'RetentionPolicy':
+        max_bytes = _env_float('RECORDER_RETENTION_MAX_BYTES')
+        keep_last = _env_float('RECORDER_RETENTION_KEEP_LAST')
+        return cls(
+            max_age_days=_env_float('RECORDER_RETENTION_MAX_AGE_DAYS'),
+            max_total_bytes=int(max_bytes) if max_bytes is not None else None,
+            keep_last=int(keep_last) if keep_last is not None else None,
+            archive_max_age_days=_env_float('RECORDER_RETENTION_ARCHIVE_MAX_AGE_DAYS'),
+            archive_codec=os.environ.get('RECORDER_RETENTION_ARCHIVE_CODEC', 'gzip')
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return any(rule is not None for rule in (
+            self.max_age_days, self.max_total_bytes, self.keep_last, self.archive_max_age_days))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'max_age_days': self.max_age_days,
+            'max_total_bytes': self.max_total_bytes,
+            'keep_last': self.keep_last,
+            'archive_max_age_days': self.archive_max_age_days,
+            'archive_codec': self.archive_codec
+        }
+
+
+def _logical_size(path: str) -> int:
+    manifest = read_manifest(path)
+    if manifest is not None:
+        return manifest['size']
+    # Compressed streams seek to their end by decompressing
+    with open_decompressed(open(path, 'rb')) as stream:
+        return stream.seek(0, io.SEEK_END)
+
+
+def _dir_bytes(path: str) -> Tuple[int, int]:
+    """(file count, bytes) of a directory tree."""
+    count = size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+                count += 1
+            except OSError:
+                pass
+    return count, size
+
+
+class RetentionEngine:
+    """
+    Applies a :class:`RetentionPolicy` to a recorder's ``log_dir``.
+
+    Args:
+        recorder: The owning ``PreciseActionRecorder``
+        policy (RetentionPolicy): Rules to apply
+        interval (float): Seconds between background passes
+        batch_size (int): Recordings archived (and purged) per pass at most
+        categorize (Optional[Callable[[str], str]]): Category of a recording
+            for ``keep_last``; all recordings share one category by default
+    """
+
+    def __init__(
+        self,
+        recorder,
+        policy: RetentionPolicy,
+        interval: float = 60.0,
+        batch_size: int = 200,
+        categorize: Optional[Callable[[str], str]] = None
+    ):
+        self.recorder = recorder
+        self.policy = policy
+        self.interval = interval
+        self.batch_size = batch_size
+        self.categorize = categorize or (lambda recording: DEFAULT_CATEGORY)
+        self.archive_dir = os.path.join(recorder.log_dir, ARCHIVE_DIR)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.totals = {'archived': 0, 'purged': 0, 'passes': 0}
+        # name -> (mtime_ns, logical size), so files are measured once per change
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.recorder.logger.error(f"Retention pass failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _hot_recordings(self) -> List[Dict[str, Any]]:
+        """Hot recordings, newest first."""
+        recordings = []
+        sizes: Dict[str, Tuple[int, int]] = {}
+        for name in self.recorder.list_recordings():
+            path = os.path.join(self.recorder.log_dir, name)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                known = self._sizes.get(name)
+                size = known[1] if known is not None and known[0] == mtime_ns else _logical_size(path)
+            except (OSError, ValueError, EOFError):
+                continue
+            sizes[name] = (mtime_ns, size)
+            recordings.append({'name': name, 'mtime': mtime_ns / 1e9, 'size': size})
+        self._sizes = sizes
+        recordings.sort(key=lambda r: r['mtime'], reverse=True)
+        return recordings
+
+    def plan(self, recordings: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """Names of hot recordings the policy would archive, oldest first."""
+        policy = self.policy
+        recordings = self._hot_recordings() if recordings is None else recordings
+        selected = set()
+        if policy.max_age_days is not None:
+            cutoff = time.time() - policy.max_age_days * 86400
+            selected.update(r['name'] for r in recordings if r['mtime'] < cutoff)
+        if policy.keep_last is not None:
+            seen: Dict[str, int] = {}
+            for r in recordings:
+                category = self.categorize(r['name'])
+                seen[category] = seen.get(category, 0) + 1
+                if seen[category] > policy.keep_last:
+                    selected.add(r['name'])
+        if policy.max_total_bytes is not None:
+            total = sum(r['size'] for r in recordings if r['name'] not in selected)
+            for r in reversed(recordings):
+                if total <= policy.max_total_bytes:
+                    break
+                if r['name'] not in selected:
+                    selected.add(r['name'])
+                    total -= r['size']
+        return [r['name'] for r in reversed(recordings) if r['name'] in selected]
+
+    def _archive_one(self, name: str, codec) -> bool:
+        source = os.path.join(self.recorder.log_dir, name)
+        stem, ext = os.path.splitext(name)
+        tmp = os.path.join(self.archive_dir, name + '.tmp')
+        try:
+            with open_recording(source) as src, open(tmp, 'wb') as out:
+                with codec.writer(out) as writer:
+                    for block in iter(lambda: src.read(1 << 20), b''):
+                        writer.write(block)
+            stamp = int(time.time() * 1000)
+            while True:
+                target = os.path.join(self.archive_dir, f"{stem}{ARCHIVE_SEPARATOR}{stamp}{ext}")
+                try:
+                    # Unlike os.replace, linking never overwrites an existing archive
+                    os.link(tmp, target)
+                    break
+                except FileExistsError:
+                    stamp += 1
+            os.remove(tmp)
+            return True
+        except Exception as e:
+            self.recorder.logger.error(f"Error archiving {name}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+
+    def archive(self, names: List[str]) -> List[str]:
+        """Move recordings to the archive tier."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        codec = get_codec(self.policy.archive_codec)
+        archived = [name for name in names if self._archive_one(name, codec)]
+        if archived:
+            self.recorder.deletions.delete(names=archived, sync_remote=False)
+        return archived
+
+    def purge(self, limit: Optional[int] = None) -> List[str]:
+        """Delete archived recordings older than ``archive_max_age_days``."""
+        if self.policy.archive_max_age_days is None or not os.path.isdir(self.archive_dir):
+            return []
+        cutoff = time.time() - self.policy.archive_max_age_days * 86400
+        purged = []
+        for entry in os.scandir(self.archive_dir):
+            if limit is not None and len(purged) >= limit:
+                break
+            if entry.name.endswith('.tmp') or entry.stat().st_mtime >= cutoff:
+                continue
+            try:
+                os.remove(entry.path)
+                purged.append(entry.name)
+            except OSError as e:
+                self.recorder.logger.error(f"Error purging {entry.name}: {e}")
+        remote = self.recorder.deletions.remote
+        if purged and remote is not None:
+            remote.submit(recording_id(archived_recording(name)) for name in purged)
+        return purged
+
+    def run_once(self) -> Dict[str, Any]:
+        """One incremental pass: archive up to ``batch_size`` recordings, then purge."""
+        with self._lock:
+            started = time.perf_counter()
+            pending = self.plan()
+            archived = self.archive(pending[:self.batch_size])
+            purged = self.purge(self.batch_size)
+            self.totals['archived'] += len(archived)
+            self.totals['purged'] += len(purged)
+            self.totals['passes'] += 1
+            self.last_run = {
+                'finished_at': time.time(),
+                'duration': round(time.perf_counter() - started, 3),
+                'archived': len(archived),
+                'purged': len(purged),
+                'remaining': max(0, len(pending) - len(archived))
+            }
+            return self.last_run
+
+    def stats(self) -> Dict[str, Any]:
+        """Storage usage per tier and per category."""
+        recordings = self._hot_recordings()
+        categories: Dict[str, Dict[str, int]] = {}
+        for r in recordings:
+            category = categories.setdefault(self.categorize(r['name']), {'recordings': 0, 'bytes': 0})
+            category['recordings'] += 1
+            category['bytes'] += r['size']
+        log_dir = self.recorder.log_dir
+        dir_files = [entry for entry in os.scandir(log_dir) if entry.is_file()]
+        archive_count, archive_bytes = _dir_bytes(self.archive_dir) if os.path.isdir(self.archive_dir) else (0, 0)
+        return {
+            'policy': self.policy.to_dict(),
+            'hot': {
+                'recordings': len(recordings),
+                'logical_bytes': sum(r['size'] for r in recordings),
+                'file_bytes': sum(entry.stat().st_size for entry in dir_files),
+                'chunk_store': self.recorder.store.stats(),
+                'oldest': recordings[-1]['mtime'] if recordings else None
+            },
+            'archive': {'recordings': archive_count, 'bytes': archive_bytes},
+            'categories': categories,
+            'pending_archive': len(self.plan(recordings)),
+            'last_run': self.last_run,
+            'totals': self.totals
+        }
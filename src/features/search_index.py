@@ -0,0 +1,279 @@
+"""
+Content search over recordings.
+
+Three indexes are kept in the catalog database (see ``catalog.py``):
+
+    search_grams   trigram -> recording, over the text each recording types
+    search_keys    key token -> recording: single keys ('space', 'a'),
+                   chords ('ctrl+tab') and consecutive-key bigrams ('ctrl>c')
+    search_clicks  (grid cell, recording) -> number of button presses
+
+plus ``search_docs`` with each recording's reconstructed text and key
+sequence, used to confirm trigram candidates without opening the
+recording. A recording is indexed when it is saved or imported; queries
+only touch these tables.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from storage import load_recording
+
+CELL_SIZE = 32
+GRAM = 3
+
+_SPECIAL_TEXT = {'space': ' ', 'enter': '\n', 'tab': '\t'}
+_MODIFIERS = {'ctrl', 'alt', 'shift', 'cmd'}
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS search_docs ('
+    ' recording TEXT PRIMARY KEY, text TEXT NOT NULL, keys TEXT NOT NULL,'
+    ' clicks INTEGER NOT NULL, source_mtime REAL, source_size INTEGER)',
+    'CREATE TABLE IF NOT EXISTS search_grams ('
+    ' gram TEXT NOT NULL, recording TEXT NOT NULL, PRIMARY KEY (gram, recording)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS search_keys ('
+    ' token TEXT NOT NULL, recording TEXT NOT NULL, PRIMARY KEY (token, recording)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS search_clicks ('
+    ' cx INTEGER NOT NULL, cy INTEGER NOT NULL, recording TEXT NOT NULL, count INTEGER NOT NULL,'
+    ' PRIMARY KEY (cx, cy, recording)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS search_grams_by_recording ON search_grams (recording)',
+    'CREATE INDEX IF NOT EXISTS search_keys_by_recording ON search_keys (recording)',
+    'CREATE INDEX IF NOT EXISTS search_clicks_by_recording ON search_clicks (recording)',
+)
+
+
+def normalize_key(key: str) -> str:
+    """'Key.ctrl_l' -> 'ctrl', 'Key.space' -> 'space', 'A' -> 'a'."""
+    if key.startswith('Key.'):
+        key = key[4:]
+    for modifier in _MODIFIERS:
+        if key in (modifier + '_l', modifier + '_r'):
+            return modifier
+    return key.lower()
+
+
+def reconstruct_text(keyboard_events: Iterable[Dict[str, Any]]) -> Tuple[str, List[str], Set[str]]:
+    """
+    Replay keyboard events into the text they type.
+
+    Returns:
+        Tuple[str, List[str], Set[str]]: Typed text, the normalised key
+        sequence, and the chords (e.g. 'ctrl+tab') pressed via keydown events
+    """
+    text: List[str] = []
+    keys: List[str] = []
+    chords: Set[str] = set()
+    held: List[str] = []
+    for event in keyboard_events:
+        raw = event.get('key') or ''
+        key = normalize_key(raw)
+        event_type = event.get('type')
+        if event_type == 'keyup':
+            if key in held:
+                held.remove(key)
+            continue
+        keys.append(key)
+        if event_type == 'keydown':
+            if held and key not in _MODIFIERS:
+                chords.add('+'.join(held + [key]))
+            if key not in held:
+                held.append(key)
+        ctrl = 'ctrl' in held
+        if key == 'backspace':
+            if ctrl:
+                while text and text[-1].isspace():
+                    text.pop()
+                while text and not text[-1].isspace():
+                    text.pop()
+            elif text:
+                text.pop()
+        elif event_type == 'keypress' and len(raw) == 1:
+            text.append(raw)
+        elif key in _SPECIAL_TEXT and not ctrl:
+            text.append(_SPECIAL_TEXT[key])
+    return ''.join(text), keys, chords
+
+
+def grams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def click_cells(mouse_events: Iterable[Dict[str, Any]], cell_size: int = CELL_SIZE) -> Dict[Tuple[int, int], int]:
+    """Button presses per grid cell."""
+    cells: Dict[Tuple[int, int], int] = {}
+    for event in mouse_events:
+        if event.get('type') == 'click' and event.get('pressed'):
+            x, y = event['pos'][0], event['pos'][1]
+            cell = (int(x) // cell_size, int(y) // cell_size)
+            cells[cell] = cells.get(cell, 0) + 1
+    return cells
+
+
+class SearchIndex:
+    """
+    Incrementally maintained search index of one recorder's recordings.
+
+    Args:
+        catalog: The recorder's ``Catalog`` (tables are added to its database)
+        log_dir (str): Directory holding the recordings
+        cell_size (int): Click grid resolution in pixels
+    """
+
+    def __init__(self, catalog, log_dir: str, cell_size: int = CELL_SIZE):
+        self.catalog = catalog
+        self.log_dir = log_dir
+        self.cell_size = cell_size
+        with catalog.transaction() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _drop(self, conn, recordings: List[str]) -> None:
+        rows = [(recording,) for recording in recordings]
+        for table in ('search_docs', 'search_grams', 'search_keys', 'search_clicks'):
+            conn.executemany(f'DELETE FROM {table} WHERE recording = ?', rows)
+
+    def index_events(
+        self,
+        recording: str,
+        mouse_events: Iterable[Dict[str, Any]],
+        keyboard_events: Iterable[Dict[str, Any]]
+    ) -> None:
+        """(Re)index one recording from its events."""
+        text, keys, chords = reconstruct_text(keyboard_events)
+        tokens = set(keys) | chords | {f'{a}>{b}' for a, b in zip(keys, keys[1:])}
+        cells = click_cells(mouse_events, self.cell_size)
+        path = os.path.join(self.log_dir, recording)
+        try:
+            stat = os.stat(path)
+            mtime, size = stat.st_mtime, stat.st_size
+        except OSError:
+            mtime = size = None
+        with self.catalog.transaction() as conn:
+            self._drop(conn, [recording])
+            conn.execute(
+                'INSERT INTO search_docs (recording, text, keys, clicks, source_mtime, source_size)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (recording, text, ' '.join(keys), sum(cells.values()), mtime, size))
+            conn.executemany('INSERT INTO search_grams (gram, recording) VALUES (?, ?)',
+                             [(gram, recording) for gram in grams(text)])
+            conn.executemany('INSERT INTO search_keys (token, recording) VALUES (?, ?)',
+                             [(token, recording) for token in tokens])
+            conn.executemany('INSERT INTO search_clicks (cx, cy, recording, count) VALUES (?, ?, ?, ?)',
+                             [(cx, cy, recording, count) for (cx, cy), count in cells.items()])
+
+    def index_recording(self, recording: str) -> None:
+        """(Re)index one recording from disk."""
+        data = load_recording(os.path.join(self.log_dir, recording))
+        self.index_events(recording, data.get('mouse_events', []), data.get('keyboard_events', []))
+
+    def forget(self, recordings: Iterable[str]) -> None:
+        """Drop deleted recordings (deletion hook)."""
+        with self.catalog.transaction() as conn:
+            self._drop(conn, list(recordings))
+
+    def sync(self, recordings: Iterable[str]) -> Dict[str, int]:
+        """Index new or changed recordings and drop vanished ones."""
+        recordings = set(recordings)
+        indexed = {
+            recording: (mtime, size) for recording, mtime, size in
+            self.catalog.execute('SELECT recording, source_mtime, source_size FROM search_docs')
+        }
+        self.forget(set(indexed) - recordings)
+        updated = failed = 0
+        for recording in sorted(recordings):
+            try:
+                stat = os.stat(os.path.join(self.log_dir, recording))
+                if indexed.get(recording) == (stat.st_mtime, stat.st_size):
+                    continue
+                self.index_recording(recording)
+                updated += 1
+            except Exception:
+                failed += 1
+        return {'indexed': updated, 'removed': len(set(indexed) - recordings), 'failed': failed}
+
+    def _having_all(self, table: str, column: str, values: Set[str]) -> Set[str]:
+        placeholders = ','.join('?' * len(values))
+        rows = self.catalog.execute(
+            f'SELECT recording FROM {table} WHERE {column} IN ({placeholders})'
+            f' GROUP BY recording HAVING COUNT(*) = ?', list(values) + [len(values)])
+        return {row[0] for row in rows}
+
+    def _match_text(self, query: str) -> Set[str]:
+        needle = query.lower()
+        query_grams = grams(needle)
+        if query_grams:
+            candidates = self._having_all('search_grams', 'gram', query_grams)
+            if not candidates:
+                return set()
+            placeholders = ','.join('?' * len(candidates))
+            rows = self.catalog.execute(
+                f'SELECT recording, text FROM search_docs WHERE recording IN ({placeholders})', list(candidates))
+        else:
+            rows = self.catalog.execute('SELECT recording, text FROM search_docs')
+        return {recording for recording, text in rows if needle in text.lower()}
+
+    def _match_sequence(self, sequence: List[str]) -> Set[str]:
+        sequence = [normalize_key(key) for key in sequence]
+        if len(sequence) == 1:
+            return self._having_all('search_keys', 'token', set(sequence))
+        candidates = self._having_all('search_keys', 'token', {f'{a}>{b}' for a, b in zip(sequence, sequence[1:])})
+        if not candidates:
+            return set()
+        placeholders = ','.join('?' * len(candidates))
+        needle = ' ' + ' '.join(sequence) + ' '
+        rows = self.catalog.execute(
+            f'SELECT recording, keys FROM search_docs WHERE recording IN ({placeholders})', list(candidates))
+        return {recording for recording, keys in rows if needle in f' {keys} '}
+
+    def _match_region(self, region: List[float]) -> Dict[str, int]:
+        x0, y0, x1, y1 = region
+        rows = self.catalog.execute(
+            'SELECT recording, SUM(count) FROM search_clicks'
+            ' WHERE cx BETWEEN ? AND ? AND cy BETWEEN ? AND ? GROUP BY recording',
+            (int(min(x0, x1)) // self.cell_size, int(max(x0, x1)) // self.cell_size,
+             int(min(y0, y1)) // self.cell_size, int(max(y0, y1)) // self.cell_size))
+        return {recording: count for recording, count in rows}
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        keys: Optional[List[str]] = None,
+        sequence: Optional[List[str]] = None,
+        region: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recordings matching every given criterion.
+
+        Args:
+            text (Optional[str]): Case-insensitive substring of the typed text
+            keys (Optional[List[str]]): Key tokens that must all occur,
+                e.g. ``['ctrl+tab']`` or ``['enter']``
+            sequence (Optional[List[str]]): Keys pressed consecutively, e.g. ``['ctrl', 'c']``
+            region (Optional[List[float]]): ``[x0, y0, x1, y1]`` screen rectangle
+                that must contain a click (matched at grid-cell resolution)
+
+        Returns:
+            List[Dict[str, Any]]: Matches sorted by name, with region click counts
+        """
+        matches: Optional[Set[str]] = None
+
+        def narrow(found: Set[str]) -> None:
+            nonlocal matches
+            matches = found if matches is None else matches & found
+
+        if text:
+            narrow(self._match_text(text))
+        if keys:
+            narrow(self._having_all('search_keys', 'token', {normalize_key(key) for key in keys}))
+        if sequence:
+            narrow(self._match_sequence(sequence))
+        region_hits: Dict[str, int] = {}
+        if region:
+            region_hits = self._match_region(region)
+            narrow(set(region_hits))
+        if matches is None:
+            raise ValueError("Give at least one of text, keys, sequence or region")
+        return [
+            {'recording': recording, **({'region_clicks': region_hits[recording]} if region else {})}
+            for recording in sorted(matches)
+        ]
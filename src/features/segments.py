@@ -0,0 +1,311 @@
+"""
+Recording segments and playlists.
+
+A recording is cut into segments at idle gaps, after chosen keys (e.g.
+Enter) or at given times, never while a key or button is held. Each
+segment is stored once under ``log_dir/.segments`` and named by a digest
+of its content, so the login flow that starts fifty recordings is kept
+once. With ``dedupe='actions'`` the digest covers only what the segment
+does (keys, buttons and click positions at ``CLICK_CELL`` resolution),
+so re-recordings of the same flow with a different pointer path or pace
+share the first stored copy.
+
+A playlist (``log_dir/.playlists/<name>.json``) is a list of segment ids
+with the pause before each. Replay compiles it from parsed segments kept
+in an LRU cache and hands the events to ``replay_events``, so playlists
+play through the same planner, backends and fidelity reporting as
+recordings.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from recording_diff import event_token
+from recording_index import SIDECAR_SUFFIXES
+from recording_io import serialize_recording
+from replay_plan import merge_events
+from search_index import normalize_key
+from storage import load_recording
+from timeline import ReplayTimeline
+
+SEGMENTS_DIR = '.segments'
+PLAYLISTS_DIR = '.playlists'
+DEFAULT_IDLE_GAP = 3.0
+# Parsed segments kept in memory
+CACHE_SIZE = 64
+# Click positions are compared at this resolution for 'actions' dedupe
+CLICK_CELL = 16
+DEDUPE_MODES = ('exact', 'actions')
+
+
+def _strip(event: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    event = {key: value for key, value in event.items() if key != 'event_type'}
+    event['relative_time'] = event['relative_time'] - offset
+    return event
+
+
+def find_boundaries(
+    events: List[Dict[str, Any]],
+    idle_gap: Optional[float] = DEFAULT_IDLE_GAP,
+    keys: Optional[Iterable[str]] = None,
+    times: Optional[Iterable[float]] = None
+) -> List[int]:
+    """
+    Indices of ``events`` (merged, time-sorted) where a new segment starts.
+
+    Args:
+        events (List[Dict[str, Any]]): Events as returned by ``merge_events``
+        idle_gap (Optional[float]): Cut at pauses of at least this many seconds
+        keys (Optional[Iterable[str]]): Cut after these keys are released ('Key.enter', 'tab')
+        times (Optional[Iterable[float]]): Explicit cut times
+
+    Automatic cuts are skipped while a key or button is held.
+    """
+    timeline = ReplayTimeline(events)
+    cut_keys = {normalize_key(key) for key in keys or ()}
+    cuts = {timeline.index_at(t) for t in times or ()}
+    for i in range(1, len(events)):
+        previous = events[i - 1]
+        idle = idle_gap is not None and events[i]['relative_time'] - previous['relative_time'] >= idle_gap
+        after_key = (previous['event_type'] == 'keyboard' and previous['type'] in ('keyup', 'keypress')
+                     and normalize_key(previous.get('key') or '') in cut_keys)
+        if (idle or after_key) and not timeline.held_before(i):
+            cuts.add(i)
+    return sorted(cut for cut in cuts if 0 < cut < len(events))
+
+
+def action_signature(events: List[Dict[str, Any]]) -> str:
+    """What a segment does, ignoring pointer paths and timing."""
+    parts = []
+    for event in events:
+        if event['event_type'] == 'mouse':
+            if event['type'] == 'move':
+                continue
+            x, y = event['pos']
+            parts.append(f"{event_token('mouse_events', event)}@{int(x) // CLICK_CELL},{int(y) // CLICK_CELL}")
+        else:
+            parts.append(event_token('keyboard_events', event))
+    return '\n'.join(parts)
+
+
+class SegmentLibrary:
+    """
+    Segment and playlist store of one recorder.
+
+    Args:
+        store: The recorder's ``RecordingStore`` (segments are saved through it)
+        cache_size (int): Parsed segments kept in memory
+    """
+
+    def __init__(self, store, cache_size: int = CACHE_SIZE):
+        self.store = store
+        self.log_dir = store.log_dir
+        self.segments_dir = os.path.join(self.log_dir, SEGMENTS_DIR)
+        self.playlists_dir = os.path.join(self.log_dir, PLAYLISTS_DIR)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]], float]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = self.misses = 0
+
+    def segment_path(self, segment_id: str) -> str:
+        return os.path.join(self.segments_dir, segment_id + '.json')
+
+    def playlist_path(self, name: str) -> str:
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            raise ValueError(f"Invalid playlist name '{name}'")
+        return os.path.join(self.playlists_dir, name if name.endswith('.json') else name + '.json')
+
+    def _put_segment(self, events: List[Dict[str, Any]], dedupe: str, source: str) -> Tuple[str, float, int]:
+        """Store one segment unless an equivalent one exists; returns (id, duration, bytes written)."""
+        start = events[0]['relative_time']
+        data = {
+            'mouse_events': [_strip(e, start) for e in events if e['event_type'] == 'mouse'],
+            'keyboard_events': [_strip(e, start) for e in events if e['event_type'] == 'keyboard'],
+            'metadata': {}
+        }
+        key = serialize_recording(data) if dedupe == 'exact' else action_signature(events).encode()
+        segment_id = hashlib.sha256(key).hexdigest()
+        duration = events[-1]['relative_time'] - start
+        path = self.segment_path(segment_id)
+        with self._lock:
+            if os.path.exists(path):
+                # Keep the stored copy fresh for garbage collection
+                os.utime(path)
+                return segment_id, self._segment(segment_id)[2], 0
+            data['metadata'] = {
+                'segment': segment_id, 'source': source, 'duration': duration,
+                'events': len(events), 'created': time.time()
+            }
+            os.makedirs(self.segments_dir, exist_ok=True)
+            return segment_id, duration, self.store.save_bytes(serialize_recording(data), path)
+
+    def segment_recording(
+        self,
+        log_file: str,
+        playlist: Optional[str] = None,
+        idle_gap: Optional[float] = DEFAULT_IDLE_GAP,
+        keys: Optional[Iterable[str]] = None,
+        times: Optional[Iterable[float]] = None,
+        dedupe: str = 'exact'
+    ) -> Dict[str, Any]:
+        """
+        Cut a recording into stored segments and save it as a playlist.
+
+        Args:
+            log_file (str): Path to the recording
+            playlist (Optional[str]): Playlist name (default: the recording's name)
+            idle_gap, keys, times: Boundary rules (see ``find_boundaries``)
+            dedupe (str): 'exact' shares byte-identical segments, 'actions'
+                shares segments that press the same keys and buttons in the same places
+
+        Returns:
+            Dict[str, Any]: The playlist, the number of segments that were
+            new and the bytes written
+        """
+        if dedupe not in DEDUPE_MODES:
+            raise ValueError(f"dedupe must be one of {', '.join(DEDUPE_MODES)}")
+        source = os.path.basename(log_file)
+        events = merge_events(load_recording(log_file))
+        if not events:
+            raise ValueError(f"{source} has no events")
+        cuts = [0] + find_boundaries(events, idle_gap, keys, times) + [len(events)]
+        items = []
+        new = written = 0
+        previous_end = 0.0
+        # Held until the playlist references the segments, so garbage
+        # collection cannot remove them in between
+        with self._lock:
+            for lo, hi in zip(cuts, cuts[1:]):
+                segment_id, duration, segment_bytes = self._put_segment(events[lo:hi], dedupe, source)
+                items.append({'segment': segment_id, 'gap': events[lo]['relative_time'] - previous_end})
+                previous_end = events[hi - 1]['relative_time']
+                new += 1 if segment_bytes else 0
+                written += segment_bytes
+            result = self.save_playlist(playlist or os.path.splitext(source)[0], items, source=source)
+        result.update({'new_segments': new, 'bytes_written': written})
+        return result
+
+    def save_playlist(self, name: str, items: List[Dict[str, Any]], source: Optional[str] = None) -> Dict[str, Any]:
+        """Save a playlist of ``{'segment': id, 'gap': seconds}`` items."""
+        path = self.playlist_path(name)
+        playlist = {
+            'name': os.path.splitext(os.path.basename(path))[0],
+            'items': [{'segment': item['segment'], 'gap': float(item.get('gap', 0))} for item in items],
+            'source': source,
+            'created': time.time()
+        }
+        with self._lock:
+            for item in items:
+                if not os.path.exists(self.segment_path(item['segment'])):
+                    raise ValueError(f"Unknown segment {item['segment']}")
+                if item.get('gap', 0) < 0:
+                    raise ValueError("gap must not be negative")
+            os.makedirs(self.playlists_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(playlist, f, indent=2)
+        return playlist
+
+    def load_playlist(self, name: str) -> Dict[str, Any]:
+        with open(self.playlist_path(name), 'r') as f:
+            return json.load(f)
+
+    def playlists(self) -> List[Dict[str, Any]]:
+        """Stored playlists with their segment count and duration."""
+        if not os.path.isdir(self.playlists_dir):
+            return []
+        result = []
+        for entry in sorted(os.listdir(self.playlists_dir)):
+            if not entry.endswith('.json') or entry.endswith(SIDECAR_SUFFIXES):
+                continue
+            try:
+                playlist = self.load_playlist(entry)
+                duration = sum(item['gap'] + self._segment(item['segment'])[2] for item in playlist['items'])
+            except (OSError, ValueError, KeyError):
+                continue
+            result.append({
+                'name': playlist['name'], 'segments': len(playlist['items']),
+                'duration': duration, 'source': playlist.get('source')
+            })
+        return result
+
+    def _segment(self, segment_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], float]:
+        """Parsed segment (mouse events, keyboard events, duration), from the cache if present."""
+        with self._lock:
+            cached = self._cache.get(segment_id)
+            if cached is not None:
+                self._cache.move_to_end(segment_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        data = load_recording(self.segment_path(segment_id))
+        parsed = (data['mouse_events'], data['keyboard_events'], data['metadata']['duration'])
+        with self._lock:
+            self._cache[segment_id] = parsed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return parsed
+
+    def compile(self, name: str) -> Dict[str, Any]:
+        """The playlist as one recording (``mouse_events``, ``keyboard_events``, ``metadata``)."""
+        playlist = self.load_playlist(name)
+        mouse: List[Dict[str, Any]] = []
+        keyboard: List[Dict[str, Any]] = []
+        offset = 0.0
+        for item in playlist['items']:
+            segment_mouse, segment_keyboard, duration = self._segment(item['segment'])
+            offset += item['gap']
+            mouse.extend({**event, 'relative_time': event['relative_time'] + offset} for event in segment_mouse)
+            keyboard.extend({**event, 'relative_time': event['relative_time'] + offset} for event in segment_keyboard)
+            offset += duration
+        return {
+            'mouse_events': mouse,
+            'keyboard_events': keyboard,
+            'metadata': {'playlist': playlist['name'], 'segments': len(playlist['items'])}
+        }
+
+    def delete_playlist(self, name: str) -> Dict[str, int]:
+        """Remove a playlist and the segments no other playlist uses."""
+        with self._lock:
+            os.remove(self.playlist_path(name))
+            return self.collect_garbage()
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """Delete segments referenced by no playlist."""
+        with self._lock:
+            referenced = set()
+            if os.path.isdir(self.playlists_dir):
+                for entry in os.listdir(self.playlists_dir):
+                    if entry.endswith('.json') and not entry.endswith(SIDECAR_SUFFIXES):
+                        try:
+                            referenced.update(item['segment'] for item in self.load_playlist(entry)['items'])
+                        except (OSError, ValueError, KeyError):
+                            # An unreadable playlist must not cost other playlists their segments
+                            return {'removed_segments': 0}
+            removed = 0
+            if os.path.isdir(self.segments_dir):
+                for entry in os.listdir(self.segments_dir):
+                    segment_id = entry[:-len('.json')]
+                    if entry.endswith('.json') and segment_id not in referenced:
+                        os.remove(os.path.join(self.segments_dir, entry))
+                        self._cache.pop(segment_id, None)
+                        removed += 1
+        if removed:
+            self.store.collect_garbage()
+        return {'removed_segments': removed}
+
+    def stats(self) -> Dict[str, Any]:
+        count = size = 0
+        if os.path.isdir(self.segments_dir):
+            for entry in os.scandir(self.segments_dir):
+                count += 1
+                size += entry.stat().st_size
+        return {
+            'segments': count,
+            'segment_bytes': size,
+            'playlists': len(self.playlists()),
+            'cache': {'size': len(self._cache), 'capacity': self.cache_size, 'hits': self.hits, 'misses': self.misses}
+        }
@@ -0,0 +1,329 @@
+"""
+Recorder sessions: several isolated recorders in one server process.
+
+The server's own recorder is the ``default`` session. Further sessions are
+created on demand, each with
+
+    its own log namespace    ``SESSIONS_DIR/<id>`` with its own chunk store,
+                             catalog and search index
+    its own virtual display  an Xvfb display (pyvirtualdisplay) that replay
+                             injects into through an XTest backend bound to it
+    its own state machine    so one session recording never blocks another
+                             session's replay
+
+At most ``max_sessions`` sessions (besides the default one) are open.
+Sessions idle for ``idle_timeout`` seconds are evicted by a background
+thread, and the least recently used idle session is evicted when a new one
+would exceed the cap. Eviction only releases the display and the recorder
+(its input backend and catalog connection); the recordings stay on disk
+and a session created again under the same id picks them up. Per-recorder
+services such as retention are attached to every new session through
+:meth:`SessionManager.add_hook` and stopped through ``on_close``. Limits default to the ``RECORDER_MAX_SESSIONS`` and
+``RECORDER_SESSION_IDLE_TIMEOUT`` environment variables.
+
+pynput's capture listeners connect to the process ``DISPLAY``, so
+per-session displays isolate replay; capture follows the server's display.
+Without python-xlib a session still opens, but replays through the default
+input backend into the server's display.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from backends import XTestBackend
+from recorder_state import IDLE, RecorderBusy
+
+try:
+    from pyvirtualdisplay import Display
+except ImportError:
+    Display = None
+
+DEFAULT_SESSION = 'default'
+MAX_SESSIONS = int(os.environ.get('RECORDER_MAX_SESSIONS', '8'))
+SESSION_IDLE_TIMEOUT = float(os.environ.get('RECORDER_SESSION_IDLE_TIMEOUT', '900'))
+SESSIONS_DIR = os.environ.get('RECORDER_SESSIONS_DIR')
+DISPLAY_SIZE = (1920, 1080)
+
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class SessionLimitReached(RuntimeError):
+    """Raised when every session slot is taken by a busy session."""
+
+
+class UnknownSession(LookupError):
+    """Raised for a session id that is not open."""
+
+    def __str__(self) -> str:
+        return f"Unknown session '{self.args[0]}'"
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class RecorderSession:
+    """
+    One recorder with its display and usage counters.
+
+    Attributes:
+        id (str): Session id
+        recorder: The session's ``PreciseActionRecorder``
+        display: Virtual display of the session, if it has its own
+        created, last_active (float): Creation and last use (epoch seconds)
+        requests (int): Number of times the session was looked up
+        on_close (List[Callable[[], None]]): Called when the session closes,
+            before its recorder is released
+    """
+
+    def __init__(self, session_id: str, recorder, display=None):
+        self.id = session_id
+        self.recorder = recorder
+        self.display = display
+        self.created = self.last_active = time.time()
+        self.requests = 0
+        self.on_close: List[Callable[[], None]] = []
+
+    def touch(self) -> None:
+        self.last_active = time.time()
+        self.requests += 1
+
+    @property
+    def idle(self) -> bool:
+        return self.recorder.state.state == IDLE
+
+    def usage(self) -> Dict[str, Any]:
+        """Resource accounting of the session."""
+        state = self.recorder.state.snapshot()
+        return {
+            'session_id': self.id,
+            'state': state['state'],
+            'created': self.created,
+            'last_active': self.last_active,
+            'idle_seconds': time.time() - self.last_active,
+            'requests': self.requests,
+            'transitions': state['transitions'],
+            'seconds_by_state': state['durations'],
+            'display': f':{self.display.display}' if self.display is not None else None,
+            'input_backend': self.recorder.input.name,
+            'log_dir': self.recorder.log_dir,
+            'recordings': len(self.recorder.list_recordings()),
+            'disk_bytes': _dir_bytes(self.recorder.log_dir),
+            'store': self.recorder.store.stats(),
+            'budgets': self.recorder.budget_usage()
+        }
+
+    def close(self) -> None:
+        try:
+            for callback in self.on_close:
+                callback()
+            self.recorder.close()
+        finally:
+            if self.display is not None:
+                self.display.stop()
+
+
+class SessionManager:
+    """
+    Open sessions by id, capped and evicted when idle.
+
+    Args:
+        default_recorder: Recorder of the ``default`` session; never evicted
+        factory (Callable[..., Any]): Builds a recorder from keyword arguments
+            (``PreciseActionRecorder``)
+        sessions_dir (Optional[str]): Parent of the session log namespaces;
+            defaults to $RECORDER_SESSIONS_DIR or a 'sessions' folder next to
+            the default log_dir
+        max_sessions (int): Open sessions allowed besides the default one
+        idle_timeout (float): Seconds of inactivity before an idle session is evicted
+        virtual_displays (Optional[bool]): Give each session its own Xvfb
+            display; defaults to True when pyvirtualdisplay is available and
+            the platform is not Windows
+    """
+
+    def __init__(
+        self,
+        default_recorder,
+        factory: Callable[..., Any],
+        sessions_dir: Optional[str] = None,
+        max_sessions: int = MAX_SESSIONS,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        virtual_displays: Optional[bool] = None
+    ):
+        self.default = RecorderSession(DEFAULT_SESSION, default_recorder)
+        self.factory = factory
+        self.sessions_dir = sessions_dir or SESSIONS_DIR or os.path.join(
+            os.path.dirname(os.path.abspath(default_recorder.log_dir)), 'sessions')
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        if virtual_displays is None:
+            virtual_displays = Display is not None and sys.platform != 'win32'
+        self.virtual_displays = virtual_displays
+        self._sessions: Dict[str, RecorderSession] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._hooks: List[Callable[[RecorderSession], None]] = []
+        self.evicted = 0
+
+    def add_hook(self, hook: Callable[[RecorderSession], None]) -> None:
+        """Call ``hook(session)`` for every session opened from now on."""
+        self._hooks.append(hook)
+
+    def get(self, session_id: Optional[str] = None) -> RecorderSession:
+        """The open session ``session_id`` (the default session when empty)."""
+        if not session_id or session_id == DEFAULT_SESSION:
+            session = self.default
+        else:
+            with self._lock:
+                session = self._sessions.get(session_id)
+            if session is None:
+                raise UnknownSession(session_id)
+        session.touch()
+        return session
+
+    def create(self, session_id: Optional[str] = None, **options) -> RecorderSession:
+        """
+        Open a session, evicting the least recently used idle session when
+        the cap is reached. ``options`` are passed on to the recorder factory.
+
+        Raises:
+            ValueError: If the id is invalid or already open
+            SessionLimitReached: If every slot is held by a busy session
+        """
+        session_id = session_id or uuid.uuid4().hex[:12]
+        if session_id == DEFAULT_SESSION or not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id '{session_id}'")
+        with self._lock:
+            if session_id in self._sessions:
+                raise ValueError(f"Session '{session_id}' already exists")
+            evict = None
+            if len(self._sessions) >= self.max_sessions:
+                idle = [s for s in self._sessions.values() if s is not None and s.idle]
+                if not idle:
+                    raise SessionLimitReached(f"All {self.max_sessions} sessions are busy")
+                evict = min(idle, key=lambda s: s.last_active)
+                del self._sessions[evict.id]
+            # Reserve the slot while the display and recorder start
+            self._sessions[session_id] = None
+        if evict is not None:
+            self._close(evict)
+            self.evicted += 1
+        try:
+            session = self._open(session_id, options)
+        except Exception:
+            with self._lock:
+                del self._sessions[session_id]
+            raise
+        with self._lock:
+            self._sessions[session_id] = session
+        for hook in self._hooks:
+            try:
+                hook(session)
+            except Exception as e:
+                session.recorder.logger.error(f"Session hook failed for {session_id}: {e}")
+        return session
+
+    def _open(self, session_id: str, options: Dict[str, Any]) -> RecorderSession:
+        display = None
+        if self.virtual_displays:
+            display = Display(visible=0, size=DISPLAY_SIZE)
+            display.start()
+        try:
+            if display is not None and 'input_backend' not in options:
+                try:
+                    options['input_backend'] = XTestBackend(f':{display.display}')
+                except Exception as e:
+                    # e.g. python-xlib missing: the recorder's default backend
+                    # still works, but injects into the server's display
+                    self.default.recorder.logger.warning(
+                        f"XTest unavailable for session {session_id} ({e}); replay uses the default input backend")
+            recorder = self.factory(log_dir=os.path.join(self.sessions_dir, session_id), **options)
+        except Exception:
+            if display is not None:
+                display.stop()
+            raise
+        return RecorderSession(session_id, recorder, display)
+
+    def close(self, session_id: str) -> None:
+        """
+        Close an idle session; its recordings stay on disk.
+
+        Raises:
+            UnknownSession: If the session is not open
+            RecorderBusy: If it is recording or replaying
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise UnknownSession(session_id)
+            if not session.idle:
+                raise RecorderBusy(f"Session '{session_id}' is {session.recorder.state.state}")
+            del self._sessions[session_id]
+        self._close(session)
+
+    def _close(self, session: RecorderSession) -> None:
+        try:
+            session.close()
+        except Exception as e:
+            session.recorder.logger.error(f"Error closing session {session.id}: {e}")
+
+    def evict_idle(self) -> List[str]:
+        """Close sessions idle for longer than ``idle_timeout``; returns their ids."""
+        cutoff = time.time() - self.idle_timeout
+        with self._lock:
+            expired = [
+                session for session in self._sessions.values()
+                if session is not None and session.idle and session.last_active < cutoff
+            ]
+            for session in expired:
+                del self._sessions[session.id]
+        for session in expired:
+            self._close(session)
+        self.evicted += len(expired)
+        return [session.id for session in expired]
+
+    def sessions(self) -> List[RecorderSession]:
+        """The default session followed by the open ones."""
+        with self._lock:
+            opened = [session for session in self._sessions.values() if session is not None]
+        return [self.default] + opened
+
+    def usage(self) -> Dict[str, Any]:
+        sessions = [session.usage() for session in self.sessions()]
+        return {
+            'sessions': sessions,
+            'open': len(sessions) - 1,
+            'max_sessions': self.max_sessions,
+            'idle_timeout': self.idle_timeout,
+            'evicted': self.evicted
+        }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='session-evictor', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        interval = min(60.0, max(1.0, self.idle_timeout / 4))
+        while not self._stop.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                self.default.recorder.logger.error(f"Session eviction failed: {e}")
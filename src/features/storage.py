@@ -0,0 +1,410 @@
+"""
+Content-addressed, deduplicated storage for recordings.
+
+Recording bodies are split into fixed-size chunks that are stored once
+under ``<log_dir>/.cas/objects/<aa>/<sha256>``. The file a user sees in
+``log_dir`` (``user_actions_2024_N.json``) becomes a small manifest that
+references those chunks::
+
+    {"cas_manifest": 1, "size": 123456, "sha256": "...", "chunk_size": 262144,
+     "chunks": ["<sha256>", ...]}
+
+Identical recordings therefore cost one manifest each, and storing data
+whose chunks already exist only writes the manifest. Objects no longer
+referenced by any manifest are removed by :meth:`RecordingStore.collect_garbage`,
+which keeps the chunk references of every manifest in ``.cas/manifests.json``
+and only re-reads files whose modification time changed since the last pass.
+
+Manifests are not recordings: tools that read ``log_dir`` directly must go
+through :func:`load_recording`. Deduplication is therefore opt-in
+(``RECORDER_DEDUPE=1`` or ``dedupe=True``); by default every recording is a
+single JSON file, plain unless a codec is configured.
+
+Chunk objects are compressed with the store's codec (see
+``compression.py``) and hashed before compression, so deduplication works
+across codecs. Without deduplication the whole recording file is written
+as one compressed stream.
+
+Plain JSON recordings (everything written before this module existed)
+remain readable: :func:`open_recording` detects manifests and compression
+by content and returns a readable stream either way.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
+
+from compression import decompress_bytes, get_codec, open_decompressed
+
+CAS_DIR = '.cas'
+MANIFEST_INDEX = 'manifests.json'
+MANIFEST_KEY = 'cas_manifest'
+MANIFEST_VERSION = 1
+DEFAULT_CHUNK_SIZE = 256 * 1024
+# Unreferenced objects younger than this survive GC: a concurrent save may
+# have stored them without having written its manifest yet
+GC_GRACE_SECONDS = 300
+# Manifests are tiny; anything larger is certainly a plain recording
+_MANIFEST_PROBE = b'{"' + MANIFEST_KEY.encode() + b'"'
+
+
+def objects_dir(log_dir: str) -> str:
+    return os.path.join(log_dir, CAS_DIR, 'objects')
+
+
+def object_path(log_dir: str, digest: str) -> str:
+    return os.path.join(objects_dir(log_dir), digest[:2], digest)
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Return the manifest stored at ``path``, or None for a plain recording."""
+    with open(path, 'rb') as f:
+        head = f.read(len(_MANIFEST_PROBE))
+        if head != _MANIFEST_PROBE:
+            return None
+        f.seek(0)
+        return json.load(f)
+
+
+class ChunkedReader(io.RawIOBase):
+    """Seekable, read-only view over the chunk objects of a manifest."""
+
+    def __init__(self, log_dir: str, manifest: Dict[str, Any]):
+        super().__init__()
+        self.log_dir = log_dir
+        self.manifest = manifest
+        self.size = manifest['size']
+        self.chunk_size = manifest['chunk_size']
+        self._pos = 0
+        self._cached_index = -1
+        self._cached: bytes = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = self.size + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def _chunk(self, index: int) -> bytes:
+        if index != self._cached_index:
+            with open(object_path(self.log_dir, self.manifest['chunks'][index]), 'rb') as f:
+                self._cached = decompress_bytes(f.read())
+            self._cached_index = index
+        return self._cached
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+        index, offset = divmod(self._pos, self.chunk_size)
+        data = self._chunk(index)[offset:offset + len(buffer)]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._pos
+        parts: List[bytes] = []
+        while size > 0 and self._pos < self.size:
+            index, offset = divmod(self._pos, self.chunk_size)
+            data = self._chunk(index)[offset:offset + size]
+            parts.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(parts)
+
+
+def store_root(path: str) -> str:
+    """Directory holding the chunk store of the manifest at ``path``: the
+    nearest enclosing directory with a ``CAS_DIR`` (segments live below log_dir)."""
+    start = directory = os.path.dirname(os.path.abspath(path))
+    while not os.path.isdir(os.path.join(directory, CAS_DIR)):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return start
+        directory = parent
+    return directory
+
+
+def open_recording(path: str) -> BinaryIO:
+    """
+    Open a recording (manifest or plain file, compressed or not) as a
+    binary stream of its JSON content.
+
+    Deduplicated recordings decompress one chunk at a time, so random
+    access only touches the chunks that are read.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return open_decompressed(open(path, 'rb'))
+    return io.BufferedReader(ChunkedReader(store_root(path), manifest))
+
+
+def read_recording_bytes(path: str) -> bytes:
+    with open_recording(path) as f:
+        return f.read()
+
+
+def load_recording(path: str) -> Dict[str, Any]:
+    """Parse a recording regardless of how it is stored."""
+    with open_recording(path) as f:
+        return json.load(f)
+
+
+class ManifestIndex:
+    """
+    Chunk reference counts of the manifests under ``log_dir``, persisted in
+    ``.cas/manifests.json``.
+
+    :meth:`refresh` walks the directory tree with ``scandir`` and only
+    reads files that are new or whose modification time changed, so a GC
+    pass costs a metadata walk instead of parsing every manifest. Files
+    that are not manifests are remembered with no chunks.
+    """
+
+    def __init__(self, log_dir: str):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, CAS_DIR, MANIFEST_INDEX)
+        # Path relative to log_dir -> (mtime_ns, chunk digests)
+        self.entries: Optional[Dict[str, Tuple[int, List[str]]]] = None
+        self.refcounts: Counter = Counter()
+
+    def _load(self) -> None:
+        self.entries = {}
+        try:
+            with open(self.path) as f:
+                self.entries = {rel: (mtime, chunks) for rel, (mtime, chunks) in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+        self.refcounts = Counter(digest for _, chunks in self.entries.values() for digest in chunks)
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def _set(self, rel: str, mtime: int, chunks: List[str]) -> None:
+        old = self.entries.pop(rel, None)
+        if old is not None:
+            self.refcounts.subtract(old[1])
+        self.entries[rel] = (mtime, chunks)
+        self.refcounts.update(chunks)
+
+    def record(self, path: str, chunks: List[str]) -> None:
+        """Note a manifest (or, with no chunks, a plain file) just written at ``path``."""
+        if self.entries is None:
+            self._load()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        self._set(os.path.relpath(path, self.log_dir), mtime, chunks)
+
+    def refresh(self) -> None:
+        """Bring the counts up to date with the files under ``log_dir``."""
+        if self.entries is None:
+            self._load()
+        seen: Set[str] = set()
+        changed = False
+        pending = [self.log_dir]
+        while pending:
+            for entry in os.scandir(pending.pop()):
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != CAS_DIR:
+                        pending.append(entry.path)
+                    continue
+                # Dot-files (e.g. the catalog database) are never manifests
+                if entry.name.endswith('.tmp') or entry.name.startswith('.'):
+                    continue
+                rel = os.path.relpath(entry.path, self.log_dir)
+                seen.add(rel)
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                    known = self.entries.get(rel)
+                    if known is not None and known[0] == mtime:
+                        continue
+                    manifest = read_manifest(entry.path)
+                except (OSError, ValueError):
+                    continue
+                self._set(rel, mtime, manifest['chunks'] if manifest is not None else [])
+                changed = True
+        for rel in set(self.entries) - seen:
+            self.refcounts.subtract(self.entries.pop(rel)[1])
+            changed = True
+        if changed:
+            self.refcounts = +self.refcounts
+            self._save()
+
+    def referenced(self) -> Set[str]:
+        return {digest for digest, count in self.refcounts.items() if count > 0}
+
+
+class RecordingStore:
+    """
+    Writes recordings into ``log_dir``, deduplicating their content.
+
+    With ``dedupe=False`` (the default) recordings are written as single
+    files, which together with ``compression='none'`` keeps the directory
+    readable by external tools.
+    """
+
+    def __init__(
+        self,
+        log_dir: str,
+        dedupe: Optional[bool] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        compression: Optional[str] = None
+    ):
+        """
+        Args:
+            log_dir (str): Directory holding the recordings
+            dedupe (Optional[bool]): Store recordings as manifests over shared
+                chunks; defaults to $RECORDER_DEDUPE, read here
+            chunk_size (int): Uncompressed size of a chunk
+            compression (Optional[str]): Codec name (defaults to
+                $RECORDER_COMPRESSION, read here, or 'none')
+        """
+        self.log_dir = log_dir
+        if dedupe is None:
+            dedupe = os.environ.get('RECORDER_DEDUPE', '0') == '1'
+        self.dedupe = dedupe
+        self.chunk_size = chunk_size
+        self.codec = get_codec(compression)
+        self._gc_lock = threading.Lock()
+        self.manifests = ManifestIndex(log_dir)
+
+    def _put_object(self, data: bytes) -> Tuple[str, int]:
+        """Store one chunk unless it already exists; returns (digest, bytes written)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = object_path(self.log_dir, digest)
+        if os.path.exists(path):
+            # Refresh the mtime so a concurrent GC treats the object as fresh
+            os.utime(path)
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored = self.codec.compress(data)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(stored)
+        os.replace(tmp, path)
+        return digest, len(stored)
+
+    def save_stream(self, src: BinaryIO, dest: str) -> int:
+        """
+        Store the content of ``src`` as the recording ``dest``.
+
+        Returns:
+            int: Bytes actually written to disk (chunks already stored cost nothing)
+        """
+        if not self.dedupe:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'wb') as out:
+                with self.codec.writer(out) as writer:
+                    for block in iter(lambda: src.read(self.chunk_size), b''):
+                        writer.write(block)
+                written = out.tell()
+            os.replace(tmp, dest)
+            return written
+
+        whole = hashlib.sha256()
+        chunks: List[str] = []
+        size = written = 0
+        for block in iter(lambda: src.read(self.chunk_size), b''):
+            whole.update(block)
+            digest, new_bytes = self._put_object(block)
+            chunks.append(digest)
+            size += len(block)
+            written += new_bytes
+        manifest = json.dumps({
+            MANIFEST_KEY: MANIFEST_VERSION,
+            'size': size,
+            'sha256': whole.hexdigest(),
+            'chunk_size': self.chunk_size,
+            'chunks': chunks
+        }, separators=(',', ':')).encode()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(manifest)
+        with self._gc_lock:
+            os.replace(tmp, dest)
+            self.manifests.record(dest, chunks)
+        return written + len(manifest)
+
+    def save_file(self, src_path: str, dest: str) -> int:
+        """Move a fully written temporary file into the store as ``dest``."""
+        if not self.dedupe and self.codec.name == 'none':
+            written = os.path.getsize(src_path)
+            os.replace(src_path, dest)
+            return written
+        try:
+            with open(src_path, 'rb') as src:
+                return self.save_stream(src, dest)
+        finally:
+            os.remove(src_path)
+
+    def save_bytes(self, data: bytes, dest: str) -> int:
+        return self.save_stream(io.BytesIO(data), dest)
+
+    def referenced_objects(self) -> Set[str]:
+        """Digests referenced by any manifest under ``log_dir`` (recordings, segments, ...)."""
+        self.manifests.refresh()
+        return self.manifests.referenced()
+
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> Dict[str, int]:
+        """Delete chunk objects that no manifest references any more."""
+        root = objects_dir(self.log_dir)
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        if not os.path.isdir(root):
+            return {'removed_objects': 0, 'freed_bytes': 0}
+        with self._gc_lock:
+            referenced = self.referenced_objects()
+            for prefix in os.scandir(root):
+                if not prefix.is_dir():
+                    continue
+                for obj in os.scandir(prefix.path):
+                    if obj.name.endswith('.tmp') or obj.name in referenced:
+                        continue
+                    try:
+                        stat = obj.stat()
+                        if stat.st_mtime > cutoff:
+                            continue
+                        size = stat.st_size
+                        os.remove(obj.path)
+                        removed += 1
+                        freed += size
+                    except OSError:
+                        pass
+        return {'removed_objects': removed, 'freed_bytes': freed}
+
+    def stats(self) -> Dict[str, int]:
+        """Object count and on-disk (compressed) size of the chunk store."""
+        count = size = 0
+        root = objects_dir(self.log_dir)
+        if os.path.isdir(root):
+            for prefix in os.scandir(root):
+                if prefix.is_dir():
+                    for obj in os.scandir(prefix.path):
+                        count += 1
+                        size += obj.stat().st_size
+        return {'objects': count, 'object_bytes': size}
@@ -0,0 +1,22 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The feature modules import each other by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def write_recording(tmp_path):
+    """Write a recording to ``tmp_path`` and return its path."""
+    def write(mouse_events=(), keyboard_events=(), name='user_actions_2024_1.json'):
+        path = tmp_path / name
+        path.write_text(json.dumps({
+            'mouse_events': list(mouse_events),
+            'keyboard_events': list(keyboard_events),
+            'metadata': {}
+        }))
+        return str(path)
+    return write
@@ -0,0 +1,79 @@
+from backends import StubBackend, VirtualBackend, create_backend, replay_keyboard_event, replay_mouse_event
+from dry_run import dry_run
+from replay_plan import build_plan
+
+RESOLUTION = (960, 540)
+
+MOUSE = [
+    {'type': 'move', 'pos': (10, 20), 'relative_time': 0.0, 'screen_resolution': RESOLUTION},
+    {'type': 'click', 'pos': (30, 40), 'button': 'Button.left', 'pressed': True,
+     'relative_time': 0.2, 'screen_resolution': RESOLUTION},
+    {'type': 'click', 'pos': (30, 40), 'button': 'Button.left', 'pressed': False,
+     'relative_time': 0.3, 'screen_resolution': RESOLUTION},
+    {'type': 'scroll', 'pos': (30, 40), 'dx': 0, 'dy': -2, 'relative_time': 0.5, 'screen_resolution': RESOLUTION},
+]
+KEYBOARD = [
+    {'type': 'keydown', 'key': 'Key.shift', 'relative_time': 0.1},
+    {'type': 'keypress', 'key': 'A', 'relative_time': 0.15},
+    {'type': 'keyup', 'key': 'Key.shift', 'relative_time': 0.4},
+]
+
+
+def replay(path, backend, **plan_options):
+    for event, _ in build_plan(path, **plan_options).playback():
+        if event['event_type'] == 'mouse':
+            replay_mouse_event(backend, event)
+        else:
+            replay_keyboard_event(backend, event)
+
+
+def test_stub_records_dispatched_sequence_in_time_order(write_recording):
+    backend = StubBackend(size=(1920, 1080))
+    replay(write_recording(MOUSE, KEYBOARD), backend)
+    # Positions are scaled from the recorded 960x540 screen
+    assert backend.calls == [
+        ('move', 20, 40),
+        ('key', 'Key.shift', True),
+        ('key', 'A', True),
+        ('key', 'A', False),
+        ('move', 60, 80),
+        ('button', 'left', True),
+        ('move', 60, 80),
+        ('button', 'left', False),
+        ('key', 'Key.shift', False),
+        ('scroll', 0, -2),
+    ]
+
+
+def test_stub_replays_only_the_requested_window(write_recording):
+    backend = StubBackend(size=RESOLUTION)
+    replay(write_recording(MOUSE, KEYBOARD), backend, start_time=0.2, end_time=0.3)
+    assert backend.calls == [('move', 30, 40), ('button', 'left', True), ('move', 30, 40), ('button', 'left', False)]
+
+
+def test_virtual_backend_ends_in_released_state(write_recording):
+    report = dry_run(write_recording(MOUSE, KEYBOARD))
+    assert report['ok']
+    assert report['dispatched'] == len(MOUSE) + len(KEYBOARD)
+    state = report['final_state']
+    assert state['cursor'] == [60, 80]
+    assert state['keys_pressed'] == [] and state['buttons_pressed'] == []
+    assert state['scroll'] == [0, -2]
+    assert state['counts']['key_presses'] == 2
+
+
+def test_virtual_backend_flags_impossible_input():
+    backend = VirtualBackend(size=(100, 100))
+    backend.key('a', False)
+    backend.button('left', True)
+    backend.button('left', True)
+    backend.move(150, 10)
+    assert [anomaly['kind'] for anomaly in backend.anomalies] == [
+        'key_release_without_press', 'button_already_pressed', 'out_of_bounds'
+    ]
+
+
+def test_create_backend_reads_environment_at_call_time(monkeypatch):
+    monkeypatch.setenv('RECORDER_INPUT_BACKEND', 'stub')
+    assert isinstance(create_backend(), StubBackend)
+    assert isinstance(create_backend('virtual'), VirtualBackend)
@@ -0,0 +1,55 @@
+import pytest
+
+from budgets import EventBuffer
+
+
+def moves(n, start=0):
+    return [{'type': 'move', 'i': i} for i in range(start, start + n)]
+
+
+def test_stop_keeps_the_first_events():
+    buffer = EventBuffer('mouse', 3, 'stop')
+    results = [buffer.append(event) for event in moves(5)]
+    assert results == [True, True, True, False, False]
+    assert [event['i'] for event in buffer] == [0, 1, 2]
+    assert buffer.usage()['dropped'] == 2
+
+
+def test_ring_keeps_the_newest_events():
+    buffer = EventBuffer('mouse', 3, 'ring')
+    for event in moves(5):
+        assert buffer.append(event)
+    assert [event['i'] for event in buffer] == [2, 3, 4]
+    assert buffer[-1]['i'] == 4
+    assert buffer.usage()['dropped'] == 2
+
+
+def test_drop_moves_first_evicts_moves_then_stops():
+    buffer = EventBuffer('mouse', 3, 'drop_moves_first')
+    buffer.append({'type': 'click', 'i': 0})
+    for event in moves(2, start=1):
+        buffer.append(event)
+    assert buffer.append({'type': 'click', 'i': 3})
+    assert [event['i'] for event in buffer] == [0, 2, 3]
+    assert buffer.append({'type': 'scroll', 'i': 4})
+    assert [event['i'] for event in buffer] == [0, 3, 4]
+    # Nothing left to evict: behaves like 'stop'
+    assert not buffer.append({'type': 'click', 'i': 5})
+    assert buffer.usage()['dropped'] == 3
+
+
+def test_spill_keeps_every_event_in_order(tmp_path):
+    buffer = EventBuffer('keyboard', 2, 'spill', str(tmp_path))
+    for event in moves(5):
+        assert buffer.append(event)
+    assert len(buffer) == 5
+    assert [event['i'] for event in buffer] == [0, 1, 2, 3, 4]
+    assert buffer[0]['i'] == 0 and buffer[-1]['i'] == 4
+    assert buffer.usage()['in_memory'] <= 2 and buffer.usage()['dropped'] == 0
+    buffer.clear()
+    assert len(buffer) == 0 and not list(tmp_path.iterdir())
+
+
+def test_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        EventBuffer('mouse', 3, 'bogus')
@@ -0,0 +1,70 @@
+import random
+
+from recording_diff import align, diff_recordings, splice
+
+
+def apply(opcodes, a, b):
+    """Rebuild ``b`` from ``a``, checking that the opcodes tile both sequences."""
+    out = []
+    a_pos = b_pos = 0
+    for tag, a_lo, a_hi, b_lo, b_hi in opcodes:
+        assert (a_lo, b_lo) == (a_pos, b_pos)
+        if tag == 'equal':
+            assert a[a_lo:a_hi] == b[b_lo:b_hi]
+            out.extend(a[a_lo:a_hi])
+        else:
+            out.extend(b[b_lo:b_hi])
+        a_pos, b_pos = a_hi, b_hi
+    assert (a_pos, b_pos) == (len(a), len(b))
+    return out
+
+
+def test_align_finds_the_minimal_edit():
+    a, b = list('ABCDEFGHIJ'), list('ABCDXYEFGHJ')
+    assert align(a, b) == [
+        ('equal', 0, 4, 0, 4),
+        ('insert', 4, 4, 4, 6),
+        ('equal', 4, 8, 6, 10),
+        ('delete', 8, 9, 10, 10),
+        ('equal', 9, 10, 10, 11),
+    ]
+
+
+def test_align_opcodes_rebuild_the_target():
+    rng = random.Random(7)
+    for _ in range(200):
+        a = [rng.randrange(4) for _ in range(rng.randrange(40))]
+        b = [rng.randrange(4) for _ in range(rng.randrange(40))]
+        assert apply(align(a, b), a, b) == b
+
+
+def test_align_reports_replace_after_the_deadline():
+    a, b = list(range(50)), list(range(50, 100))
+    assert align(a, b, deadline=0.0) == [('replace', 0, 50, 0, 50)]
+
+
+def typing(times, keys='abc'):
+    mouse = [{'type': 'move', 'pos': (i, i), 'relative_time': t / 10} for i, t in enumerate(range(5))]
+    keyboard = [{'type': 'keypress', 'key': key, 'relative_time': t} for key, t in zip(keys, times)]
+    return mouse, keyboard
+
+
+def test_diff_recordings_reports_shifted_and_inserted_actions(write_recording):
+    a = write_recording(*typing([1.0, 2.0, 3.0]), name='a.json')
+    b = write_recording(*typing([1.0, 2.0, 5.0, 6.0], keys='abcd'), name='b.json')
+    result = diff_recordings(a, b)
+    # The five moves collapse into one action
+    assert result['actions'] == {'a': 4, 'b': 5}
+    assert [segment['op'] for segment in result['segments']] == ['equal', 'shifted', 'inserted']
+    assert result['segments'][1]['shift'] == 2.0
+    assert result['counts'] == {'equal': 3, 'shifted': 1, 'removed': 0, 'inserted': 1}
+
+
+def test_splice_moves_later_target_events():
+    target = {'keyboard_events': [{'key': k, 'relative_time': t} for k, t in (('a', 0.0), ('b', 1.0), ('c', 2.0))]}
+    source = {'keyboard_events': [{'key': 'x', 'relative_time': 5.0}, {'key': 'y', 'relative_time': 5.5}]}
+    result = splice(target, source, 5.0, 6.0, at=1.0, replace_until=2.0)
+    assert [(e['key'], e['relative_time']) for e in result['keyboard_events']] == [
+        ('a', 0.0), ('x', 1.0), ('y', 1.5), ('c', 2.0)
+    ]
+    assert result['mouse_events'] == []
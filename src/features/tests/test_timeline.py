@@ -0,0 +1,94 @@
+import random
+
+from replay_plan import build_plan, merge_events
+from storage import load_recording
+from timeline import ReplayTimeline, _apply_held, compress_idle
+
+
+def key(event_type, name, t):
+    return {'type': event_type, 'key': name, 'relative_time': t, 'event_type': 'keyboard'}
+
+
+def move(x, t):
+    return {'type': 'move', 'pos': (x, x), 'relative_time': t, 'event_type': 'mouse'}
+
+
+def test_window_resolves_time_and_index_bounds():
+    timeline = ReplayTimeline([move(i, float(i)) for i in range(10)])
+    assert timeline.window() == (0, 10)
+    # end_time is inclusive
+    assert timeline.window(start_time=2.5, end_time=6.0) == (3, 7)
+    # The narrower bound wins on each side
+    assert timeline.window(start_time=2.0, start_index=4, end_time=8.0, end_index=6) == (4, 6)
+    assert timeline.window(start_time=9.5, end_time=1.0) == (10, 10)
+
+
+def test_held_before_matches_a_scan_from_the_start():
+    rng = random.Random(3)
+    events = []
+    for i in range(300):
+        name = rng.choice('abc')
+        events.append(key(rng.choice(('keydown', 'keyup')), name, float(i)))
+    timeline = ReplayTimeline(events, checkpoint_interval=16)
+    for index in range(len(events) + 1):
+        held = {}
+        for event in events[:index]:
+            _apply_held(held, event)
+        assert timeline.held_before(index) == list(held.values())
+
+
+def test_seek_restores_held_input_then_the_cursor(write_recording):
+    path = write_recording(
+        [{'type': 'move', 'pos': (5, 5), 'relative_time': 0.5},
+         {'type': 'click', 'pos': (7, 7), 'button': 'Button.left', 'pressed': True, 'relative_time': 1.0},
+         {'type': 'move', 'pos': (9, 9), 'relative_time': 2.0},
+         {'type': 'click', 'pos': (9, 9), 'button': 'Button.left', 'pressed': False, 'relative_time': 4.0}],
+        [{'type': 'keydown', 'key': 'Key.shift', 'relative_time': 0.0},
+         {'type': 'keyup', 'key': 'Key.shift', 'relative_time': 5.0}]
+    )
+    plan = build_plan(path, start_time=1.5, end_time=3.0)
+    assert plan.seeks and plan.stops_early
+    assert [event['relative_time'] for event, _ in plan.playback()] == [2.0]
+    restore = plan.restore_events()
+    assert sorted((event['type'], event.get('key') or event.get('button')) for event in restore[:-1]) == [
+        ('click', 'Button.left'), ('keydown', 'Key.shift')
+    ]
+    assert restore[-1]['type'] == 'move'
+    assert list(restore[-1]['pos']) == [7, 7]
+    released = plan.release_events()
+    assert sorted((event['type'], event.get('pressed')) for event in released) == [('click', False), ('keyup', None)]
+
+
+def test_partial_load_plans_the_same_window_as_a_full_load(write_recording):
+    mouse = [{'type': 'move', 'pos': (i, i), 'relative_time': i * 0.01} for i in range(5000)]
+    path = write_recording(mouse)
+    partial = build_plan(path, start_time=20.0, end_time=30.0)
+    full = build_plan(path, start_time=20.0, end_time=30.0, log_data=load_recording(path))
+    assert partial.partial and not full.partial
+    assert [e['relative_time'] for e, _ in partial.playback()] == [e['relative_time'] for e, _ in full.playback()]
+    assert list(partial.restore_events()[-1]['pos']) == list(full.restore_events()[-1]['pos'])
+
+
+def test_streamed_plan_matches_the_loaded_plan(write_recording):
+    path = write_recording(
+        [{'type': 'move', 'pos': (i, i), 'relative_time': i * 0.5} for i in range(20)],
+        [{'type': 'keypress', 'key': 'a', 'relative_time': i * 0.7} for i in range(10)]
+    )
+    streamed = build_plan(path, idle_threshold=0.4, max_idle=0.1)
+    loaded = build_plan(path, idle_threshold=0.4, max_idle=0.1, log_data=load_recording(path))
+    assert streamed.events is None
+    assert [(e['relative_time'], t) for e, t in streamed.playback()] == [(e['relative_time'], t) for e, t in loaded.playback()]
+    assert streamed.idle_summary == loaded.idle_summary
+
+
+def test_compress_idle_keeps_gaps_inside_held_input():
+    events = merge_events({
+        'mouse_events': [{'type': 'move', 'pos': (0, 0), 'relative_time': 0.0},
+                         {'type': 'move', 'pos': (1, 1), 'relative_time': 10.0}],
+        'keyboard_events': [{'type': 'keydown', 'key': 'Key.ctrl', 'relative_time': 11.0},
+                            {'type': 'keyup', 'key': 'Key.ctrl', 'relative_time': 20.0}]
+    })
+    times, summary = compress_idle(events, threshold=2.0, max_gap=0.5)
+    # The idle 10 s gap shrinks; the 9 s Ctrl hold does not
+    assert times == [0.0, 0.5, 1.5, 10.5]
+    assert summary['gaps_compressed'] == 1 and summary['time_saved'] == 9.5
@@ -0,0 +1,200 @@
+import bisect
+from typing import Any, Dict, List, Optional, Tuple
+
+# Number of events between held-input checkpoints
+CHECKPOINT_INTERVAL = 1024
+
+
+def _apply_held(held: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+    """Update the held keys/buttons map with one event."""
+    event_type = event['type']
+    if event_type == 'keydown':
+        held['key:' + event['key']] = event
+    elif event_type == 'keyup':
+        held.pop('key:' + event['key'], None)
+    elif event_type == 'click':
+        if event['pressed']:
+            held['button:' + event['button']] = event
+        else:
+            held.pop('button:' + event['button'], None)
+
+
+class ReplayTimeline:
+    """
+    Time index over a merged, time-sorted replay event list.
+
+    Seeking by time or index is a binary search. Held keys and mouse
+    buttons are checkpointed every ``CHECKPOINT_INTERVAL`` events, so the
+    input state at any seek point is rebuilt from the nearest checkpoint
+    instead of from the start of the recording.
+    """
+
+    def __init__(
+        self,
+        events: List[Dict[str, Any]],
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+        initial_held: Optional[List[Dict[str, Any]]] = None,
+        initial_cursor: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            events (List[Dict[str, Any]]): Events sorted by 'relative_time'
+            checkpoint_interval (int): Events between held-state checkpoints
+            initial_held (Optional[List[Dict[str, Any]]]): Keys/buttons already held
+                before the first event (when ``events`` is a window of a recording)
+            initial_cursor (Optional[Dict[str, Any]]): Cursor event preceding the window
+        """
+        self.events = events
+        self.times = [event['relative_time'] for event in events]
+        self.checkpoint_interval = checkpoint_interval
+        self.initial_cursor = initial_cursor
+        self._checkpoints: List[Tuple[Tuple[str, Dict[str, Any]], ...]] = []
+        held: Dict[str, Dict[str, Any]] = {}
+        for event in initial_held or []:
+            _apply_held(held, event)
+        self._initial_held = list(held.values())
+        for index, event in enumerate(events):
+            if index % checkpoint_interval == 0:
+                self._checkpoints.append(tuple(held.items()))
+            _apply_held(held, event)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] if self.times else 0.0
+
+    def index_at(self, relative_time: float) -> int:
+        """Index of the first event at or after ``relative_time``."""
+        return bisect.bisect_left(self.times, relative_time)
+
+    def window(
+        self,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        start_index: Optional[int] = None,
+        end_index: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """
+        Resolve a time and/or index range to ``[lo, hi)`` event indices.
+
+        When both a time and an index bound are given for the same side the
+        narrower one wins. ``end_time`` is inclusive.
+        """
+        lo, hi = 0, len(self.events)
+        if start_index is not None:
+            lo = max(lo, start_index)
+        if start_time is not None:
+            lo = max(lo, self.index_at(start_time))
+        if end_index is not None:
+            hi = min(hi, end_index)
+        if end_time is not None:
+            hi = min(hi, bisect.bisect_right(self.times, end_time))
+        return lo, max(lo, hi)
+
+    def held_before(self, index: int) -> List[Dict[str, Any]]:
+        """Key/button press events still held immediately before ``index``."""
+        index = max(0, min(index, len(self.events)))
+        if not self.events:
+            return list(self._initial_held)
+        checkpoint = min(index // self.checkpoint_interval, len(self._checkpoints) - 1)
+        held = dict(self._checkpoints[checkpoint])
+        for event in self.events[checkpoint * self.checkpoint_interval:index]:
+            _apply_held(held, event)
+        return list(held.values())
+
+    def cursor_before(self, index: int) -> Optional[Dict[str, Any]]:
+        """Last mouse event with a position before ``index``, if any."""
+        for i in range(min(index, len(self.events)) - 1, -1, -1):
+            if 'pos' in self.events[i]:
+                return self.events[i]
+        return self.initial_cursor
+
+
+class IdleCompressor:
+    """
+    Playback schedule with long idle gaps clamped, built one event at a time.
+
+    A gap between consecutive events longer than ``threshold`` is shortened
+    to ``max_gap``, unless a key or mouse button is held across it: gaps
+    inside drags and key chords keep their recorded length, and every gap
+    at or below the threshold (double-clicks, typing) is untouched.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_gap: float,
+        initial_held: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Args:
+            threshold (float): Gaps longer than this (seconds) count as idle
+            max_gap (float): Length idle gaps are clamped to
+            initial_held (Optional[List[Dict[str, Any]]]): Keys/buttons held before the first event
+        """
+        if max_gap < 0 or threshold < 0:
+            raise ValueError("idle threshold and maximum gap must not be negative")
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self._held: Dict[str, Dict[str, Any]] = {}
+        for event in initial_held or []:
+            _apply_held(self._held, event)
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+        self._time = 0.0
+        self.compressed = 0
+        self.saved = 0.0
+
+    def play_time(self, event: Dict[str, Any]) -> float:
+        """Playback time of the next event (events must arrive sorted by 'relative_time')."""
+        recorded = event['relative_time']
+        if self._last is None:
+            self._first = self._time = recorded
+        else:
+            gap = recorded - self._last
+            if gap > self.threshold and not self._held:
+                self.compressed += 1
+                self.saved += gap - min(gap, self.max_gap)
+                gap = min(gap, self.max_gap)
+            self._time += gap
+        self._last = recorded
+        _apply_held(self._held, event)
+        return self._time
+
+    def summary(self) -> Dict[str, Any]:
+        """Number of compressed gaps and the time saved so far."""
+        original = self._last - self._first if self._last is not None else 0.0
+        return {
+            'threshold': self.threshold,
+            'max_gap': self.max_gap,
+            'gaps_compressed': self.compressed,
+            'original_duration': original,
+            'compressed_duration': original - self.saved,
+            'time_saved': self.saved
+        }
+
+
+def compress_idle(
+    events: List[Dict[str, Any]],
+    threshold: float,
+    max_gap: float,
+    initial_held: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[float], Dict[str, Any]]:
+    """
+    Build a playback schedule with long idle gaps clamped (see :class:`IdleCompressor`).
+
+    Args:
+        events (List[Dict[str, Any]]): Events sorted by 'relative_time'
+        threshold (float): Gaps longer than this (seconds) count as idle
+        max_gap (float): Length idle gaps are clamped to
+        initial_held (Optional[List[Dict[str, Any]]]): Keys/buttons held before the first event
+
+    Returns:
+        Tuple[List[float], Dict[str, Any]]: Playback time of each event and a
+        summary with the number of compressed gaps and the time saved
+    """
+    compressor = IdleCompressor(threshold, max_gap, initial_held)
+    times = [compressor.play_time(event) for event in events]
+    return times, compressor.summary()
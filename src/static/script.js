@@ -141,17 +141,55 @@ document.addEventListener('DOMContentLoaded', function () {
     searchInput.addEventListener('input', filterRecordings);
     categoryFilter.addEventListener('change', filterRecordings);
 
-    function filterRecordings() {
+    // Categories live in the server-side catalog: ask /list_recordings which
+    // recordings belong to the selected one
+    async function filterRecordings() {
         const searchText = searchInput.value.toLowerCase();
         const category = categoryFilter.value;
-        
+        let inCategory = null;
+
+        if (category) {
+            try {
+                const response = await fetch('/list_recordings?category=' + encodeURIComponent(category));
+                const data = await response.json();
+                inCategory = new Set(data.recordings);
+                addCategoryOptions(data.categories);
+            } catch (error) {
+                showStatus('Error filtering recordings: ' + error, true);
+                return;
+            }
+        }
+
         document.querySelectorAll('.recording-item').forEach(item => {
             const matchesSearch = item.textContent.toLowerCase().includes(searchText);
-            const matchesCategory = !category || item.dataset.category === category;
+            const matchesCategory = !inCategory || inCategory.has(item.textContent);
             item.style.display = matchesSearch && matchesCategory ? '' : 'none';
         });
     }
 
+    // Offer every category the catalog knows about, not only the built-in ones
+    function addCategoryOptions(categories) {
+        const known = new Set(Array.from(categoryFilter.options).map(option => option.value));
+        Object.values(categories || {}).forEach(category => {
+            if (category && !known.has(category)) {
+                categoryFilter.add(new Option(category, category));
+                known.add(category);
+            }
+        });
+    }
+
+    async function loadCategories() {
+        try {
+            const response = await fetch('/list_recordings');
+            const data = await response.json();
+            addCategoryOptions(data.categories);
+        } catch (error) {
+            console.error('Error loading categories:', error);
+        }
+    }
+
+    loadCategories();
+
     // Batch operations
     selectAllBtn.addEventListener('click', () => {
         document.querySelectorAll('.recording-item:not([style*="display: none"])')
@@ -189,6 +227,7 @@ document.addEventListener('DOMContentLoaded', function () {
             const data = await response.json();
             showStatus(data.message);
             await updateRecordingsList();
+            await filterRecordings();
         } catch (error) {
             showStatus('Error setting category: ' + error, true);
         }